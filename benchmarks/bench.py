@@ -0,0 +1,268 @@
+#!/usr/bin/python3
+
+"""
+Benchmarks of the gaze analysis pipeline on synthetic recordings (see
+gazepy.synthetic). Each benchmark reports the throughput in samples per
+second. The streaming benchmarks additionally report the cost per sample of
+each stage (update, fixationFilter, saccadeFilter, cleanup), the step
+benchmarks measure the same stages fused into Gazepy.step().
+
+Results are written as JSON and can be compared against a recorded baseline:
+
+    python3 benchmarks/bench.py -o result.json
+    python3 benchmarks/bench.py --compare benchmarks/baselines/numpy.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    ".."))
+
+import gazepy
+from gazepy import fixation3d, jit, reader, synthetic, vectorized
+from gazepy.backend import listBackends, getBackend
+
+STAGES = ("update", "fixationFilter", "saccadeFilter", "cleanup")
+
+def best_of(repeat, func, *args, warmup=False):
+    # an untimed run excludes the compilation of the kernels from the timings
+    if warmup:
+        func(*args)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def result(count, seconds, stages=None):
+    res = {
+        "samples": count,
+        "seconds": seconds,
+        "samples_per_second": count / seconds
+    }
+    if stages is not None:
+        res["us_per_sample"] = {name: value / count * 1e6
+                for name, value in stages.items()}
+    return res
+
+def sample_args(samples):
+    return list(zip(*samples["origin"].T.tolist(), *samples["point"].T.tolist(),
+        *samples["screen_point"].T.tolist(), samples["timestamp"].tolist(),
+        samples["trial_id"].tolist(), samples["label"].tolist()))
+
+def bench_stream(backend, params, samples, labels, repeat):
+    args = sample_args(samples)
+
+    def run_stages():
+        h = gazepy.Gazepy(params, backend)
+        h.labels = gazepy.GazepyLabels(labels)
+        clock = time.perf_counter
+        update = fixation = saccade = cleanup = 0
+        for sample in args:
+            t0 = clock()
+            h.updateWithScreen(*sample)
+            t1 = clock()
+            h.fixationFilter()
+            t2 = clock()
+            h.saccadeFilter()
+            t3 = clock()
+            h.cleanup()
+            t4 = clock()
+            update += t1 - t0
+            fixation += t2 - t1
+            saccade += t3 - t2
+            cleanup += t4 - t3
+        return dict(zip(STAGES, (update, fixation, saccade, cleanup)))
+
+    def run():
+        h = gazepy.Gazepy(params, backend)
+        h.labels = gazepy.GazepyLabels(labels)
+        h.analyse(args)
+
+    stages = min((run_stages() for _ in range(repeat)),
+            key=lambda stages: sum(stages.values()))
+    return result(len(args), best_of(repeat, run), stages)
+
+def bench_step(backend, params, samples, labels, repeat):
+    args = sample_args(samples)
+
+    def run():
+        h = gazepy.Gazepy(params, backend)
+        h.labels = gazepy.GazepyLabels(labels)
+        step = h.step
+        for sample in args:
+            step(*sample)
+
+    return result(len(args), best_of(repeat, run))
+
+def bench_process(backend, params, samples, labels, repeat):
+    def run():
+        h = gazepy.Gazepy(params, backend)
+        h.process(samples["origin"], samples["point"], samples["timestamp"],
+                samples["trial_id"], samples["label"], labels,
+                samples["screen_point"])
+    # the NumPy backend runs the fixation kernel
+    return result(len(samples), best_of(repeat, run,
+        warmup=jit.isJitEnabled()))
+
+def bench_vectorized(params, samples, repeat):
+    gap = params.gap
+    noise = params.noise
+    fixation = params.fixation
+    corners = ((0, 0, 500), (1000, 0, 500), (0, 1000, 500), (1000, 1000, 500))
+    count = len(samples)
+    return {
+        "vectorized.gapFilter": result(count, best_of(repeat,
+            vectorized.gapFilter, samples, gap.max_gap_length,
+            gap.sample_period)),
+        "vectorized.noiseFilter.average": result(count, best_of(repeat,
+            vectorized.noiseFilter, samples, vectorized.NOISE_TYPE_AVERAGE,
+            max(noise.mid_idx, 1))),
+        "vectorized.noiseFilter.median": result(count, best_of(repeat,
+            vectorized.noiseFilter, samples, vectorized.NOISE_TYPE_MEDIAN,
+            max(noise.mid_idx, 1))),
+        "vectorized.fixationFilter": result(count, best_of(repeat,
+            vectorized.fixationFilter, samples,
+            fixation.dispersion_threshold, fixation.duration_threshold,
+            warmup=jit.isJitEnabled())),
+        "vectorized.saccadeFilter": result(count, best_of(repeat,
+            vectorized.saccadeFilter, samples,
+            params.saccade.velocity_threshold)),
+        "vectorized.screenPoint": result(count, best_of(repeat,
+            vectorized.screenPoint, samples, True, *corners))
+    }
+
+def bench_reader(samples, labels, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "samples.csv")
+        synthetic.writeSamples(path, samples, labels)
+        return result(len(samples), best_of(repeat, reader.readCsv, path))
+
+def bench_fixation3d(poses, repeat, dispersion_threshold=0.5,
+        duration_threshold=50, sample_period=1000/120):
+    position = poses["position"].tolist()
+    orientation = poses["orientation"].tolist()
+    timestamp = poses["timestamp"].tolist()
+
+    def run(cls):
+        f = cls(dispersion_threshold, duration_threshold)
+        for item in zip(position, orientation, timestamp):
+            f.filter(*item)
+
+    count = len(poses)
+    return {
+        "fixation3d.static": result(count, best_of(repeat, run,
+            fixation3d.GazepyFilterFixationStatic)),
+        "fixation3d.dynamic": result(count, best_of(repeat, run,
+            fixation3d.GazepyFilterFixationDynamic)),
+        "fixation3d.fixationStaticFilter": result(count, best_of(repeat,
+            fixation3d.fixationStaticFilter, poses["position"],
+            poses["orientation"], poses["timestamp"], dispersion_threshold,
+            duration_threshold, warmup=jit.isJitEnabled())),
+        "fixation3d.fixationDynamicFilter": result(count, best_of(repeat,
+            fixation3d.fixationDynamicFilter, poses["position"],
+            poses["orientation"], poses["timestamp"], dispersion_threshold,
+            duration_threshold, sample_period, warmup=jit.isJitEnabled()))
+    }
+
+def available_backends():
+    backends = []
+    for name in listBackends():
+        try:
+            getBackend(name)
+        except (ImportError, OSError):
+            continue
+        backends.append(name)
+    return backends
+
+def run_benchmarks(args):
+    params = gazepy.getFilterParameterDefault()
+    samples, labels = synthetic.createSamples(args.samples, dropout=0.01,
+            seed=args.seed)
+    stream, _ = synthetic.createSamples(args.stream_samples, dropout=0.01,
+            seed=args.seed)
+    poses = synthetic.createPoses(args.stream_samples, seed=args.seed)
+
+    results = {}
+    for backend in args.backend or available_backends():
+        results[f"stream.{backend}"] = bench_stream(backend, params, stream,
+                labels, args.repeat)
+        results[f"step.{backend}"] = bench_step(backend, params, stream,
+                labels, args.repeat)
+        results[f"process.{backend}"] = bench_process(backend, params,
+                samples, labels, args.repeat)
+    results.update(bench_vectorized(params, samples, args.repeat))
+    results["reader.readCsv"] = bench_reader(samples, labels, args.repeat)
+    results.update(bench_fixation3d(poses, args.repeat))
+    return {
+        "machine": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "jit": jit.isJitEnabled()
+        },
+        "config": {
+            "samples": args.samples,
+            "stream_samples": args.stream_samples,
+            "repeat": args.repeat,
+            "seed": args.seed
+        },
+        "results": results
+    }
+
+def print_results(results, baseline=None):
+    print(f"{'benchmark':<36} {'samples/s':>12} {'baseline':>9}")
+    for name, res in results["results"].items():
+        line = f"{name:<36} {res['samples_per_second']:>12.0f}"
+        if baseline is not None and name in baseline["results"]:
+            ratio = (res["samples_per_second"]
+                    / baseline["results"][name]["samples_per_second"])
+            line += f" {ratio:>8.2f}x"
+        print(line)
+        for stage, value in res.get("us_per_sample", {}).items():
+            print(f"  {stage:<34} {value:>9.2f} us/sample")
+
+def main():
+    parser = argparse.ArgumentParser(
+            description="Benchmark the gaze analysis pipeline.")
+    parser.add_argument("-n", "--samples", type=int, default=200000,
+            help="the number of samples of the batch benchmarks")
+    parser.add_argument("-s", "--stream-samples", type=int, default=20000,
+            help="the number of samples of the streaming benchmarks")
+    parser.add_argument("-r", "--repeat", type=int, default=3,
+            help="the number of repetitions, the best run is reported")
+    parser.add_argument("-b", "--backend", action="append",
+            choices=listBackends(),
+            help="the backends to benchmark (default: all available)")
+    parser.add_argument("--seed", type=int, default=0,
+            help="the seed of the synthetic recordings")
+    parser.add_argument("-o", "--output",
+            help="the JSON file to write the results to")
+    parser.add_argument("-c", "--compare",
+            help="a JSON file of baseline results to compare against")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args)
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+            f.write("\n")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 #!/usr/bin/python3
 
 import gazepy
+from gazepy.events import GazepyEventCollector
 import csv
 
 if __name__ == "__main__":
@@ -10,8 +11,7 @@ if __name__ == "__main__":
     params.noise.mid_idx = 0
     params.saccade.velocity_threshold = 25
     h = gazepy.Gazepy(params)
-    fixations = []
-    saccades = []
+    collector = GazepyEventCollector()
     rows = []
 
     with open('sample.csv') as csvfile:
@@ -28,23 +28,22 @@ if __name__ == "__main__":
                 float(row[2]), float(row[3]), float(row[4]),
                 float(row[0]), float(row[1]),
                 float(row[8]), int(row[9]), row[10])
-        fixation = h.fixationFilter()
-        if fixation is not None:
-            fixations.append(fixation)
-            print(fixation.first_sample.timestamp,
-                    f'fixation({fixation.first_sample.label.decode()}, {fixation.first_sample.trial_id}):',
-                    f'[{fixation.screen_point[0]}, {fixation.screen_point[1]}]',
-                    f'[{fixation.point[0]}, {fixation.point[1]}, {fixation.point[2]}],',
-                    fixation.duration)
-        saccade = h.saccadeFilter()
-        if saccade is not None:
-            saccades.append(saccade)
-            print(saccade.first_sample.timestamp,
-                    f'saccade({saccade.first_sample.label.decode()}, {saccade.first_sample.trial_id}):',
-                    f'[{saccade.first_sample.screen_point[0]}, {saccade.first_sample.screen_point[1]}]',
-                    f'[{saccade.first_sample.point[0]}, {saccade.first_sample.point[1]}, {saccade.first_sample.point[2]}]',
-                    '->',
-                    f'[{saccade.last_sample.screen_point[0]}, {saccade.last_sample.screen_point[1]}]',
-                    f'[{saccade.last_sample.point[0]}, {saccade.last_sample.point[1]}, {saccade.last_sample.point[2]}],',
-                    saccade.last_sample.timestamp - saccade.first_sample.timestamp)
+        # detected events are appended to the columns of the collector
+        collector.add(h.fixationFilter())
+        collector.add(h.saccadeFilter())
         h.cleanup()
+
+    fixations = collector.fixations()
+    saccades = collector.saccades()
+    for fixation in fixations:
+        print(fixation['timestamp'],
+                f'fixation({h.labels.decode(fixation["label"])}, {fixation["trial_id"]}):',
+                fixation['screen_point'].tolist(), fixation['point'].tolist(),
+                fixation['duration'])
+    for saccade in saccades:
+        print(saccade['timestamp'],
+                f'saccade({h.labels.decode(saccade["label"])}, {saccade["trial_id"]}):',
+                saccade['first_screen_point'].tolist(), saccade['first_point'].tolist(),
+                '->',
+                saccade['last_screen_point'].tolist(), saccade['last_point'].tolist(),
+                saccade['duration'], saccade['amplitude'])
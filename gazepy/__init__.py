@@ -1 +1,7 @@
 from .gazepy import *
+
+def __getattr__(name):
+    # the library bindings are only loaded on first access
+    if name == "gazepy_lib":
+        return getLib()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,208 @@
+"""
+Asynchronous gaze analysis of live sample streams. A stream consumes an async
+iterator of gaze samples and yields the detected fixations and saccades as an
+async iterator. Samples are read ahead into a bounded queue, hence a slow
+analysis applies backpressure on the sample source. Samples arriving in
+bursts are analysed in batches of bounded size and latency.
+
+A gaze sample is a tuple holding the arguments of Gazepy.update() (9 items)
+or Gazepy.updateWithScreen() (11 items).
+"""
+
+import asyncio
+import csv
+
+from .gazepy import Gazepy
+
+_END = object()
+
+class GazepyStream():
+    """
+    The asynchronous gaze analysis handler. The stream wraps a gaze analysis
+    handler and feeds it with the samples of an async sample source.
+    """
+
+    def __init__(self, handler=None, max_batch=64, max_latency=0.005,
+            queue_size=1024, executor=None):
+        """
+        Parameters
+        ----------
+        handler: Gazepy, optional
+            the gaze analysis handler. Defaults to a new handler with the
+            default filter parameters.
+        max_batch: int, optional
+            the maximal number of samples analysed in one batch. Defaults to
+            64.
+        max_latency: float, optional
+            the maximal time in seconds to wait for further samples to fill a
+            batch. If set to 0 only the samples already queued are batched.
+            Defaults to 0.005.
+        queue_size: int, optional
+            the maximal number of samples read ahead from the source. If the
+            queue is full, reading from the source is suspended. Defaults to
+            1024.
+        executor: concurrent.futures.Executor, optional
+            the executor to analyse the batches in. If omitted, batches are
+            analysed in the event loop.
+        """
+        self.handler = Gazepy() if handler is None else handler
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.queue_size = queue_size
+        self.executor = executor
+
+    async def events(self, samples):
+        """
+        Analyse a sample stream.
+
+        Parameters
+        ----------
+        samples: async iterable
+            the gaze samples.
+
+        Yields
+        ------
+        GazepyFixationRecord, GazepySaccadeRecord
+            the detected fixations and saccades in the order of detection.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(self.queue_size)
+        producer = asyncio.ensure_future(self.__read(samples, queue))
+        try:
+            while True:
+                batch, is_end = await self.__batch(loop, queue)
+                if batch:
+                    if self.executor is None:
+                        events = self.handler.analyse(batch)
+                    else:
+                        events = await loop.run_in_executor(self.executor,
+                                self.handler.analyse, batch)
+                    for event in events:
+                        yield event
+                if is_end:
+                    break
+            # raise errors of the sample source
+            await producer
+        finally:
+            producer.cancel()
+
+    async def __read(self, samples, queue):
+        try:
+            async for sample in samples:
+                await queue.put(sample)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # the error is raised to the consumer when it awaits the producer
+            await queue.put(_END)
+            raise
+        await queue.put(_END)
+
+    async def __batch(self, loop, queue):
+        sample = await queue.get()
+        if sample is _END:
+            return ([], True)
+        batch = [sample]
+        deadline = loop.time() + self.max_latency
+        while len(batch) < self.max_batch:
+            try:
+                sample = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    sample = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if sample is _END:
+                return (batch, True)
+            batch.append(sample)
+        return (batch, False)
+
+class GazepyMemorySource():
+    """
+    An in-memory sample source. Samples pushed to the source are yielded by
+    iterating the source asynchronously until the source is closed. This is a
+    stand-in for live sources, e.g. for testing.
+    """
+
+    def __init__(self, queue_size=0):
+        """
+        Parameters
+        ----------
+        queue_size: int, optional
+            the maximal number of pending samples. If the source is full,
+            push() waits. Defaults to 0 (unbounded).
+        """
+        self.queue = asyncio.Queue(queue_size)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        sample = await self.queue.get()
+        if sample is _END:
+            raise StopAsyncIteration
+        return sample
+
+    async def push(self, sample):
+        """
+        Add a sample to the source.
+
+        Parameters
+        ----------
+        sample: tuple
+            the gaze sample.
+        """
+        await self.queue.put(sample)
+
+    async def close(self):
+        """
+        Close the source. Iterating the source stops after all pending samples
+        were yielded.
+        """
+        await self.queue.put(_END)
+
+async def tcpSource(host, port, delimiter=","):
+    """
+    Read gaze samples from a TCP connection. The peer sends CSV rows in the
+    format of example/sample.csv, the first row holding the column names.
+
+    Parameters
+    ----------
+    host: str
+        the host name to connect to.
+    port: int
+        the port to connect to.
+    delimiter: str, optional
+        the column delimiter. Defaults to ",".
+
+    Yields
+    ------
+    tuple
+        the gaze samples with the arguments of Gazepy.updateWithScreen().
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        header = None
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            row = next(csv.reader([line.decode()], delimiter=delimiter), None)
+            if not row:
+                continue
+            if header is None:
+                header = {name: idx for idx, name in enumerate(row)}
+                columns = [header[name] for name in
+                        ("ox", "oy", "oz", "px", "py", "pz", "sx", "sy",
+                            "timestamp")]
+                trial_id = header["trial_id"]
+                label = header["label"]
+                continue
+            yield (*(float(row[idx]) for idx in columns), int(row[trial_id]),
+                    row[label])
+    finally:
+        writer.close()
+        await writer.wait_closed()
@@ -0,0 +1,102 @@
+"""
+The registry of the gaze analysis backends. A backend provides the class of
+the gaze analysis handler. The backend is selected per handler through the
+backend argument of Gazepy or for all handlers through the environment
+variable GAZEPY_BACKEND. Backends are only loaded when they are selected.
+"""
+
+import os
+
+BACKEND_ENV = "GAZEPY_BACKEND"
+"""
+The environment variable selecting the default backend.
+"""
+
+BACKEND_AUTO = "auto"
+"""
+The backend name selecting the first available backend in registration order.
+"""
+
+_backends = {}
+_auto = None
+
+def registerBackend(name, loader):
+    """
+    Register a backend.
+
+    Parameters
+    ----------
+    name: str
+        the name of the backend.
+    loader: callable
+        a function without arguments returning the handler class of the
+        backend. The function raises ImportError or OSError if the backend is
+        not available.
+    """
+    global _auto
+    _backends[name] = loader
+    _auto = None
+
+def listBackends():
+    """
+    Get the names of all registered backends.
+
+    Returns
+    -------
+    list of str
+        the backend names in registration order.
+    """
+    return list(_backends)
+
+def getBackend(name=None):
+    """
+    Get the handler class of a backend.
+
+    Parameters
+    ----------
+    name: str, optional
+        the name of the backend. If omitted, the environment variable
+        GAZEPY_BACKEND is used and if it is not set either, the first
+        available backend is selected.
+
+    Returns
+    -------
+    type
+        the handler class of the backend.
+
+    Raises
+    ------
+    ValueError
+        if the backend is unknown.
+    RuntimeError
+        if no backend is available.
+    """
+    global _auto
+    if name is None:
+        name = os.environ.get(BACKEND_ENV, BACKEND_AUTO)
+    if name != BACKEND_AUTO:
+        if name not in _backends:
+            raise ValueError(f"unknown gazepy backend {name!r}")
+        return _backends[name]()
+    if _auto is None:
+        for loader in _backends.values():
+            try:
+                _auto = loader()
+                break
+            except (ImportError, OSError):
+                continue
+        else:
+            raise RuntimeError("no gazepy backend is available")
+    return _auto
+
+def _loadC():
+    from .gazepy import Gazepy, getLib
+    getLib()
+    return Gazepy
+
+def _loadNumpy():
+    from .handler import GazepyNumpy
+    return GazepyNumpy
+
+registerBackend("c", _loadC)
+registerBackend("numpy", _loadNumpy)
@@ -0,0 +1,284 @@
+"""
+A columnar binary file format for gaze recordings. Each field of a recording
+is stored as a contiguous column, hence the columns can be memory-mapped
+into NumPy arrays without copying or parsing. Opening a file only reads its
+header, regardless of the size of the recording.
+
+A file starts with a header block of HEADER_SIZE bytes holding the magic
+bytes, the format version, and a JSON document describing the number of
+samples, the sample period and the type, shape and offset of each column.
+The columns follow, each aligned to COLUMN_ALIGNMENT bytes. The interned
+labels are stored as JSON list after the last column.
+"""
+
+import csv
+import json
+import struct
+import numpy as np
+
+from .gazepy import GazepyLabels
+from .reader import COLUMNS_SAMPLE, GazepyCsvReader
+
+BINARY_MAGIC = b"GAZEPY\x00\x00"
+"""
+The magic bytes at the start of a binary gaze recording.
+"""
+
+BINARY_VERSION = 1
+"""
+The version of the binary format.
+"""
+
+BINARY_SUFFIX = ".gzb"
+"""
+The file name suffix of binary gaze recordings.
+"""
+
+HEADER_SIZE = 4096
+"""
+The size in bytes of the header block.
+"""
+
+COLUMN_ALIGNMENT = 64
+"""
+The alignment in bytes of the column offsets.
+"""
+
+_PREFIX = struct.Struct("<8sII")
+
+def _layout(dtype, count):
+    # the column descriptions and the end offset of the last column
+    columns = []
+    offset = HEADER_SIZE
+    for name in dtype.names:
+        field = dtype[name]
+        base = field.base if field.shape else field
+        columns.append({
+            "name": name,
+            "dtype": base.str,
+            "shape": list(field.shape),
+            "offset": offset
+        })
+        size = count * field.itemsize
+        offset += -(-size // COLUMN_ALIGNMENT) * COLUMN_ALIGNMENT
+    return (columns, offset)
+
+def _columnArray(buffer, column, count):
+    return np.ndarray((count, *column["shape"]), dtype=column["dtype"],
+            buffer=buffer, offset=column["offset"])
+
+def _finish(f, header, labels):
+    # the labels are appended after the columns, the header is written last
+    # such that an incomplete file is never recognized as valid
+    data = json.dumps(list(labels)).encode()
+    f.seek(header["labels"]["offset"])
+    f.write(data)
+    header["labels"]["length"] = len(data)
+    document = json.dumps(header).encode()
+    if _PREFIX.size + len(document) > HEADER_SIZE:
+        raise ValueError("the header exceeds the header block")
+    f.seek(0)
+    f.write(_PREFIX.pack(BINARY_MAGIC, BINARY_VERSION, len(document)))
+    f.write(document)
+
+def _estimatePeriod(timestamp):
+    if len(timestamp) < 2:
+        return None
+    return float(np.median(np.diff(timestamp)))
+
+def writeBinary(path, samples, labels=(), sample_period=None):
+    """
+    Write a recording to a binary file.
+
+    Parameters
+    ----------
+    path: str
+        the path to the binary file.
+    samples: numpy.ndarray
+        a structured array holding the recording, e.g. of type SAMPLE_DTYPE.
+    labels: iterable of str, optional
+        the labels indexed by the label codes of the recording.
+    sample_period: float, optional
+        the sample period in milliseconds. If omitted, the median interval of
+        the timestamp column is stored.
+    """
+    count = len(samples)
+    columns, end = _layout(samples.dtype, count)
+    if sample_period is None and "timestamp" in samples.dtype.names:
+        sample_period = _estimatePeriod(samples["timestamp"])
+    header = {
+        "count": count,
+        "sample_period": sample_period,
+        "columns": columns,
+        "labels": {"offset": end}
+    }
+    with open(path, "wb") as f:
+        f.write(bytes(HEADER_SIZE))
+        for column in columns:
+            f.seek(column["offset"])
+            f.write(np.ascontiguousarray(samples[column["name"]]).tobytes())
+        _finish(f, header, labels)
+
+def _countRows(path, delimiter):
+    # count the rows as parsed by GazepyCsvReader: quoted fields may span
+    # lines, blank rows are skipped and the first row holds the column names
+    with open(path, newline="") as csvfile:
+        rows = csv.reader(csvfile, delimiter=delimiter)
+        next(rows, None)
+        return sum(1 for row in rows if row)
+
+def convertCsv(csv_path, path, columns=COLUMNS_SAMPLE, sample_period=None,
+        chunk_size=65536, delimiter=","):
+    """
+    Convert a CSV file to a binary file. The CSV file is read in chunks which
+    are written directly into the memory-mapped columns of the binary file,
+    hence the memory consumption does not depend on the file size.
+
+    Parameters
+    ----------
+    csv_path: str
+        the path to the CSV file.
+    path: str
+        the path to the binary file.
+    columns: dict, optional
+        the column mapping (see GazepyCsvReader). Defaults to COLUMNS_SAMPLE.
+    sample_period: float, optional
+        the sample period in milliseconds. If omitted, the median interval of
+        the timestamp column is stored.
+    chunk_size: int, optional
+        the number of rows per chunk. Defaults to 65536.
+    delimiter: str, optional
+        the column delimiter of the CSV file. Defaults to ",".
+
+    Raises
+    ------
+    ValueError
+        if the CSV file changes during the conversion.
+    """
+    reader = GazepyCsvReader(csv_path, columns, chunk_size, delimiter)
+    count = _countRows(csv_path, delimiter)
+    layout, end = _layout(reader.dtype, count)
+    with open(path, "wb") as f:
+        f.truncate(end)
+    buffer = np.memmap(path, mode="r+") if end > 0 else None
+    idx = 0
+    try:
+        for chunk in reader:
+            stop = idx + len(chunk)
+            if stop > count:
+                raise ValueError(f"unexpected rows in {csv_path}")
+            for column in layout:
+                _columnArray(buffer, column, count)[idx:stop] = \
+                        chunk[column["name"]]
+            idx = stop
+        if idx != count:
+            raise ValueError(f"missing rows in {csv_path}")
+        if (sample_period is None and count > 0
+                and "timestamp" in reader.dtype.names):
+            column = next(column for column in layout
+                    if column["name"] == "timestamp")
+            sample_period = _estimatePeriod(_columnArray(buffer, column,
+                count))
+        if buffer is not None:
+            buffer.flush()
+    finally:
+        del buffer
+    header = {
+        "count": count,
+        "sample_period": sample_period,
+        "columns": layout,
+        "labels": {"offset": end}
+    }
+    with open(path, "r+b") as f:
+        _finish(f, header, reader.labels)
+
+class GazepyBinary():
+    """
+    A memory-mapped binary gaze recording. The columns are NumPy arrays
+    backed by the file, i.e. they are read-only and loaded on access by the
+    operating system. Columns can be passed to Gazepy.process() directly.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters
+        ----------
+        path: str
+            the path to the binary file.
+
+        Raises
+        ------
+        ValueError
+            if the file is not a binary gaze recording of a supported
+            version.
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            prefix = f.read(_PREFIX.size)
+            if len(prefix) < _PREFIX.size:
+                raise ValueError(f"{path} is not a binary gaze recording")
+            magic, version, length = _PREFIX.unpack(prefix)
+            if magic != BINARY_MAGIC:
+                raise ValueError(f"{path} is not a binary gaze recording")
+            if version != BINARY_VERSION:
+                raise ValueError(f"unsupported version {version} of {path}")
+            self.header = json.loads(f.read(length))
+            f.seek(self.header["labels"]["offset"])
+            self.labels = GazepyLabels(json.loads(
+                f.read(self.header["labels"]["length"])))
+        self.count = self.header["count"]
+        self.sample_period = self.header["sample_period"]
+        buffer = np.memmap(path, mode="r") if self.count > 0 else b""
+        self.columns = {}
+        for column in self.header["columns"]:
+            if self.count > 0:
+                array = _columnArray(buffer, column, self.count)
+            else:
+                array = np.empty((0, *column["shape"]), dtype=column["dtype"])
+            self.columns[column["name"]] = array
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def dtype(self):
+        """
+        The structured data type of the recording.
+        """
+        return np.dtype([(column["name"], column["dtype"],
+            tuple(column["shape"])) for column in self.header["columns"]])
+
+    def read(self):
+        """
+        Copy the whole recording into a structured array.
+
+        Returns
+        -------
+        numpy.ndarray
+            the structured array, e.g. of type SAMPLE_DTYPE.
+        """
+        res = np.empty(self.count, dtype=self.dtype)
+        for name, array in self.columns.items():
+            res[name] = array
+        return res
+
+def readBinary(path):
+    """
+    Read a whole binary file into a structured array.
+
+    Parameters
+    ----------
+    path: str
+        the path to the binary file.
+
+    Returns
+    -------
+    tuple
+        the structured array holding the recording and the label dictionary
+        (GazepyLabels) of the label codes.
+    """
+    recording = GazepyBinary(path)
+    return (recording.read(), recording.labels)
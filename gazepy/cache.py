@@ -0,0 +1,294 @@
+"""
+On-disk cache of preprocessed recordings. Reading a CSV file and filling gaps
+and filtering noise with the vectorized filters is done once per recording
+and gap and noise filter parameters. The preprocessed samples are stored as
+.npy files and loaded memory-mapped on later runs.
+
+An entry is keyed by the content hash of the source file and the gap and
+noise filter parameters. Hence, an entry is never used after the source
+file changed. The cache is bounded in size, the least recently used entries
+are evicted first.
+
+Many processes may share a cache directory. Entries are written to temporary
+files which are renamed once complete, and updates of the index of the
+source files are serialized through a lock file (on platforms providing
+fcntl).
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import time
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from . import vectorized
+from .gazepy import GazepyLabels, getFilterParameterDefault
+from .reader import COLUMNS_SAMPLE, GazepyCsvReader
+
+CACHE_VERSION = 2
+"""
+The version of the cache format. Entries of other versions are not used.
+"""
+
+_INDEX = "index.json"
+_LOCK = "index.lock"
+# the age in seconds after which a temporary file is left by a crashed writer
+_TMP_MAX_AGE = 3600
+
+def _fileHash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _paramsKey(params, columns):
+    # the parameters of a disabled filter do not change the result
+    gap = params.gap
+    noise = params.noise
+    gap_key = None
+    if gap.max_gap_length != 0:
+        gap_key = [gap.max_gap_length, gap.sample_period]
+    noise_key = None
+    if noise.mid_idx != 0:
+        noise_key = [noise.type, noise.mid_idx]
+    key = json.dumps([CACHE_VERSION, gap_key, noise_key, repr(columns)])
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+class GazepyCache():
+    """
+    A size-bounded cache of preprocessed recordings in a directory.
+    """
+
+    def __init__(self, directory, max_size=1 << 30):
+        """
+        Parameters
+        ----------
+        directory: str
+            the cache directory. It is created if it does not exist.
+        max_size: int, optional
+            the maximal size of all entries in bytes. Defaults to 1 GiB.
+        """
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    def __path(self, name):
+        return os.path.join(self.directory, name)
+
+    def __readIndex(self):
+        try:
+            with open(self.__path(_INDEX)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def __writeIndex(self, index):
+        self.__replace(_INDEX, lambda f: f.write(json.dumps(index).encode()))
+
+    @contextlib.contextmanager
+    def __lockIndex(self):
+        # serialize the read, modify and write cycles of the index of all
+        # processes sharing the cache directory
+        if fcntl is None:
+            yield
+            return
+        with open(self.__path(_LOCK), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def __replace(self, name, write):
+        # write to a temporary file first such that readers never see a
+        # partially written file
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, self.__path(name))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def __remove(self, prefix):
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix):
+                try:
+                    os.unlink(self.__path(name))
+                except FileNotFoundError:
+                    pass
+
+    def contentHash(self, path):
+        """
+        Get the content hash of a source file. The hash is only recomputed if
+        the size or the modification time of the file changed. The entries of
+        the previous content of the file are removed.
+
+        Parameters
+        ----------
+        path: str
+            the path to the source file.
+
+        Returns
+        -------
+        str
+            the hex digest of the SHA-256 hash of the file content.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        entry = self.__readIndex().get(path)
+        if (entry is not None and entry["size"] == stat.st_size
+                and entry["mtime_ns"] == stat.st_mtime_ns):
+            return entry["hash"]
+        # hash outside of the lock, other processes may update the index
+        # meanwhile
+        content_hash = _fileHash(path)
+        with self.__lockIndex():
+            index = self.__readIndex()
+            entry = index.get(path)
+            if entry is not None and entry["hash"] != content_hash and not any(
+                    item["hash"] == entry["hash"]
+                    for key, item in index.items() if key != path):
+                self.__remove(entry["hash"])
+            index[path] = {"size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns, "hash": content_hash}
+            self.__writeIndex(index)
+        return content_hash
+
+    def load(self, path, params=None, columns=COLUMNS_SAMPLE):
+        """
+        Load a preprocessed recording. On a cache miss the CSV file is read,
+        gaps are filled and noise is filtered with the vectorized filters and
+        the result is stored in the cache.
+
+        Parameters
+        ----------
+        path: str
+            the path to the CSV file.
+        params: GazepyFilterParameter, optional
+            the filter parameters. Only the gap and noise filter parameters
+            are used. Defaults to the defaults of the NumPy backend.
+        columns: dict, optional
+            the column mapping (see GazepyCsvReader). The result must be of
+            type SAMPLE_DTYPE. Defaults to COLUMNS_SAMPLE.
+
+        Returns
+        -------
+        tuple
+            the read-only memory-mapped sample array of type SAMPLE_DTYPE and
+            the label dictionary (GazepyLabels) of the label codes.
+        """
+        if params is None:
+            params = getFilterParameterDefault("numpy")
+        name = f"{self.contentHash(path)}-{_paramsKey(params, columns)}"
+        try:
+            samples = np.load(self.__path(name + ".npy"), mmap_mode="r")
+            with open(self.__path(name + ".json")) as f:
+                labels = GazepyLabels(json.load(f))
+        except (OSError, ValueError):
+            pass
+        else:
+            # the modification time marks the last use for the eviction
+            os.utime(self.__path(name + ".npy"))
+            return (samples, labels)
+
+        reader = GazepyCsvReader(path, columns)
+        samples = reader.read()
+        samples = vectorized.gapFilter(samples, params.gap.max_gap_length,
+                params.gap.sample_period)
+        samples = vectorized.noiseFilter(samples, params.noise.type,
+                params.noise.mid_idx)
+        self.__replace(name + ".json",
+                lambda f: f.write(json.dumps(list(reader.labels)).encode()))
+        self.__replace(name + ".npy",
+                lambda f: np.save(f, np.ascontiguousarray(samples)))
+        samples = np.load(self.__path(name + ".npy"), mmap_mode="r")
+        self.evict()
+        return (samples, reader.labels)
+
+    def size(self):
+        """
+        Get the size of all entries.
+
+        Returns
+        -------
+        int
+            the size in bytes.
+        """
+        return sum(os.path.getsize(self.__path(name))
+                for name in os.listdir(self.directory)
+                if name.endswith(".npy")
+                or (name.endswith(".json") and name != _INDEX))
+
+    def evict(self, max_size=None):
+        """
+        Remove the least recently used entries until the cache size is at
+        most max_size. Temporary files left by crashed writers are removed
+        as well.
+
+        Parameters
+        ----------
+        max_size: int, optional
+            the maximal cache size in bytes. Defaults to the size limit of the
+            cache.
+        """
+        if max_size is None:
+            max_size = self.max_size
+        entries = []
+        total = 0
+        stale = time.time() - _TMP_MAX_AGE
+        for name in os.listdir(self.directory):
+            if name.endswith(".tmp"):
+                try:
+                    if os.path.getmtime(self.__path(name)) < stale:
+                        os.unlink(self.__path(name))
+                except FileNotFoundError:
+                    pass
+                continue
+            if not name.endswith(".npy"):
+                continue
+            stat = os.stat(self.__path(name))
+            label_path = self.__path(name[:-4] + ".json")
+            size = stat.st_size
+            if os.path.exists(label_path):
+                size += os.path.getsize(label_path)
+            entries.append((stat.st_mtime_ns, size, name[:-4]))
+            total += size
+        for _, size, name in sorted(entries):
+            if total <= max_size:
+                break
+            self.__remove(name + ".")
+            total -= size
+
+    def invalidate(self, path=None):
+        """
+        Remove the entries of a source file or all entries.
+
+        Parameters
+        ----------
+        path: str, optional
+            the path to the source file. If omitted, the whole cache is
+            cleared.
+        """
+        with self.__lockIndex():
+            if path is None:
+                for name in os.listdir(self.directory):
+                    if name.endswith(".npy") or name.endswith(".json"):
+                        os.unlink(self.__path(name))
+                return
+            index = self.__readIndex()
+            entry = index.pop(os.path.abspath(path), None)
+            if entry is not None:
+                if not any(item["hash"] == entry["hash"]
+                        for item in index.values()):
+                    self.__remove(entry["hash"])
+                self.__writeIndex(index)
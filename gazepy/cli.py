@@ -0,0 +1,201 @@
+"""
+Command line interface to analyse many gaze recordings in parallel.
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import functools
+import os
+import sys
+
+from . import gazepy
+from .backend import BACKEND_ENV, getBackend, listBackends
+from .binary import BINARY_SUFFIX, GazepyBinary
+from .cache import GazepyCache
+from .reader import readCsv
+
+_params = None
+_backend = None
+_cache = None
+
+def _init(params, backend, cache_dir=None):
+    # the filter parameters are shared by all recordings of a worker
+    global _params, _backend, _cache
+    _params = params
+    _backend = backend
+    if cache_dir is not None:
+        _cache = GazepyCache(cache_dir)
+
+def _analyse(path, output_dir):
+    if path.endswith(BINARY_SUFFIX):
+        # the columns of binary recordings are memory-mapped, caching them
+        # gains nothing
+        data = GazepyBinary(path)
+        labels = data.labels
+        params = _params
+    elif _cache is None:
+        data, labels = readCsv(path)
+        params = _params
+    else:
+        # the cached samples are already gap and noise filtered
+        data, labels = _cache.load(path, _params)
+        params = gazepy.GazepyFilterParameter.from_buffer_copy(_params)
+        params.gap.max_gap_length = 0
+        params.noise.mid_idx = 0
+    # a new handle per recording such that no samples of the previous
+    # recording remain in the sample window
+    h = gazepy.Gazepy(params, _backend)
+    fixations, saccades = h.process(data["origin"], data["point"],
+            data["timestamp"], data["trial_id"], data["label"], labels,
+            data["screen_point"])
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if output_dir is None:
+        output_dir = os.path.dirname(path)
+    _writeCsv(os.path.join(output_dir, stem + "_fixations.csv"), fixations,
+            labels)
+    _writeCsv(os.path.join(output_dir, stem + "_saccades.csv"), saccades,
+            labels)
+    return (len(fixations), len(saccades))
+
+def _writeCsv(path, events, labels):
+    header = []
+    for name in events.dtype.names:
+        shape = events.dtype[name].shape
+        if shape:
+            header += [f"{name}_{axis}" for axis in "xyz"[:shape[0]]]
+        else:
+            header.append(name)
+    with open(path, "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(header)
+        for event in events.tolist():
+            row = []
+            for name, value in zip(events.dtype.names, event):
+                if name == "label":
+                    value = labels.decode(value)
+                if hasattr(value, "tolist"):
+                    # subarray fields are returned as arrays
+                    row += value.tolist()
+                else:
+                    row.append(value)
+            writer.writerow(row)
+
+def _parser():
+    parser = argparse.ArgumentParser(prog="gazepy",
+            description="Parse gaze recordings for fixations and saccades.")
+    parser.add_argument("files", nargs="+",
+            help="the CSV files (see example/sample.csv) or binary files"
+            f" ({BINARY_SUFFIX}, see gazepy.binary) to analyse")
+    parser.add_argument("-o", "--output-dir",
+            help="the directory to write the results to (default: the"
+            " directory of each input file)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+            help="the number of worker processes (default: the number of"
+            " CPUs)")
+    parser.add_argument("-q", "--quiet", action="store_true",
+            help="do not report the progress")
+    parser.add_argument("-b", "--backend", choices=listBackends(),
+            help="the gaze analysis backend (default: the environment"
+            f" variable {BACKEND_ENV} or the first available backend)")
+    parser.add_argument("--cache-dir",
+            help="cache the gap and noise filtered recordings in this"
+            " directory (numpy backend only)")
+    parser.add_argument("--max-gap-length", type=float,
+            help="the maximal gap length in milliseconds to fill in")
+    parser.add_argument("--sample-period", type=float,
+            help="the sample period in milliseconds")
+    parser.add_argument("--noise-type", type=int,
+            help="the noise filter type")
+    parser.add_argument("--noise-mid-idx", type=int,
+            help="the middle index of the noise filter window")
+    parser.add_argument("--velocity-threshold", type=float,
+            help="the saccade velocity threshold in degrees per second")
+    parser.add_argument("--duration-threshold", type=float,
+            help="the fixation duration threshold in milliseconds")
+    parser.add_argument("--dispersion-threshold", type=float,
+            help="the fixation dispersion threshold in degrees")
+    return parser
+
+def _filterParameter(args):
+    params = gazepy.getFilterParameterDefault(args.backend)
+    for value, group, name in (
+            (args.max_gap_length, params.gap, "max_gap_length"),
+            (args.sample_period, params.gap, "sample_period"),
+            (args.noise_type, params.noise, "type"),
+            (args.noise_mid_idx, params.noise, "mid_idx"),
+            (args.velocity_threshold, params.saccade, "velocity_threshold"),
+            (args.duration_threshold, params.fixation, "duration_threshold"),
+            (args.dispersion_threshold, params.fixation,
+                "dispersion_threshold")):
+        if value is not None:
+            setattr(group, name, value)
+    return params
+
+def main(argv=None):
+    """
+    Analyse gaze recordings in parallel. Each worker process parses a share of
+    the files with the same filter parameters. The results of each file are
+    written to the CSV files <name>_fixations.csv and <name>_saccades.csv.
+    Results are reported in the order of the input files. A file which fails
+    to be analysed is reported and does not stop the other files.
+
+    Parameters
+    ----------
+    argv: list of str, optional
+        the command line arguments. Defaults to sys.argv[1:].
+
+    Returns
+    -------
+    int
+        the exit status, 1 if any file failed and 0 otherwise.
+    """
+    args = _parser().parse_args(argv)
+    params = _filterParameter(args)
+    cache_dir = args.cache_dir
+    if cache_dir is not None and getBackend(args.backend) is not getBackend(
+            "numpy"):
+        # the cache holds samples preprocessed by the NumPy filters, the
+        # other backends filter the samples themselves
+        print("the cache is only used by the numpy backend, ignoring"
+                " --cache-dir", file=sys.stderr)
+        cache_dir = None
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    count = len(args.files)
+    jobs = max(1, min(args.jobs or 1, count))
+    if jobs == 1:
+        _init(params, args.backend, cache_dir)
+        executor = None
+        tasks = (functools.partial(_analyse, path, args.output_dir)
+                for path in args.files)
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(jobs,
+                initializer=_init, initargs=(params, args.backend, cache_dir))
+        futures = [executor.submit(_analyse, path, args.output_dir)
+                for path in args.files]
+        tasks = (future.result for future in futures)
+
+    failed = 0
+    try:
+        for idx, (path, task) in enumerate(zip(args.files, tasks)):
+            # a failing file is reported and the remaining files are still
+            # analysed
+            try:
+                fixations, saccades = task()
+            except Exception as e:
+                failed += 1
+                print(f"[{idx + 1}/{count}] {path}: error: {e}",
+                        file=sys.stderr)
+                continue
+            if not args.quiet:
+                print(f"[{idx + 1}/{count}] {path}: {fixations} fixations,"
+                        f" {saccades} saccades", file=sys.stderr)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    if failed:
+        print(f"{failed} of {count} files failed", file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,373 @@
+"""
+Columnar collection of detected fixations and saccades. Detections are
+appended field by field into growable NumPy columns instead of being kept as
+one Python object per event. The columns are exported as structured arrays of
+type FIXATION_DTYPE and SACCADE_DTYPE or as pandas DataFrames.
+"""
+
+import math
+import numpy as np
+
+from .vectorized import FIXATION_DTYPE, SACCADE_DTYPE
+
+STEP_FIXATION = 1
+"""
+The bit of the status returned by Gazepy.step() which is set if a fixation
+was detected.
+"""
+
+STEP_SACCADE = 2
+"""
+The bit of the status returned by Gazepy.step() which is set if a saccade was
+detected.
+"""
+
+def _direction(origin, point):
+    direction = [p - o for p, o in zip(point, origin)]
+    norm = math.sqrt(sum(c * c for c in direction))
+    if norm == 0:
+        return (math.nan, math.nan, math.nan)
+    return tuple(c / norm for c in direction)
+
+def saccadeAmplitude(first_origin, first_point, last_origin, last_point):
+    """
+    Compute the amplitude of a saccade.
+
+    Parameters
+    ----------
+    first_origin: sequence of float
+        the gaze origin of the first sample of the saccade.
+    first_point: sequence of float
+        the gaze point of the first sample of the saccade.
+    last_origin: sequence of float
+        the gaze origin of the last sample of the saccade.
+    last_point: sequence of float
+        the gaze point of the last sample of the saccade.
+
+    Returns
+    -------
+    float
+        the angle in degrees between the first and the last gaze direction.
+    """
+    ax, ay, az = _direction(first_origin, first_point)
+    bx, by, bz = _direction(last_origin, last_point)
+    cross = math.sqrt((ay * bz - az * by) ** 2 + (az * bx - ax * bz) ** 2
+            + (ax * by - ay * bx) ** 2)
+    return math.degrees(math.atan2(cross, ax * bx + ay * by + az * bz))
+
+class GazepyColumns():
+    """
+    Growable columns of a structured array type. Each field of the type is
+    stored in its own array, the arrays double their capacity when full.
+    """
+
+    def __init__(self, dtype, capacity=1024):
+        """
+        Parameters
+        ----------
+        dtype: numpy.dtype
+            the structured array type.
+        capacity: int, optional
+            the initial number of rows. Defaults to 1024.
+        """
+        self.dtype = np.dtype(dtype)
+        self.capacity = max(capacity, 1)
+        self.length = 0
+        self.columns = [np.zeros((self.capacity, *self.dtype[name].shape),
+            dtype=self.dtype[name].base) for name in self.dtype.names]
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, name):
+        return self.columns[self.dtype.names.index(name)][:self.length]
+
+    def reserve(self, count):
+        """
+        Make room for more rows.
+
+        Parameters
+        ----------
+        count: int
+            the number of rows to append.
+        """
+        required = self.length + count
+        if required <= self.capacity:
+            return
+        capacity = self.capacity
+        while capacity < required:
+            capacity *= 2
+        for idx, column in enumerate(self.columns):
+            grown = np.zeros((capacity, *column.shape[1:]), dtype=column.dtype)
+            grown[:self.length] = column[:self.length]
+            self.columns[idx] = grown
+        self.capacity = capacity
+
+    def append(self, *values):
+        """
+        Append a row.
+
+        Parameters
+        ----------
+        values: tuple
+            one value per field in the order of the fields of the type.
+        """
+        if self.length == self.capacity:
+            self.reserve(1)
+        idx = self.length
+        for column, value in zip(self.columns, values):
+            column[idx] = value
+        self.length += 1
+
+    def extend(self, rows):
+        """
+        Append many rows.
+
+        Parameters
+        ----------
+        rows: numpy.ndarray
+            a structured array holding the fields of the type.
+        """
+        count = len(rows)
+        self.reserve(count)
+        for name, column in zip(self.dtype.names, self.columns):
+            column[self.length:self.length + count] = rows[name]
+        self.length += count
+
+    def clear(self):
+        """
+        Remove all rows. The capacity is kept.
+        """
+        self.length = 0
+
+    def array(self):
+        """
+        Copy the rows into a structured array.
+
+        Returns
+        -------
+        numpy.ndarray
+            the structured array of the type of the columns.
+        """
+        res = np.empty(self.length, dtype=self.dtype)
+        for name, column in zip(self.dtype.names, self.columns):
+            res[name] = column[:self.length]
+        return res
+
+class GazepyEventCollector():
+    """
+    A collector of detected fixations and saccades. Events are appended to
+    growable columns (see GazepyColumns) and exported at once.
+    """
+
+    def __init__(self, capacity=1024):
+        """
+        Parameters
+        ----------
+        capacity: int, optional
+            the initial number of fixations and saccades. Defaults to 1024.
+        """
+        self.fixation_columns = GazepyColumns(FIXATION_DTYPE, capacity)
+        self.saccade_columns = GazepyColumns(SACCADE_DTYPE, capacity)
+
+    def __len__(self):
+        return len(self.fixation_columns) + len(self.saccade_columns)
+
+    def appendFixation(self, timestamp, duration, screen_point, point,
+            trial_id, label):
+        """
+        Append a fixation.
+
+        Parameters
+        ----------
+        timestamp: float
+            the timestamp of the first sample in milliseconds.
+        duration: float
+            the duration in milliseconds.
+        screen_point: sequence of float
+            the mean 2d screen gaze point.
+        point: sequence of float
+            the mean 3d gaze point.
+        trial_id: int
+            the trial ID.
+        label: int
+            the label code.
+        """
+        self.fixation_columns.append(timestamp, duration, screen_point, point,
+                trial_id, label)
+
+    def appendSaccade(self, first_timestamp, last_timestamp,
+            first_screen_point, first_point, first_origin, last_screen_point,
+            last_point, last_origin, trial_id, label):
+        """
+        Append a saccade.
+
+        Parameters
+        ----------
+        first_timestamp: float
+            the timestamp of the first sample in milliseconds.
+        last_timestamp: float
+            the timestamp of the last sample in milliseconds.
+        first_screen_point: sequence of float
+            the 2d screen gaze point of the first sample.
+        first_point: sequence of float
+            the 3d gaze point of the first sample.
+        first_origin: sequence of float
+            the gaze origin of the first sample.
+        last_screen_point: sequence of float
+            the 2d screen gaze point of the last sample.
+        last_point: sequence of float
+            the 3d gaze point of the last sample.
+        last_origin: sequence of float
+            the gaze origin of the last sample.
+        trial_id: int
+            the trial ID.
+        label: int
+            the label code.
+        """
+        self.saccade_columns.append(first_timestamp,
+                last_timestamp - first_timestamp, first_screen_point,
+                first_point, last_screen_point, last_point, trial_id, label,
+                saccadeAmplitude(first_origin, first_point, last_origin,
+                    last_point))
+
+    def add(self, event):
+        """
+        Append a fixation or saccade record as returned by
+        Gazepy.fixationFilter() and Gazepy.saccadeFilter().
+
+        Parameters
+        ----------
+        event: GazepyFixationRecord, GazepySaccadeRecord, None
+            the detected event. None is ignored.
+        """
+        if event is None:
+            return
+        if not hasattr(event, "last_sample"):
+            sample = event.first_sample
+            self.appendFixation(sample.timestamp, event.duration,
+                    event.screen_point, event.point, sample.trial_id,
+                    sample.label)
+        else:
+            first = event.first_sample
+            last = event.last_sample
+            self.appendSaccade(first.timestamp, last.timestamp,
+                    first.screen_point, first.point, first.origin,
+                    last.screen_point, last.point, last.origin,
+                    first.trial_id, first.label)
+
+    def extend(self, fixations=None, saccades=None):
+        """
+        Append the events of a whole recording, e.g. as returned by
+        Gazepy.process().
+
+        Parameters
+        ----------
+        fixations: numpy.ndarray, optional
+            the fixations of type FIXATION_DTYPE.
+        saccades: numpy.ndarray, optional
+            the saccades of type SACCADE_DTYPE.
+        """
+        if fixations is not None:
+            self.fixation_columns.extend(fixations)
+        if saccades is not None:
+            self.saccade_columns.extend(saccades)
+
+    def clear(self):
+        """
+        Remove all events.
+        """
+        self.fixation_columns.clear()
+        self.saccade_columns.clear()
+
+    def fixations(self):
+        """
+        Export the fixations.
+
+        Returns
+        -------
+        numpy.ndarray
+            the fixations of type FIXATION_DTYPE.
+        """
+        return self.fixation_columns.array()
+
+    def saccades(self):
+        """
+        Export the saccades.
+
+        Returns
+        -------
+        numpy.ndarray
+            the saccades of type SACCADE_DTYPE.
+        """
+        return self.saccade_columns.array()
+
+    def fixationFrame(self, labels=None):
+        """
+        Export the fixations as DataFrame (see eventFrame()).
+
+        Parameters
+        ----------
+        labels: GazepyLabels, list of str, optional
+            the labels indexed by the label codes.
+
+        Returns
+        -------
+        pandas.DataFrame
+            the fixations.
+        """
+        return eventFrame(self.fixation_columns, labels)
+
+    def saccadeFrame(self, labels=None):
+        """
+        Export the saccades as DataFrame (see eventFrame()).
+
+        Parameters
+        ----------
+        labels: GazepyLabels, list of str, optional
+            the labels indexed by the label codes.
+
+        Returns
+        -------
+        pandas.DataFrame
+            the saccades.
+        """
+        return eventFrame(self.saccade_columns, labels)
+
+def eventFrame(events, labels=None):
+    """
+    Convert fixations or saccades to a pandas DataFrame. Each vector field
+    is split into one column per axis, e.g. point_x, point_y and point_z. The
+    columns onset and offset hold the timestamps of the first and the last
+    sample. Requires pandas.
+
+    Parameters
+    ----------
+    events: numpy.ndarray, GazepyColumns
+        the fixations (FIXATION_DTYPE) or the saccades (SACCADE_DTYPE).
+    labels: GazepyLabels, list of str, optional
+        the labels indexed by the label codes. If given, the label column is
+        categorical, otherwise it holds the label codes.
+
+    Returns
+    -------
+    pandas.DataFrame
+        the events.
+    """
+    import pandas as pd
+
+    data = {}
+    for name in events.dtype.names:
+        column = events[name]
+        if name == "timestamp":
+            data["onset"] = column
+            data["offset"] = column + events["duration"]
+        elif name == "label" and labels is not None:
+            data[name] = pd.Categorical.from_codes(column,
+                    categories=list(labels))
+        elif column.ndim > 1:
+            for axis, values in zip("xyz", column.T):
+                data[f"{name}_{axis}"] = values
+        else:
+            data[name] = column
+    return pd.DataFrame(data, copy=True)
@@ -0,0 +1,78 @@
+"""
+Running extrema of values in a sliding window.
+"""
+
+from collections import deque
+
+class GazepyRunningExtrema():
+    """
+    The running minima and maxima of vectors in a sliding window. Each vector
+    is pushed with a monotonically increasing index and leaves the window
+    through evict(). The extrema are kept in monotonic deques such that each
+    operation costs amortized O(1), independent of the window length.
+    """
+
+    def __init__(self, size):
+        """
+        Parameters
+        ----------
+        size: int
+            the number of components of a vector.
+        """
+        self.maxima = [deque() for _ in range(size)]
+        self.minima = [deque() for _ in range(size)]
+
+    def clear(self):
+        """
+        Remove all vectors from the window.
+        """
+        for queue in self.maxima + self.minima:
+            queue.clear()
+
+    def evict(self, idx):
+        """
+        Remove all vectors pushed with an index lower than idx.
+
+        Parameters
+        ----------
+        idx: int
+            the index of the first vector in the window.
+        """
+        for queue in self.maxima + self.minima:
+            while queue and queue[0][0] < idx:
+                queue.popleft()
+
+    def push(self, idx, values):
+        """
+        Add a vector to the window.
+
+        Parameters
+        ----------
+        idx: int
+            the index of the vector. The index must be larger than the index
+            of any vector pushed before.
+        values: sequence of float
+            the vector components.
+        """
+        for value, maxima, minima in zip(values, self.maxima, self.minima):
+            while maxima and maxima[-1][1] <= value:
+                maxima.pop()
+            maxima.append((idx, value))
+            while minima and minima[-1][1] >= value:
+                minima.pop()
+            minima.append((idx, value))
+
+    def range(self):
+        """
+        Get the range of each vector component in the window.
+
+        Returns
+        -------
+        list of float, None
+            the difference between the maximum and the minimum of each
+            component or None if the window is empty.
+        """
+        if not self.maxima[0]:
+            return None
+        return [maxima[0][1] - minima[0][1]
+                for maxima, minima in zip(self.maxima, self.minima)]
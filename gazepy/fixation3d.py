@@ -0,0 +1,655 @@
+"""
+Streaming detection of gaze fixations in 3d space from head poses. The
+detectors implement the static and the dynamic approach of
+scripts/gaze_analysis_3d.py. Instead of recomputing the dispersion of the
+whole window for each sample, the detectors maintain running sums and running
+extrema which are updated as samples enter and leave the window. Hence, the
+cost per sample does not depend on the length of a fixation.
+
+For offline analysis fixationStaticFilter() and fixationDynamicFilter()
+evaluate the approaches on a whole recording.
+"""
+
+from collections import deque
+import math
+import numpy as np
+
+from .extrema import GazepyRunningExtrema
+from .jit import isJitEnabled, kernel
+from .quaternion import quaternionMeanFromSum, quaternionMeanWindows
+
+def gazeDirection(orientation):
+    """
+    Compute the gaze direction of a head pose. The gaze direction is the x
+    axis rotated by the head orientation.
+
+    Parameters
+    ----------
+    orientation: sequence of float
+        the unit quaternion (w, x, y, z) of the head orientation.
+
+    Returns
+    -------
+    tuple of float
+        the x, y, and z components of the unit gaze vector.
+    """
+    qw, qx, qy, qz = orientation
+    return (1 - 2 * (qy * qy + qz * qz), 2 * (qx * qy + qw * qz),
+            2 * (qx * qz - qw * qy))
+
+def nearestPoint(p1, d1, p2, d2):
+    """
+    Compute the point halfway between the nearest points of two gaze rays.
+
+    Parameters
+    ----------
+    p1: sequence of float
+        the origin of the first gaze ray.
+    d1: sequence of float
+        the direction of the first gaze ray.
+    p2: sequence of float
+        the origin of the second gaze ray.
+    d2: sequence of float
+        the direction of the second gaze ray.
+
+    Returns
+    -------
+    tuple of float, None
+        the x, y, and z coordinates of the point or None if the rays are
+        parallel.
+    """
+    n = _cross(d1, d2)
+    n1 = _cross(d1, n)
+    n2 = _cross(d2, n)
+    den1 = _dot(d1, n2)
+    den2 = _dot(d2, n1)
+    if den1 == 0 or den2 == 0:
+        return None
+    s1 = _dot(_sub(p2, p1), n2) / den1
+    s2 = _dot(_sub(p1, p2), n1) / den2
+    return tuple(((a1 + s1 * b1) + (a2 + s2 * b2)) / 2
+            for a1, b1, a2, b2 in zip(p1, d1, p2, d2))
+
+def _cross(a, b):
+    return (a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2],
+            a[0] * b[1] - a[1] * b[0])
+
+def _dot(a, b):
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+def _sub(a, b):
+    return (a[0] - b[0], a[1] - b[1], a[2] - b[2])
+
+FIXATION3D_DTYPE = np.dtype([
+        ("timestamp", np.float64),
+        ("duration", np.float64),
+        ("sample_count", np.uint32),
+        ("position", np.float64, (3,)),
+        ("orientation", np.float64, (4,)),
+        ("point", np.float64, (3,))
+])
+"""
+The structured array type of the fixations returned by
+fixationStaticFilter() and fixationDynamicFilter(). The fields correspond to
+the fields of GazepyFixation3d, the point of static fixations is nan.
+"""
+
+class GazepyFixation3d():
+    """
+    A 3d fixation data structure.
+    """
+    __slots__ = ("timestamp", "duration", "sample_count", "position",
+            "orientation", "point")
+
+    def __init__(self, timestamp, duration, sample_count, position,
+            orientation, point=None):
+        """
+        Parameters
+        ----------
+        timestamp: float
+            the timestamp of the first sample of the fixation in milliseconds.
+        duration: float
+            the duration of the fixation in milliseconds.
+        sample_count: int
+            the number of samples of the fixation.
+        position: numpy.ndarray
+            the mean head position.
+        orientation: numpy.ndarray
+            the mean head orientation as unit quaternion (w, x, y, z).
+        point: numpy.ndarray, optional
+            the mean gaze ray intersection point. Only set by the dynamic
+            fixation filter.
+        """
+        self.timestamp = timestamp
+        self.duration = duration
+        self.sample_count = sample_count
+        self.position = position
+        self.orientation = orientation
+        self.point = point
+
+class _GazepyWindowEntry():
+    __slots__ = ("idx", "timestamp", "position", "orientation", "direction",
+            "point")
+
+    def __init__(self, idx, timestamp, position, orientation, direction):
+        self.idx = idx
+        self.timestamp = timestamp
+        self.position = position
+        self.orientation = orientation
+        self.direction = direction
+        self.point = None
+
+class _GazepyFilterFixation3d():
+    """
+    The window state machine shared by the 3d fixation filters. The window
+    grows until the duration threshold is reached. While the dispersion is
+    below the threshold the window keeps growing, otherwise it is either
+    reported as fixation or the oldest sample is dropped.
+    """
+
+    def __init__(self, dispersion_threshold, duration_threshold):
+        """
+        Parameters
+        ----------
+        dispersion_threshold: float
+            the dispersion threshold in degrees.
+        duration_threshold: float
+            the duration threshold in milliseconds.
+        """
+        # the dispersion is measured as chord length on the unit sphere
+        self.dispersion_threshold = 2 * math.sin(
+                math.radians(dispersion_threshold) / 2)
+        self.duration_threshold = duration_threshold
+        self.window = deque()
+        self.extrema = GazepyRunningExtrema(3)
+        self.is_collecting = False
+        self.idx = 0
+        self.position_sum = np.zeros(3)
+        self.orientation_sum = np.zeros((4, 4))
+
+    def filter(self, position, orientation, timestamp):
+        """
+        Parse for fixations. The filter maintains its own sample window.
+
+        Parameters
+        ----------
+        position: sequence of float
+            the x, y, and z coordinates of the head position.
+        orientation: sequence of float
+            the quaternion (w, x, y, z) of the head orientation.
+        timestamp: float
+            the timestamp of the sample in milliseconds.
+
+        Returns
+        -------
+        GazepyFixation3d, None
+            If a fixation was detected a fixation structure is returned. If
+            no fixation was detected or a fixation is still ongoing, None is
+            returned.
+        """
+        norm = math.sqrt(sum(q * q for q in orientation))
+        orientation = tuple(q / norm for q in orientation)
+        position = tuple(position)
+        entry = _GazepyWindowEntry(self.idx, timestamp, position, orientation,
+                gazeDirection(orientation))
+        self.idx += 1
+        self._push(entry)
+        self.window.append(entry)
+
+        if timestamp - self.window[0].timestamp < self.duration_threshold:
+            return None
+
+        if self._dispersion() <= self.dispersion_threshold:
+            self.is_collecting = True
+        elif self.is_collecting:
+            # the sample breaking the fixation is not part of the fixation
+            self.window.pop()
+            self._remove(entry)
+            fixation = self._fixation()
+            self.reset()
+            return fixation
+        else:
+            first = self.window.popleft()
+            self._remove(first)
+            self._evict(first)
+
+        return None
+
+    def reset(self):
+        """
+        Remove all samples from the window.
+        """
+        self.window.clear()
+        self.extrema.clear()
+        self.is_collecting = False
+        self.position_sum[:] = 0
+        self.orientation_sum[:] = 0
+
+    def _push(self, entry):
+        self.position_sum += entry.position
+        # the outer product is invariant to the sign of the quaternion
+        self.orientation_sum += np.outer(entry.orientation, entry.orientation)
+
+    def _remove(self, entry):
+        self.position_sum -= entry.position
+        self.orientation_sum -= np.outer(entry.orientation, entry.orientation)
+
+    def _evict(self, entry):
+        self.extrema.evict(entry.idx + 1)
+
+    def _dispersion(self):
+        extent = self.extrema.range()
+        if extent is None:
+            return math.inf
+        return math.sqrt(sum(e * e for e in extent))
+
+    def _fixation(self):
+        count = len(self.window)
+        first = self.window[0]
+        orientation = quaternionMeanFromSum(self.orientation_sum)
+        return GazepyFixation3d(first.timestamp,
+                self.window[-1].timestamp - first.timestamp, count,
+                self.position_sum / count, orientation)
+
+class GazepyFilterFixationStatic(_GazepyFilterFixation3d):
+    """
+    The static 3d fixation filter. Finds gaze rays pointing in the same
+    direction, independent of the head position. The dispersion is the
+    diagonal of the bounding box of the unit gaze vectors in the window.
+    """
+
+    def _push(self, entry):
+        super()._push(entry)
+        self.extrema.push(entry.idx, entry.direction)
+
+class GazepyFilterFixationDynamic(_GazepyFilterFixation3d):
+    """
+    The dynamic 3d fixation filter. Finds consecutive gaze rays which
+    intersect close to each other. The nearest point of each pair of
+    consecutive gaze rays is scaled by its distance to the head position and
+    the dispersion is the diagonal of the bounding box of the scaled points in
+    the window. Pairs of parallel gaze rays are ignored.
+    """
+
+    def __init__(self, dispersion_threshold, duration_threshold):
+        """
+        Parameters
+        ----------
+        dispersion_threshold: float
+            the dispersion threshold in degrees.
+        duration_threshold: float
+            the duration threshold in milliseconds.
+        """
+        super().__init__(dispersion_threshold, duration_threshold)
+        self.point_sum = np.zeros(3)
+        self.point_count = 0
+
+    def reset(self):
+        super().reset()
+        self.point_sum[:] = 0
+        self.point_count = 0
+
+    def _push(self, entry):
+        super()._push(entry)
+        if not self.window:
+            return
+        last = self.window[-1]
+        point = nearestPoint(last.position, last.direction, entry.position,
+                entry.direction)
+        if point is None:
+            return
+        entry.point = point
+        self.point_sum += point
+        self.point_count += 1
+        dist = math.dist(point, entry.position)
+        self.extrema.push(entry.idx, [c * dist for c in point])
+
+    def _remove(self, entry):
+        super()._remove(entry)
+        self._removePoint(entry)
+
+    def _removePoint(self, entry):
+        # the pair of a sample and its predecessor is stored with the sample
+        if entry.point is not None:
+            self.point_sum -= entry.point
+            self.point_count -= 1
+            entry.point = None
+
+    def _evict(self, entry):
+        # the pair of the dropped sample and its successor leaves the window
+        if self.window:
+            first = self.window[0]
+            self._removePoint(first)
+            self.extrema.evict(first.idx + 1)
+
+    def _fixation(self):
+        fixation = super()._fixation()
+        if self.point_count > 0:
+            fixation.point = self.point_sum / self.point_count
+        return fixation
+
+def _gazeDirections(orientation):
+    qw, qx, qy, qz = orientation.T
+    return np.stack((1 - 2 * (qy * qy + qz * qz), 2 * (qx * qy + qw * qz),
+            2 * (qx * qz - qw * qy)), axis=1)
+
+def _nearestPoints(p1, d1, p2, d2):
+    n = np.cross(d1, d2)
+    n1 = np.cross(d1, n)
+    n2 = np.cross(d2, n)
+    den1 = np.einsum("ij,ij->i", d1, n2)
+    den2 = np.einsum("ij,ij->i", d2, n1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        s1 = np.einsum("ij,ij->i", p2 - p1, n2) / den1
+        s2 = np.einsum("ij,ij->i", p1 - p2, n1) / den2
+    c = ((p1 + s1[:, np.newaxis] * d1) + (p2 + s2[:, np.newaxis] * d2)) / 2
+    c[(den1 == 0) | (den2 == 0)] = np.nan
+    return c
+
+def _slidingMax(values, length):
+    # The maximum of each window of the given length along the first axis
+    # (van Herk/Gil-Werman): the array is split into blocks of the window
+    # length and each window spans the suffix of one block and the prefix of
+    # the next. NaN values are ignored.
+    count = len(values) - length + 1
+    blocks = -(-len(values) // length)
+    padded = np.full((blocks * length,) + values.shape[1:], np.nan)
+    padded[:len(values)] = values
+    padded = padded.reshape((blocks, length) + values.shape[1:])
+    prefix = np.fmax.accumulate(padded, axis=1).reshape(-1, *values.shape[1:])
+    suffix = np.fmax.accumulate(padded[:, ::-1], axis=1)[:, ::-1].reshape(
+            -1, *values.shape[1:])
+    return np.fmax(suffix[:count], prefix[length - 1:length - 1 + count])
+
+def _fixations(position, orientation, timestamp, first, last, point=None,
+        is_valid=None):
+    # the fixations spanning the samples first..last, the pair j holds the
+    # gaze rays of the samples j and j + 1
+    res = np.zeros(len(first), dtype=FIXATION3D_DTYPE)
+    res["point"] = np.nan
+    if len(first) == 0:
+        return res
+    first = np.asarray(first)
+    last = np.asarray(last)
+    res["timestamp"] = timestamp[first]
+    res["duration"] = timestamp[last] - timestamp[first]
+    res["sample_count"] = last - first + 1
+
+    def windowSum(values, first, last):
+        acc = np.zeros((len(values) + 1,) + values.shape[1:])
+        np.cumsum(values, axis=0, out=acc[1:])
+        return acc[last + 1] - acc[first]
+
+    res["position"] = windowSum(position, first, last) / res["sample_count"][
+            :, np.newaxis]
+    res["orientation"] = quaternionMeanWindows(orientation, first, last)
+    if point is not None:
+        # the pairs within the fixation are first..last - 1
+        point_sum = windowSum(np.where(is_valid[:, np.newaxis], point, 0),
+                first, last - 1)
+        point_count = windowSum(is_valid.astype(np.float64), first, last - 1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            res["point"] = point_sum / point_count[:, np.newaxis]
+    return res
+
+@kernel
+def _fixation3dKernel(timestamp, extrema, is_valid, pair_offset,
+        dispersion_threshold, duration_threshold, index, head, tail, onset,
+        offset):
+    # The window state machine of _GazepyFilterFixation3d. The window spans
+    # the samples start..i, the values of the samples start + pair_offset..i
+    # are in the running extrema. The rows of extrema hold the x, y and z
+    # components of the values followed by the negated components, such that
+    # the running maxima of the rows yield the maxima and minima. Invalid
+    # values are not pushed. The deques are stored as in _fixationKernel of
+    # gazepy.vectorized.
+    count = 0
+    start = 0
+    is_collecting = False
+    for i in range(len(timestamp)):
+        if is_valid[i]:
+            for k in range(6):
+                values = extrema[k]
+                queue = index[k]
+                value = values[i]
+                while tail[k] > head[k] and values[queue[tail[k] - 1]] <= value:
+                    tail[k] -= 1
+                queue[tail[k]] = i
+                tail[k] += 1
+
+        if timestamp[i] - timestamp[start] < duration_threshold:
+            continue
+
+        # the window without values has an infinite dispersion
+        is_dispersed = False
+        dispersion = 0.0
+        for k in range(3):
+            for m in (k, k + 3):
+                queue = index[m]
+                while head[m] < tail[m] and queue[head[m]] < start + pair_offset:
+                    head[m] += 1
+                if head[m] == tail[m]:
+                    is_dispersed = True
+            if not is_dispersed:
+                extent = (extrema[k][index[k][head[k]]]
+                        + extrema[k + 3][index[k + 3][head[k + 3]]])
+                dispersion += extent * extent
+
+        if not is_dispersed and math.sqrt(dispersion) <= dispersion_threshold:
+            is_collecting = True
+        elif is_collecting:
+            onset[count] = start
+            offset[count] = i - 1
+            count += 1
+            is_collecting = False
+            # the sample breaking the fixation is dropped
+            start = i + 1
+            for k in range(6):
+                head[k] = tail[k]
+        else:
+            start += 1
+
+    return count
+
+def _fixationIndices3d(timestamp, values, is_valid, pair_offset,
+        dispersion_threshold, duration_threshold):
+    count = len(timestamp)
+    extrema = np.concatenate((values.T, -values.T))
+    threshold = 2 * math.sin(math.radians(dispersion_threshold) / 2)
+    if isJitEnabled():
+        timestamp = np.ascontiguousarray(timestamp, dtype=np.float64)
+        extrema = np.ascontiguousarray(extrema, dtype=np.float64)
+        index = np.zeros((6, count), dtype=np.intp)
+        head = np.zeros(6, dtype=np.intp)
+        tail = np.zeros(6, dtype=np.intp)
+        onset = np.zeros(count // 2 + 1, dtype=np.intp)
+        offset = np.zeros(count // 2 + 1, dtype=np.intp)
+    else:
+        # python scalars are considerably faster to iterate than numpy scalars
+        timestamp = timestamp.tolist()
+        extrema = extrema.tolist()
+        is_valid = is_valid.tolist()
+        index = [[0] * count for _ in range(6)]
+        head = [0] * 6
+        tail = [0] * 6
+        onset = [0] * (count // 2 + 1)
+        offset = [0] * (count // 2 + 1)
+    found = _fixation3dKernel(timestamp, extrema, is_valid, pair_offset,
+            threshold, float(duration_threshold), index, head, tail, onset,
+            offset)
+    return (np.array(onset[:found], dtype=np.intp),
+            np.array(offset[:found], dtype=np.intp))
+
+def _poses(position, orientation, timestamp):
+    position = np.asarray(position, dtype=np.float64)
+    orientation = np.asarray(orientation, dtype=np.float64)
+    orientation = orientation / np.linalg.norm(orientation, axis=1,
+            keepdims=True)
+    timestamp = np.asarray(timestamp, dtype=np.float64)
+    return (position, orientation, timestamp)
+
+def fixationStaticFilter(position, orientation, timestamp,
+        dispersion_threshold, duration_threshold):
+    """
+    Parse a whole recording for static 3d fixations. This yields the same
+    fixations as feeding the recording sample by sample to
+    GazepyFilterFixationStatic. The window state machine is compiled if
+    Numba is installed (see gazepy.jit).
+
+    Parameters
+    ----------
+    position: numpy.ndarray
+        an array of shape (N, 3) holding the head positions.
+    orientation: numpy.ndarray
+        an array of shape (N, 4) holding the head orientation quaternions
+        (w, x, y, z).
+    timestamp: numpy.ndarray
+        an array of shape (N,) holding the timestamps in milliseconds.
+    dispersion_threshold: float
+        the dispersion threshold in degrees.
+    duration_threshold: float
+        the duration threshold in milliseconds.
+
+    Returns
+    -------
+    numpy.ndarray
+        the detected fixations of type FIXATION3D_DTYPE.
+    """
+    position, orientation, timestamp = _poses(position, orientation,
+            timestamp)
+    direction = _gazeDirections(orientation)
+    first, last = _fixationIndices3d(timestamp, direction,
+            np.ones(len(timestamp), dtype=np.bool_), 0, dispersion_threshold,
+            duration_threshold)
+    return _fixations(position, orientation, timestamp, first, last)
+
+def _dynamicPoints(position, orientation):
+    # the nearest points of the pairs of consecutive gaze rays and the points
+    # scaled by their distance to the head position
+    direction = _gazeDirections(orientation)
+    point = _nearestPoints(position[:-1], direction[:-1], position[1:],
+            direction[1:])
+    scaled = point * np.linalg.norm(point - position[1:], axis=1,
+            keepdims=True)
+    return (point, scaled, ~np.isnan(point[:, 0]))
+
+def _fixationDynamicWindows(position, orientation, timestamp,
+        dispersion_threshold, duration_threshold):
+    if len(timestamp) < 2:
+        return _fixations(position, orientation, timestamp, [], [])
+    point, scaled, is_valid = _dynamicPoints(position, orientation)
+    # the value of the pair j is stored with its second sample j + 1
+    values = np.vstack((np.zeros((1, 3)), scaled))
+    first, last = _fixationIndices3d(timestamp, values,
+            np.concatenate(([False], is_valid)), 1, dispersion_threshold,
+            duration_threshold)
+    return _fixations(position, orientation, timestamp, first, last, point,
+            is_valid)
+
+def fixationDynamicFilter(position, orientation, timestamp,
+        dispersion_threshold, duration_threshold, sample_period=None):
+    """
+    Parse a whole recording for dynamic 3d fixations. This yields the same
+    fixations as feeding the recording sample by sample to
+    GazepyFilterFixationDynamic.
+
+    The nearest points of all pairs of consecutive gaze rays are computed
+    once. If the recording is sampled at a constant sample period, the
+    dispersion of all windows of minimal duration is then evaluated at once
+    from running extrema of the nearest points, and fixations are grown with
+    cumulative extrema. Only the fixations are iterated, not the samples.
+    Otherwise, the window state machine iterates the samples. It is compiled
+    if Numba is installed (see gazepy.jit).
+
+    Parameters
+    ----------
+    position: numpy.ndarray
+        an array of shape (N, 3) holding the head positions.
+    orientation: numpy.ndarray
+        an array of shape (N, 4) holding the head orientation quaternions
+        (w, x, y, z).
+    timestamp: numpy.ndarray
+        an array of shape (N,) holding the timestamps in milliseconds.
+    dispersion_threshold: float
+        the dispersion threshold in degrees.
+    duration_threshold: float
+        the duration threshold in milliseconds.
+    sample_period: float, optional
+        the constant sample period in milliseconds. If omitted, the
+        timestamps may be irregular.
+
+    Returns
+    -------
+    numpy.ndarray
+        the detected fixations of type FIXATION3D_DTYPE.
+    """
+    position, orientation, timestamp = _poses(position, orientation,
+            timestamp)
+    if sample_period is None:
+        return _fixationDynamicWindows(position, orientation, timestamp,
+                dispersion_threshold, duration_threshold)
+    threshold = 2 * np.sin(np.radians(dispersion_threshold) / 2)
+    # the number of samples spanning the duration threshold
+    length = max(int(np.ceil(duration_threshold / sample_period - 1e-9)), 0) + 1
+    count = len(timestamp)
+    if count < max(length, 2):
+        return _fixations(position, orientation, timestamp, [], [])
+
+    # the pair j holds the gaze rays of the samples j and j + 1
+    point, scaled, is_valid = _dynamicPoints(position, orientation)
+
+    # the dispersion of the windows of minimal length starting at each sample
+    if length > 1:
+        extent = (_slidingMax(scaled, length - 1)
+                + _slidingMax(-scaled, length - 1))
+        with np.errstate(invalid="ignore"):
+            is_fixation = np.linalg.norm(extent, axis=1) <= threshold
+    else:
+        # a single sample holds no pair and is never a fixation
+        is_fixation = np.zeros(count, dtype=bool)
+    candidates = np.flatnonzero(is_fixation)
+
+    fixations = []
+    start = 0
+    while True:
+        # the next window of minimal length below the dispersion threshold
+        idx = np.searchsorted(candidates, start)
+        if idx == len(candidates):
+            break
+        start = candidates[idx]
+        # grow the window with the cumulative extrema of the following pairs
+        stop = None
+        pair = start
+        hi = np.full(3, -np.inf)
+        lo = np.full(3, np.inf)
+        chunk = 4 * length
+        while pair < count - 1:
+            block = scaled[pair:pair + chunk]
+            block_hi = np.fmax.accumulate(np.vstack((hi, block)))[1:]
+            block_lo = np.fmin.accumulate(np.vstack((lo, block)))[1:]
+            with np.errstate(invalid="ignore"):
+                is_dispersed = np.linalg.norm(block_hi - block_lo,
+                        axis=1) > threshold
+            # windows shorter than the minimal length are not evaluated
+            is_dispersed[:max(length - 2 - (pair - start), 0)] = False
+            hits = np.flatnonzero(is_dispersed)
+            if len(hits) > 0:
+                stop = pair + hits[0]
+                break
+            hi = block_hi[-1]
+            lo = block_lo[-1]
+            pair += len(block)
+            chunk *= 2
+        if stop is None:
+            # the fixation is still ongoing at the end of the recording
+            break
+        # the fixation spans the samples start..stop, the sample stop + 1
+        # broke the fixation and is dropped
+        fixations.append((start, stop))
+        start = stop + 2
+
+    if len(fixations) == 0:
+        return _fixations(position, orientation, timestamp, [], [])
+    first, last = np.array(fixations).T
+    return _fixations(position, orientation, timestamp, first, last, point,
+            is_valid)
@@ -3,9 +3,16 @@ Python bindings for the C library libgac.
 """
 
 from ctypes import *
+import numpy as np
 import platform
 import os
 
+from .backend import getBackend
+from .events import (GazepyEventCollector, STEP_FIXATION, STEP_SACCADE,
+        saccadeAmplitude)
+from .stats import GazepyStats
+from .vectorized import FIXATION_DTYPE, SACCADE_DTYPE
+
 class GazepyFilterParameterGap(Structure):
     """
     The paramters to configure the gap filter.
@@ -70,7 +77,9 @@ class GazepySample(Structure):
 
 class GazepyFixation(Structure):
     """
-    A fixation data structure.
+    A fixation data structure. The structure is filled by libgac and may hold
+    memory allocated by libgac which must be released with
+    gac_fixation_destroy() before the structure is filled again.
     """
     _fields_ = [
             ("is_heap", c_bool),
@@ -80,13 +89,11 @@ class GazepyFixation(Structure):
             ("first_sample", GazepySample)
     ]
 
-    def __del__(self):
-        gazepy_lib.gac.gac_fixation_destroy(byref(self))
-
-
 class GazepySaccade(Structure):
     """
-    A saccade data structure.
+    A saccade data structure. The structure is filled by libgac and may hold
+    memory allocated by libgac which must be released with
+    gac_saccade_destroy() before the structure is filled again.
     """
     _fields_ = [
             ("is_heap", c_bool),
@@ -94,8 +101,245 @@ class GazepySaccade(Structure):
             ("last_sample", GazepySample)
     ]
 
-    def __del__(self):
-        gazepy_lib.gac.gac_saccade_destroy(byref(self))
+class GazepyLabels():
+    """
+    A label dictionary mapping label strings to small integer codes. Each
+    label is encoded once when it is added to the dictionary, hence passing
+    label codes to the handlers avoids encoding the label of every sample.
+    Label codes are assigned in the order the labels are added, starting at 0.
+    """
+
+    def __init__(self, labels=None):
+        """
+        Parameters
+        ----------
+        labels: iterable of str, optional
+            the initial labels.
+        """
+        self.__labels = []
+        self.__encoded = []
+        self.__codes = {}
+        self.__encoded_codes = {}
+        for label in labels or ():
+            self.intern(label)
+
+    def __len__(self):
+        return len(self.__labels)
+
+    def __iter__(self):
+        return iter(self.__labels)
+
+    def __contains__(self, label):
+        return label in self.__codes
+
+    def __getitem__(self, code):
+        if isinstance(code, slice):
+            return self.__labels[code]
+        return self.__labels[self.check(code)]
+
+    def intern(self, label):
+        """
+        Get the code of a label. Unknown labels are added to the dictionary.
+
+        Parameters
+        ----------
+        label: str
+            the label.
+
+        Returns
+        -------
+        int
+            the label code.
+        """
+        code = self.__codes.get(label)
+        if code is None:
+            code = len(self.__labels)
+            encoded = label.encode()
+            self.__labels.append(label)
+            self.__encoded.append(encoded)
+            self.__codes[label] = code
+            self.__encoded_codes[encoded] = code
+        return code
+
+    def codes(self, labels):
+        """
+        Get the codes of many labels at once. Unknown labels are added to the
+        dictionary in the order of their first occurrence.
+
+        Parameters
+        ----------
+        labels: iterable of str
+            the labels.
+
+        Returns
+        -------
+        numpy.ndarray
+            an array of type int32 holding the label codes.
+        """
+        labels = list(labels)
+        codes = self.__codes
+        for label in dict.fromkeys(labels):
+            if label not in codes:
+                self.intern(label)
+        return np.array([codes[label] for label in labels], dtype=np.int32)
+
+    def check(self, code):
+        """
+        Check that a label code is in the dictionary.
+
+        Parameters
+        ----------
+        code: int
+            the label code.
+
+        Returns
+        -------
+        int
+            the label code.
+
+        Raises
+        ------
+        ValueError
+            if the code is negative or has no label.
+        """
+        # negative codes would silently index the labels from the end
+        if not 0 <= code < len(self.__labels):
+            raise ValueError(f"unknown label code {code}")
+        return code
+
+    def encode(self, code):
+        """
+        Get the encoded label of a label code as passed to libgac.
+
+        Parameters
+        ----------
+        code: int
+            the label code.
+
+        Returns
+        -------
+        bytes
+            the encoded label.
+
+        Raises
+        ------
+        ValueError
+            if the code is negative or has no label.
+        """
+        return self.__encoded[self.check(code)]
+
+    def decode(self, code):
+        """
+        Get the label of a label code.
+
+        Parameters
+        ----------
+        code: int
+            the label code.
+
+        Returns
+        -------
+        str
+            the label or an empty string if the code is negative.
+
+        Raises
+        ------
+        ValueError
+            if the code is not negative and has no label.
+        """
+        return self.__labels[self.check(code)] if code >= 0 else ""
+
+    def lookup(self, encoded):
+        """
+        Get the code of an encoded label as returned by libgac. Unknown labels
+        are added to the dictionary.
+
+        Parameters
+        ----------
+        encoded: bytes, None
+            the encoded label.
+
+        Returns
+        -------
+        int
+            the label code or -1 if encoded is None.
+        """
+        if encoded is None:
+            return -1
+        code = self.__encoded_codes.get(encoded)
+        if code is None:
+            code = self.intern(encoded.decode())
+        return code
+
+class GazepySampleRecord():
+    """
+    A gaze sample record. The attributes correspond to the fields of
+    GazepySample except for the label which is given as label code of the
+    label dictionary of the handler (see GazepyLabels). Records are plain
+    Python objects and do not hold any memory of libgac.
+    """
+    __slots__ = ("trial_id", "screen_point", "point", "origin", "timestamp",
+            "label")
+
+    def __init__(self, trial_id, screen_point, point, origin, timestamp,
+            label):
+        self.trial_id = trial_id
+        self.screen_point = screen_point
+        self.point = point
+        self.origin = origin
+        self.timestamp = timestamp
+        self.label = label
+
+class GazepyFixationRecord():
+    """
+    A fixation record. The attributes correspond to the fields of
+    GazepyFixation.
+    """
+    __slots__ = ("screen_point", "point", "duration", "first_sample")
+
+    def __init__(self, screen_point, point, duration, first_sample):
+        self.screen_point = screen_point
+        self.point = point
+        self.duration = duration
+        self.first_sample = first_sample
+
+class GazepySaccadeRecord():
+    """
+    A saccade record. The attributes correspond to the fields of
+    GazepySaccade.
+    """
+    __slots__ = ("first_sample", "last_sample")
+
+    def __init__(self, first_sample, last_sample):
+        self.first_sample = first_sample
+        self.last_sample = last_sample
+
+def _checkLabelCodes(label, count):
+    # negative codes would silently index the labels from the end
+    invalid = (label < 0) | (label >= count)
+    if invalid.any():
+        idx = np.flatnonzero(invalid)[0]
+        raise ValueError(f"unknown label code {label[idx]} of sample {idx}")
+
+def _sampleRecord(labels, sample):
+    return GazepySampleRecord(sample.trial_id, tuple(sample.screen_point),
+            tuple(sample.point), tuple(sample.origin), sample.timestamp,
+            labels.lookup(sample.label))
+
+def _fixationRecord(gac, labels, fixation):
+    # copy the fixation out of the reused structure and release the memory
+    # libgac attached to it
+    record = GazepyFixationRecord(tuple(fixation.screen_point),
+            tuple(fixation.point), fixation.duration,
+            _sampleRecord(labels, fixation.first_sample))
+    gac.gac_fixation_destroy(byref(fixation))
+    return record
+
+def _saccadeRecord(gac, labels, saccade):
+    record = GazepySaccadeRecord(_sampleRecord(labels, saccade.first_sample),
+            _sampleRecord(labels, saccade.last_sample))
+    gac.gac_saccade_destroy(byref(saccade))
+    return record
 
 class GazepyLib():
     """
@@ -221,17 +465,59 @@ class Gazepy():
     All filters can be configures through the filter parameter structure.
     To parse for fixations and saccades use the methods fixationFilter() and
     saccadeFilter(), respectively.
+
+    The handler is implemented by a backend (see gazepy.backend). Creating a
+    Gazepy object returns a handler of the selected backend. This class is the
+    handler of the libgac backend.
     """
 
-    def __init__(self, params=None):
+    def __new__(cls, params=None, backend=None):
+        if cls is Gazepy:
+            cls = getBackend(backend)
+        return super().__new__(cls)
+
+    @staticmethod
+    def filterParameterDefault():
+        """
+        Get the default filter parameters of the libgac backend.
+
+        Returns
+        -------
+        GazepyFilterParameter, None
+            the defaults of libgac or None on failure.
+        """
+        return getLib().getFilterParameterDefault()
+
+    def __init__(self, params=None, backend=None):
         """
         Parameters
         ----------
         params: GazepyFilterParameter, optional
             a filter parameter object configuring the gaze analysis filters.
+        backend: str, optional
+            the name of the backend implementing the handler, e.g. "c" or
+            "numpy". If omitted, the backend is selected through the
+            environment variable GAZEPY_BACKEND or, if not set, the first
+            available backend is used.
         """
-        self.gac = gazepy_lib.gac
+        self.gac = getLib().gac
         self.h = self.__create(params)
+        self.labels = GazepyLabels()
+        self.stats = None
+        self.auto_cleanup = None
+        # the output structures are reused by all filter calls
+        self.__fixation = GazepyFixation()
+        self.__fixation_ref = byref(self.__fixation)
+        self.__saccade = GazepySaccade()
+        self.__saccade_ref = byref(self.__saccade)
+        # the event buffers of step()
+        self.fixation_buffer = np.zeros((), dtype=FIXATION_DTYPE)
+        self.saccade_buffer = np.zeros((), dtype=SACCADE_DTYPE)
+        # the number of samples added to the sample window by the last step()
+        self.step_added = 0
+        # the number of samples filled in by the gap filter of the last
+        # update, libgac does not report it
+        self.gap_filled = None
 
     def __del__(self):
         self.__destroy()
@@ -267,6 +553,104 @@ class Gazepy():
         """
         self.gac.gac_sample_window_cleanup(self.h)
 
+    def windowLength(self):
+        """
+        Get the number of samples in the sample window. libgac does not
+        report the length of its sample window, hence the length is unknown.
+
+        Returns
+        -------
+        None
+            always None.
+        """
+        return None
+
+    def windowMemory(self):
+        """
+        Estimate the memory held by the sample window. libgac does not
+        report the length of its sample window, hence the memory is unknown.
+
+        Returns
+        -------
+        None
+            always None.
+        """
+        return None
+
+    def setAutoCleanup(self, interval=None, high_water_mark=None):
+        """
+        Clean the sample window up automatically. The cleanup runs before a
+        new sample is added with update() or updateWithScreen(), hence after
+        all filters were called on the previous sample. Calling cleanup()
+        after each sample is no longer required. Samples still in use by
+        filters, e.g. by an ongoing fixation, are never removed.
+
+        Parameters
+        ----------
+        interval: int, optional
+            clean up every interval samples. If 1, the window is cleaned up
+            before each sample.
+        high_water_mark: int, optional
+            clean up once the sample window holds at least high_water_mark
+            samples (see windowLength()). Not supported by the libgac backend
+            which does not report the length of its sample window.
+
+        If neither interval nor high_water_mark is given, automatic cleanup
+        is disabled.
+
+        Raises
+        ------
+        ValueError
+            if high_water_mark is given but the backend does not report the
+            length of its sample window.
+        """
+        if high_water_mark is not None and self.windowLength() is None:
+            raise ValueError("high_water_mark requires the sample window length"
+                    " which the backend does not report, use interval instead")
+        if interval is None and high_water_mark is None:
+            self.auto_cleanup = None
+        else:
+            self.auto_cleanup = [interval, high_water_mark, 0]
+
+    def _autoCleanup(self):
+        # auto_cleanup holds the interval, the high-water mark and the
+        # number of samples since the last automatic cleanup
+        auto_cleanup = self.auto_cleanup
+        interval, high_water_mark, count = auto_cleanup
+        count += 1
+        if ((interval is not None and count > interval)
+                or (high_water_mark is not None
+                    and self.windowLength() >= high_water_mark)):
+            self.cleanup()
+            count = 1
+        auto_cleanup[2] = count
+
+    def enableStats(self):
+        """
+        Enable the instrumentation of the handler. The calls of update(),
+        updateWithScreen(), fixationFilter(), saccadeFilter(), cleanup(),
+        process() and step() are counted and timed from now on.
+
+        Returns
+        -------
+        GazepyStats
+            the statistics of the handler. Use GazepyStats.snapshot() to read
+            them.
+        """
+        if self.stats is None:
+            self.stats = GazepyStats()
+            self.stats._instrument(self)
+        return self.stats
+
+    def disableStats(self):
+        """
+        Disable the instrumentation of the handler. The methods are no longer
+        wrapped, hence a handler without instrumentation runs at full speed.
+        """
+        if self.stats is not None:
+            self.stats._uninstrument(self)
+            self.stats = None
+
     def fixationFilter(self):
         """
         Check for a fixation in the curren sample window. Call this method
@@ -274,14 +658,14 @@ class Gazepy():
 
         Returns
         -------
-        GazepyFixation, None
-            If a fixation was detected a fixation structure is returned. If
+        GazepyFixationRecord, None
+            If a fixation was detected a fixation record is returned. If
             no fixation was detected or a fixation is still ongoing, None is
             returned.
         """
-        fixation = GazepyFixation()
-        if self.gac.gac_sample_window_fixation_filter(self.h, byref(fixation)):
-            return fixation
+        if self.gac.gac_sample_window_fixation_filter(self.h,
+                self.__fixation_ref):
+            return _fixationRecord(self.gac, self.labels, self.__fixation)
         else:
             return None
 
@@ -292,14 +676,14 @@ class Gazepy():
 
         Returns
         -------
-        GazepySaccade, None
-            If a saccade was detected a sacade structure is returned. If
+        GazepySaccadeRecord, None
+            If a saccade was detected a sacade record is returned. If
             no saccade was detected or a saccade is still ongoing, None is
             returned.
         """
-        saccade = GazepySaccade()
-        if self.gac.gac_sample_window_saccade_filter(self.h, byref(saccade)):
-            return saccade
+        if self.gac.gac_sample_window_saccade_filter(self.h,
+                self.__saccade_ref):
+            return _saccadeRecord(self.gac, self.labels, self.__saccade)
         else:
             return None
 
@@ -310,7 +694,8 @@ class Gazepy():
             bottom_right_x, bottom_right_y, bottom_right_z ):
         """
         Configure the screen position in 3d space. This allows to compute 2d
-        gaze point coordinates.
+        gaze point coordinates. To compute the 2d gaze point coordinates of a
+        whole recording at once use vectorized.screenPoint() instead.
 
         Parameters
         ----------
@@ -348,7 +733,7 @@ class Gazepy():
         bool
             True on success, false on failure.
         """
-        return gac.gac_set_screen(is_normalized,
+        return self.gac.gac_set_screen(is_normalized,
             top_left_x, top_left_y, top_left_z,
             top_right_x, top_right_y, top_right_z,
             bottom_left_x, bottom_left_y, bottom_left_z,
@@ -376,16 +761,21 @@ class Gazepy():
             the timestamp of the gaze sample in milliseconds.
         trial_id: int
             the ID of the ongoing trial.
-        label: string
-            an arbitrary string to annotate a sample.
+        label: string, int
+            an arbitrary string to annotate a sample or its code in the label
+            dictionary of the handler (see GazepyLabels).
 
         Returns
         -------
         int
             the number of samples added to the sample window.
         """
-        self.gac.gac_sample_window_update(self.h, ox, oy, oz, px, py, pz,
-                timestamp, trial_id, label.encode())
+        if self.auto_cleanup is not None:
+            self._autoCleanup()
+        if isinstance(label, str):
+            label = self.labels.intern(label)
+        return self.gac.gac_sample_window_update(self.h, ox, oy, oz,
+                px, py, pz, timestamp, trial_id, self.labels.encode(label))
 
     def updateWithScreen(self, ox, oy, oz, px, py, pz, sx, sy, timestamp,
             trial_id, label):
@@ -416,16 +806,233 @@ class Gazepy():
             the timestamp of the gaze sample in milliseconds.
         trial_id: int
             the ID of the ongoing trial.
-        label: string
-            an arbitrary string to annotate a sample.
+        label: string, int
+            an arbitrary string to annotate a sample or its code in the label
+            dictionary of the handler (see GazepyLabels).
 
         Returns
         -------
         int
             the number of samples added to the sample window.
         """
-        self.gac.gac_sample_window_update_screen(self.h, ox, oy, oz, px, py, pz,
-                sx, sy, timestamp, trial_id, label.encode())
+        if self.auto_cleanup is not None:
+            self._autoCleanup()
+        if isinstance(label, str):
+            label = self.labels.intern(label)
+        return self.gac.gac_sample_window_update_screen(self.h, ox, oy, oz,
+                px, py, pz, sx, sy, timestamp, trial_id,
+                self.labels.encode(label))
+
+    def step(self, *sample, cleanup=True):
+        """
+        Add a gaze sample, parse for fixations and saccades and clean the
+        sample window up in one call. This is equivalent to calling update()
+        or updateWithScreen(), fixationFilter(), saccadeFilter() and cleanup()
+        but avoids the overhead of the separate calls and of the event
+        records. A detected fixation is written to the structured array
+        fixation_buffer (FIXATION_DTYPE) and a detected saccade to
+        saccade_buffer (SACCADE_DTYPE). The buffers are reused, i.e.
+        overwritten by the next detection. The number of samples added to the
+        sample window, as returned by update(), is stored in step_added.
+
+        Parameters
+        ----------
+        sample: tuple
+            the arguments of update() (9 items) or updateWithScreen() (11
+            items).
+        cleanup: bool, optional
+            clean the sample window up after parsing. Set to False if the
+            window is cleaned up automatically (see setAutoCleanup()).
+            Defaults to True.
+
+        Returns
+        -------
+        int
+            the detected events as bitmask of STEP_FIXATION and
+            STEP_SACCADE, 0 if no event was detected.
+        """
+        if self.auto_cleanup is not None:
+            self._autoCleanup()
+        gac = self.gac
+        h = self.h
+        labels = self.labels
+        label = sample[-1]
+        if isinstance(label, str):
+            label = labels.intern(label)
+        if len(sample) == 11:
+            self.step_added = gac.gac_sample_window_update_screen(h,
+                    *sample[:-1], labels.encode(label))
+        else:
+            self.step_added = gac.gac_sample_window_update(h, *sample[:-1],
+                    labels.encode(label))
+
+        status = 0
+        if gac.gac_sample_window_fixation_filter(h, self.__fixation_ref):
+            fixation = self.__fixation
+            first = fixation.first_sample
+            self.fixation_buffer[()] = (first.timestamp, fixation.duration,
+                    tuple(fixation.screen_point), tuple(fixation.point),
+                    first.trial_id, labels.lookup(first.label))
+            gac.gac_fixation_destroy(self.__fixation_ref)
+            status |= STEP_FIXATION
+        if gac.gac_sample_window_saccade_filter(h, self.__saccade_ref):
+            first = self.__saccade.first_sample
+            last = self.__saccade.last_sample
+            self.saccade_buffer[()] = (first.timestamp,
+                    last.timestamp - first.timestamp,
+                    tuple(first.screen_point), tuple(first.point),
+                    tuple(last.screen_point), tuple(last.point),
+                    first.trial_id, labels.lookup(first.label),
+                    saccadeAmplitude(first.origin, first.point, last.origin,
+                        last.point))
+            gac.gac_saccade_destroy(self.__saccade_ref)
+            status |= STEP_SACCADE
+        if cleanup:
+            gac.gac_sample_window_cleanup(h)
+        return status
+
+    def analyse(self, samples, collector=None):
+        """
+        Add a batch of samples one by one to the sample window, parse for
+        fixations and saccades after each sample and clean the sample window
+        up.
+
+        Parameters
+        ----------
+        samples: iterable of tuple
+            the gaze samples, each holding the arguments of update() (9
+            items) or updateWithScreen() (11 items).
+        collector: GazepyEventCollector, optional
+            a collector to append the detected events to.
+
+        Returns
+        -------
+        list, GazepyEventCollector
+            the detected fixations and saccades in the order of detection or
+            the collector if one is given.
+        """
+        events = []
+        add = events.append if collector is None else collector.add
+        for sample in samples:
+            if len(sample) == 11:
+                self.updateWithScreen(*sample)
+            else:
+                self.update(*sample)
+            fixation = self.fixationFilter()
+            if fixation is not None:
+                add(fixation)
+            saccade = self.saccadeFilter()
+            if saccade is not None:
+                add(saccade)
+            self.cleanup()
+        return events if collector is None else collector
+
+    def process(self, origin, point, timestamp, trial_id, label, labels=None,
+            screen_point=None):
+        """
+        Process a whole recording in one call. Each sample is added to the
+        sample window, parsed for fixations and saccades and the sample window
+        is cleaned up afterwards. All type conversions are done once for the
+        whole recording instead of once per sample.
+
+        The recording is analysed with a new sample window, i.e. independently
+        of the samples added with update() or updateWithScreen(). The sample
+        window of the handler is left unchanged. This holds for all backends.
+
+        Parameters
+        ----------
+        origin: numpy.ndarray
+            an array of shape (N, 3) holding the gaze origins.
+        point: numpy.ndarray
+            an array of shape (N, 3) holding the gaze points.
+        timestamp: numpy.ndarray
+            an array of shape (N,) holding the timestamps in milliseconds.
+        trial_id: numpy.ndarray
+            an array of shape (N,) holding the trial IDs.
+        label: numpy.ndarray
+            an array of shape (N,) holding integer label codes.
+        labels: list of string, GazepyLabels, optional
+            the label strings indexed by the label codes. If omitted, the
+            string representation of the label code is used as label.
+        screen_point: numpy.ndarray, optional
+            an array of shape (N, 2) holding the 2d screen gaze points. If
+            omitted, the samples are added with update(), otherwise with
+            updateWithScreen().
+
+        Returns
+        -------
+        tuple of numpy.ndarray
+            the detected fixations (FIXATION_DTYPE) and the detected saccades
+            (SACCADE_DTYPE).
+
+        Raises
+        ------
+        ValueError
+            if a label code is negative or, if labels are given, has no label.
+        """
+        timestamp = np.ascontiguousarray(timestamp, dtype=np.float64)
+        count = len(timestamp)
+        origin = np.ascontiguousarray(origin, dtype=np.float32).reshape(count, 3)
+        point = np.ascontiguousarray(point, dtype=np.float32).reshape(count, 3)
+        trial_id = np.ascontiguousarray(trial_id, dtype=np.uint32)
+        label = np.ascontiguousarray(label, dtype=np.int32)
+        if labels is None:
+            labels = [str(code) for code in range(label.max(initial=-1) + 1)]
+        _checkLabelCodes(label, len(labels))
+        encoded = [str(item).encode() for item in labels]
+        codes = {item: code for code, item in enumerate(encoded)}
+
+        # convert all columns to python scalars at once
+        columns = [*origin.T.tolist(), *point.T.tolist()]
+        if screen_point is not None:
+            screen_point = np.ascontiguousarray(screen_point,
+                    dtype=np.float32).reshape(count, 2)
+            columns += screen_point.T.tolist()
+            update = self.gac.gac_sample_window_update_screen
+        else:
+            update = self.gac.gac_sample_window_update
+        columns += [timestamp.tolist(), trial_id.tolist(),
+                [encoded[code] for code in label.tolist()]]
+
+        fixation_filter = self.gac.gac_sample_window_fixation_filter
+        saccade_filter = self.gac.gac_sample_window_saccade_filter
+        cleanup = self.gac.gac_sample_window_cleanup
+        fixation_destroy = self.gac.gac_fixation_destroy
+        saccade_destroy = self.gac.gac_saccade_destroy
+        # a new handle such that the streaming state is neither used nor
+        # changed
+        h = self.__create(self.getFilterParameter())
+        fixation = self.__fixation
+        saccade = self.__saccade
+        fixation_ref = self.__fixation_ref
+        saccade_ref = self.__saccade_ref
+        collector = GazepyEventCollector()
+        append_fixation = collector.appendFixation
+        append_saccade = collector.appendSaccade
+
+        try:
+            for args in zip(*columns):
+                update(h, *args)
+                if fixation_filter(h, fixation_ref):
+                    sample = fixation.first_sample
+                    append_fixation(sample.timestamp, fixation.duration,
+                        tuple(fixation.screen_point), tuple(fixation.point),
+                        sample.trial_id, codes.get(sample.label, -1))
+                    fixation_destroy(fixation_ref)
+                if saccade_filter(h, saccade_ref):
+                    first = saccade.first_sample
+                    last = saccade.last_sample
+                    append_saccade(first.timestamp, last.timestamp,
+                        tuple(first.screen_point), tuple(first.point),
+                        tuple(first.origin), tuple(last.screen_point),
+                        tuple(last.point), tuple(last.origin),
+                        first.trial_id, codes.get(first.label, -1))
+                    saccade_destroy(saccade_ref)
+                cleanup(h)
+        finally:
+            self.gac.gac_destroy(h)
+
+        return (collector.fixations(), collector.saccades())
 
 class GazepyFilterFixation():
     """
@@ -442,8 +1049,10 @@ class GazepyFilterFixation():
         duration_threashold: float
             the duration threshold in milliseconds.
         """
-        self.gac = gazepy_lib.gac
+        self.gac = getLib().gac
         self.f = self.__create(dispersion_threshold, duration_threshold)
+        self.__fixation = GazepyFixation()
+        self.labels = GazepyLabels()
 
     def __del__(self):
         self.__destroy()
@@ -467,14 +1076,13 @@ class GazepyFilterFixation():
 
         Returns
         -------
-        GazepyFixation, None
-            If a fixation was detected a fixation structure is returned. If
+        GazepyFixationRecord, None
+            If a fixation was detected a fixation record is returned. If
             no fixation was detected or a fixation is still ongoing, None is
             returned.
         """
-        fixation = GazepyFixation()
-        if self.gac.gac_filter_fixation(self.f, sample, fixation):
-            return fixation
+        if self.gac.gac_filter_fixation(self.f, sample, self.__fixation):
+            return _fixationRecord(self.gac, self.labels, self.__fixation)
         else:
             return None
 
@@ -492,7 +1100,7 @@ class GazepyFilterGap():
             the maximal gap length in milliseconds to fil-in samples. Larger
             gaps are ignored. If set to 0 the filter is disabled.
         """
-        self.gac = gazepy_lib.gac
+        self.gac = getLib().gac
         self.f = self.__create(max_gap_length, sample_period)
 
     def __del__(self):
@@ -524,7 +1132,7 @@ class GazepyFilterGap():
         int
             the number of samples added to the sample window.
         """
-        return self.gac.gac_filter_gap(self.f, samples, sample)
+        return self.gac.gac_filter_gap(self.f, samples.q, sample)
 
 class GazepyFilterNoise():
     """
@@ -539,7 +1147,7 @@ class GazepyFilterNoise():
             of the window: window_length = mid_idx * 2 + 1. If set to 0 the
             filter is disabled.
         """
-        self.gac = gazepy_lib.gac
+        self.gac = getLib().gac
         self.f = self.__create(mid_idx)
 
     def __del__(self):
@@ -583,8 +1191,10 @@ class GazepyFilterSaccade():
         velocity_threshold: float
             the velocity threshold in degrees per second.
         """
-        self.gac = gazepy_lib.gac
+        self.gac = getLib().gac
         self.f = self.__create(velocity_threshold)
+        self.__saccade = GazepySaccade()
+        self.labels = GazepyLabels()
 
     def __del__(self):
         self.__destroy()
@@ -608,14 +1218,13 @@ class GazepyFilterSaccade():
 
         Returns
         -------
-        GazepySaccade, None
-            If a saccade was detected a saccade structure is returned. If
+        GazepySaccadeRecord, None
+            If a saccade was detected a saccade record is returned. If
             no saccade was detected or a saccade is still ongoing, None is
             returned.
         """
-        saccade = GazepySaccade()
-        if self.gac.gac_filter_saccade(self.f, sample, saccade):
-            return saccade
+        if self.gac.gac_filter_saccade(self.f, sample, self.__saccade):
+            return _saccadeRecord(self.gac, self.labels, self.__saccade)
         else:
             return None
 
@@ -624,21 +1233,23 @@ class GazepyQueue():
     A queue which grows dynamically in size.
     """
 
-    def __init__(self, length):
+    def __init__(self, length, item_type=GazepySample):
         """
         Parameters
         ----------
         length: int
             the initial length of the queue.
+        item_type: type, optional
+            the ctypes type of the queue items. Defaults to GazepySample.
         """
-        self.gac = gazepy_lib.gac
+        self.gac = getLib().gac
         self.item_type = item_type
         self.q = self.__create(length)
 
     def __del__(self):
         self.__destroy()
 
-    def __create(length):
+    def __create(self, length):
         return self.gac.gac_queue_create(length)
 
     def __destroy(self):
@@ -675,16 +1286,16 @@ class GazepyQueue():
         any, None
             the date sample from the queue tail or None.
         """
-        klass = globals()[class_name]
-        instance = klass()
-        if self.gac.gac_queue_pop(self.q, byref(instance)):
-            return instance
+        data = c_void_p()
+        if self.gac.gac_queue_pop(self.q, byref(data)):
+            return cast(data, POINTER(self.item_type)).contents
         else:
             return None
 
     def push(self, data):
         """
-        Add a sample to the queue head.
+        Add a sample to the queue head. The queue only stores a reference to
+        the sample, hence the sample must be kept alive while it is queued.
 
         Parameters
         ----------
@@ -696,7 +1307,7 @@ class GazepyQueue():
         bool
             True on success, False otherwise
         """
-        return self.gac.gac_queue_push(self.q, data)
+        return self.gac.gac_queue_push(self.q, byref(data))
 
     def remove(self):
         """
@@ -704,10 +1315,63 @@ class GazepyQueue():
         """
         self.gac.gac_queue_remove(self.q)
 
-gazepy_lib = GazepyLib()
+_gazepy_lib = None
+
+def getLib():
+    """
+    Get the bindings to libgac. The library is loaded on first use.
+
+    Returns
+    -------
+    GazepyLib
+        the library bindings.
 
-def getFilterParameterDefault():
-    return gazepy_lib.getFilterParameterDefault()
+    Raises
+    ------
+    OSError
+        if libgac cannot be loaded.
+    """
+    global _gazepy_lib
+    if _gazepy_lib is None:
+        _gazepy_lib = GazepyLib()
+    return _gazepy_lib
+
+def isLibLoaded():
+    """
+    Check whether libgac was loaded.
+
+    Returns
+    -------
+    bool
+        True if libgac was loaded, False otherwise.
+    """
+    return _gazepy_lib is not None
+
+def __getattr__(name):
+    # the library bindings used to be loaded at import
+    if name == "gazepy_lib":
+        return getLib()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def getFilterParameterDefault(backend=None):
+    """
+    Get the default filter parameters of a backend. The backends define their
+    defaults independently, i.e. the defaults of the libgac backend are
+    read from libgac while the NumPy backend declares its own defaults (see
+    GazepyNumpy.filterParameterDefault()).
+
+    Parameters
+    ----------
+    backend: str, optional
+        the name of the backend, e.g. "c" or "numpy". If omitted, the backend
+        is selected as for Gazepy.
+
+    Returns
+    -------
+    GazepyFilterParameter, None
+        the parameter structure or None on failure
+    """
+    return getBackend(backend).filterParameterDefault()
 
 def sampleDestroy(sample):
-    gazepy_lib.gac.gac_sample_destroy(byref(sample))
+    getLib().gac.gac_sample_destroy(byref(sample))
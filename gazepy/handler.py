@@ -0,0 +1,509 @@
+"""
+The gaze analysis handler of the NumPy backend. The handler provides the same
+interface and filters as the libgac handler but does not require libgac.
+Samples added one by one are filtered incrementally while whole recordings
+passed to process() are filtered with the vectorized filters of
+gazepy.vectorized.
+"""
+
+from collections import deque
+import math
+import sys
+import numpy as np
+
+from . import vectorized
+from .events import STEP_FIXATION, STEP_SACCADE, saccadeAmplitude
+from .extrema import GazepyRunningExtrema
+from .gazepy import (Gazepy, GazepyFilterParameter, GazepyFixationRecord,
+        GazepyLabels, GazepySaccadeRecord, GazepySampleRecord,
+        _checkLabelCodes)
+
+# the fields of a sample tuple, in the order of SAMPLE_DTYPE
+_TRIAL_ID = 0
+_SCREEN_POINT = 1
+_POINT = 2
+_ORIGIN = 3
+_TIMESTAMP = 4
+_LABEL = 5
+
+def _lerp(first, last, frac):
+    return tuple(a + frac * (b - a) for a, b in zip(first, last))
+
+def _direction(sample):
+    direction = [p - o for p, o in zip(sample[_POINT], sample[_ORIGIN])]
+    norm = math.sqrt(sum(c * c for c in direction))
+    if norm == 0:
+        return (math.nan, math.nan, math.nan)
+    return tuple(c / norm for c in direction)
+
+def _angle(direction):
+    x, y, z = direction
+    return (math.degrees(math.atan2(x, z)),
+            math.degrees(math.atan2(y, math.hypot(x, z))))
+
+def _sizeof(item):
+    # the size of a sample tuple including its nested tuples and values
+    if isinstance(item, tuple):
+        return sys.getsizeof(item) + sum(_sizeof(value) for value in item)
+    return sys.getsizeof(item)
+
+def _record(sample):
+    return GazepySampleRecord(sample[_TRIAL_ID], sample[_SCREEN_POINT],
+            sample[_POINT], sample[_ORIGIN], sample[_TIMESTAMP],
+            sample[_LABEL])
+
+class GazepyNumpy(Gazepy):
+    """
+    The gaze analysis handler of the NumPy backend. The filters follow the
+    vectorized filters in gazepy.vectorized. Detected fixations and saccades
+    are returned as GazepyFixationRecord and GazepySaccadeRecord objects.
+    """
+
+    @staticmethod
+    def filterParameterDefault():
+        """
+        Get the default filter parameters of the NumPy backend. The defaults
+        are declared by this backend and are not read from libgac, hence they
+        may differ from the defaults of the libgac backend. Pass explicit
+        parameters to compare the backends.
+
+        Returns
+        -------
+        GazepyFilterParameter
+            the parameter structure.
+        """
+        params = GazepyFilterParameter()
+        params.gap.max_gap_length = 50
+        params.gap.sample_period = 1000 / 60
+        params.noise.type = vectorized.NOISE_TYPE_AVERAGE
+        params.noise.mid_idx = 1
+        params.saccade.velocity_threshold = 20
+        params.fixation.duration_threshold = 100
+        params.fixation.dispersion_threshold = 0.5
+        return params
+
+    def __init__(self, params=None, backend=None):
+        """
+        Parameters
+        ----------
+        params: GazepyFilterParameter, optional
+            a filter parameter object configuring the gaze analysis filters.
+        backend: str, optional
+            ignored, the backend is already selected.
+
+        Raises
+        ------
+        ValueError
+            if the gap filter is enabled and the sample period is not
+            positive.
+        """
+        if params is None:
+            params = self.filterParameterDefault()
+        vectorized._checkGapFilter(params.gap.max_gap_length,
+                params.gap.sample_period)
+        self.params = GazepyFilterParameter.from_buffer_copy(params)
+        self.labels = GazepyLabels()
+        self.stats = None
+        self.auto_cleanup = None
+        # the estimated size in bytes of a sample in the sample window
+        self.sample_size = None
+        self.screen = None
+        self.screen_corners = None
+        # the last raw sample for the gap filter
+        self.last = None
+        self.noise = deque(maxlen=self.params.noise.mid_idx * 2 + 1)
+        # the sample window, the first sample has the index offset
+        self.window = []
+        self.directions = []
+        self.offset = 0
+        self.fixation_idx = 0
+        self.fixation_start = 0
+        self.is_collecting = False
+        self.extrema = GazepyRunningExtrema(2)
+        self.saccade_idx = 0
+        self.saccade_onset = None
+        # the event buffers of step()
+        self.fixation_buffer = np.zeros((), dtype=vectorized.FIXATION_DTYPE)
+        self.saccade_buffer = np.zeros((), dtype=vectorized.SACCADE_DTYPE)
+        # the number of samples added to the sample window by the last step()
+        self.step_added = 0
+        # the number of samples filled in by the gap filter of the last update
+        self.gap_filled = 0
+
+    def __del__(self):
+        pass
+
+    def getFilterParameter(self):
+        """
+        Get the filter parameters used to configure the gaze analysis filter.
+
+        Returns
+        -------
+        GazepyFilterParameter
+            a copy of the parameter structure
+        """
+        return GazepyFilterParameter.from_buffer_copy(self.params)
+
+    def cleanup(self):
+        """
+        Remove all unused samples from the sample window. Samples which are
+        still in use by filters are left in the sample window.
+        """
+        keep = min(self.fixation_start, self.saccade_idx - 1)
+        if self.saccade_onset is not None:
+            keep = min(keep, self.saccade_onset)
+        count = keep - self.offset
+        if count > 0:
+            del self.window[:count]
+            del self.directions[:count]
+            self.offset = keep
+
+    def windowLength(self):
+        """
+        Get the number of samples in the sample window.
+
+        Returns
+        -------
+        int
+            the number of samples.
+        """
+        return len(self.window)
+
+    def windowMemory(self):
+        """
+        Estimate the memory held by the sample window.
+
+        Returns
+        -------
+        int
+            the estimated number of bytes.
+        """
+        if not self.window:
+            return 0
+        if self.sample_size is None:
+            self.sample_size = (_sizeof(self.window[0])
+                    + _sizeof(self.directions[0])
+                    + 2 * sys.getsizeof(None))
+        return len(self.window) * self.sample_size
+
+    def fixationFilter(self):
+        """
+        Check for a fixation in the curren sample window. Call this method
+        after each update() call to parse the gaze samples for fixations.
+
+        Returns
+        -------
+        GazepyFixationRecord, None
+            If a fixation was detected a fixation record is returned. If
+            no fixation was detected or a fixation is still ongoing, None is
+            returned.
+        """
+        dispersion_threshold = self.params.fixation.dispersion_threshold
+        duration_threshold = self.params.fixation.duration_threshold
+        window = self.window
+        offset = self.offset
+        while self.fixation_idx < offset + len(window):
+            idx = self.fixation_idx
+            self.fixation_idx += 1
+            self.extrema.push(idx, _angle(self.directions[idx - offset]))
+            start = self.fixation_start
+            if (window[idx - offset][_TIMESTAMP]
+                    - window[start - offset][_TIMESTAMP] < duration_threshold):
+                continue
+
+            self.extrema.evict(start)
+            if sum(self.extrema.range()) <= dispersion_threshold:
+                self.is_collecting = True
+            elif self.is_collecting:
+                self.is_collecting = False
+                # the sample breaking the fixation is dropped
+                self.fixation_start = idx + 1
+                self.extrema.clear()
+                return self.__fixation(start - offset, idx - offset)
+            else:
+                self.fixation_start += 1
+        return None
+
+    def __fixation(self, first, stop):
+        samples = self.window[first:stop]
+        count = len(samples)
+        screen_point = tuple(sum(s[_SCREEN_POINT][k] for s in samples) / count
+                for k in range(2))
+        point = tuple(sum(s[_POINT][k] for s in samples) / count
+                for k in range(3))
+        return GazepyFixationRecord(screen_point, point,
+                samples[-1][_TIMESTAMP] - samples[0][_TIMESTAMP],
+                _record(samples[0]))
+
+    def saccadeFilter(self):
+        """
+        Check for a saccade in the curren sample window. Call this method
+        after each update() call to parse the gaze samples for saccades.
+
+        Returns
+        -------
+        GazepySaccadeRecord, None
+            If a saccade was detected a sacade record is returned. If
+            no saccade was detected or a saccade is still ongoing, None is
+            returned.
+        """
+        velocity_threshold = self.params.saccade.velocity_threshold
+        window = self.window
+        offset = self.offset
+        while self.saccade_idx < offset + len(window):
+            idx = self.saccade_idx
+            self.saccade_idx += 1
+            if idx == 0:
+                continue
+            d1 = self.directions[idx - 1 - offset]
+            d2 = self.directions[idx - offset]
+            cross = (d1[1] * d2[2] - d1[2] * d2[1],
+                    d1[2] * d2[0] - d1[0] * d2[2],
+                    d1[0] * d2[1] - d1[1] * d2[0])
+            angle = math.degrees(math.atan2(
+                math.sqrt(sum(c * c for c in cross)),
+                sum(a * b for a, b in zip(d1, d2))))
+            dt = (window[idx - offset][_TIMESTAMP]
+                    - window[idx - 1 - offset][_TIMESTAMP])
+            if dt != 0:
+                velocity = angle / dt * 1000
+            else:
+                velocity = math.inf if angle > 0 else math.nan
+
+            if velocity > velocity_threshold:
+                if self.saccade_onset is None:
+                    self.saccade_onset = idx - 1
+            elif self.saccade_onset is not None:
+                onset = self.saccade_onset
+                self.saccade_onset = None
+                return GazepySaccadeRecord(_record(window[onset - offset]),
+                        _record(window[idx - 1 - offset]))
+        return None
+
+    def setScreen(self, is_normalized,
+            top_left_x, top_left_y, top_left_z,
+            top_right_x, top_right_y, top_right_z,
+            bottom_left_x, bottom_left_y, bottom_left_z,
+            bottom_right_x, bottom_right_y, bottom_right_z ):
+        """
+        Configure the screen position in 3d space. This allows to compute 2d
+        gaze point coordinates (see vectorized.screenPoint()).
+
+        Returns
+        -------
+        bool
+            True on success, false on failure.
+        """
+        self.screen_corners = (is_normalized,
+                (top_left_x, top_left_y, top_left_z),
+                (top_right_x, top_right_y, top_right_z),
+                (bottom_left_x, bottom_left_y, bottom_left_z),
+                (bottom_right_x, bottom_right_y, bottom_right_z))
+        top_left, axis_x, axis_y, normal = vectorized.screenAxes(
+                *self.screen_corners[1:])
+        scale_x = 1 / (axis_x @ axis_x)
+        scale_y = 1 / (axis_y @ axis_y)
+        if not is_normalized:
+            scale_x *= math.sqrt(axis_x @ axis_x)
+            scale_y *= math.sqrt(axis_y @ axis_y)
+        self.screen = (top_left.tolist(), axis_x.tolist(), axis_y.tolist(),
+                normal.tolist(), scale_x, scale_y)
+        return True
+
+    def __screenPoint(self, origin, point):
+        top_left, axis_x, axis_y, normal, scale_x, scale_y = self.screen
+        direction = [p - o for p, o in zip(point, origin)]
+        den = sum(d * n for d, n in zip(direction, normal))
+        if den == 0:
+            return (math.nan, math.nan)
+        scale = sum((t - o) * n for t, o, n in
+                zip(top_left, origin, normal)) / den
+        hit = [o + scale * d - t for o, d, t in
+                zip(origin, direction, top_left)]
+        return (sum(h * a for h, a in zip(hit, axis_x)) * scale_x,
+                sum(h * a for h, a in zip(hit, axis_y)) * scale_y)
+
+    def update(self, ox, oy, oz, px, py, pz, timestamp, trial_id, label):
+        """
+        Update the sample window with a new gaze sample. If a screen is
+        configured with setScreen() the screen gaze point is computed. The
+        label is either a string or its code in the label dictionary of the
+        handler (see GazepyLabels).
+
+        Returns
+        -------
+        int
+            the number of samples added to the sample window.
+        """
+        if self.auto_cleanup is not None:
+            self._autoCleanup()
+        if isinstance(label, str):
+            label = self.labels.intern(label)
+        else:
+            label = self.labels.check(label)
+        origin = (ox, oy, oz)
+        point = (px, py, pz)
+        if self.screen is None:
+            screen_point = (0.0, 0.0)
+        else:
+            screen_point = self.__screenPoint(origin, point)
+        return self.__add((trial_id, screen_point, point, origin, timestamp,
+            label))
+
+    def updateWithScreen(self, ox, oy, oz, px, py, pz, sx, sy, timestamp,
+            trial_id, label):
+        """
+        Update the sample window with a new gaze sample including the 2d
+        screen gaze point. The label is either a string or its code in the
+        label dictionary of the handler (see GazepyLabels).
+
+        Returns
+        -------
+        int
+            the number of samples added to the sample window.
+        """
+        if self.auto_cleanup is not None:
+            self._autoCleanup()
+        if isinstance(label, str):
+            label = self.labels.intern(label)
+        else:
+            label = self.labels.check(label)
+        return self.__add((trial_id, (sx, sy), (px, py, pz), (ox, oy, oz),
+            timestamp, label))
+
+    def __add(self, sample):
+        count = 0
+        items = self.__gap(sample)
+        self.gap_filled = len(items) - 1
+        for item in items:
+            item = self.__noise(item)
+            if item is not None:
+                self.window.append(item)
+                self.directions.append(_direction(item))
+                count += 1
+        return count
+
+    def __gap(self, sample):
+        last = self.last
+        self.last = sample
+        max_gap_length = self.params.gap.max_gap_length
+        sample_period = self.params.gap.sample_period
+        if last is None or max_gap_length == 0:
+            return (sample,)
+        dt = sample[_TIMESTAMP] - last[_TIMESTAMP]
+        if not sample_period < dt <= max_gap_length:
+            return (sample,)
+        res = []
+        for step in range(1, round(dt / sample_period)):
+            frac = step * sample_period / dt
+            res.append((last[_TRIAL_ID],
+                _lerp(last[_SCREEN_POINT], sample[_SCREEN_POINT], frac),
+                _lerp(last[_POINT], sample[_POINT], frac),
+                _lerp(last[_ORIGIN], sample[_ORIGIN], frac),
+                last[_TIMESTAMP] + step * sample_period, last[_LABEL]))
+        res.append(sample)
+        return res
+
+    def __noise(self, sample):
+        mid_idx = self.params.noise.mid_idx
+        if mid_idx == 0:
+            return sample
+        window = self.noise
+        window.append(sample)
+        if len(window) < window.maxlen:
+            return None
+        noise_type = self.params.noise.type
+        if noise_type == vectorized.NOISE_TYPE_AVERAGE:
+            reduce = lambda values: sum(values) / len(values)
+        elif noise_type == vectorized.NOISE_TYPE_MEDIAN:
+            reduce = lambda values: sorted(values)[mid_idx]
+        else:
+            raise ValueError(f"unknown noise filter type {noise_type}")
+        center = window[mid_idx]
+        return (center[_TRIAL_ID],
+                tuple(reduce([s[_SCREEN_POINT][k] for s in window])
+                    for k in range(2)),
+                tuple(reduce([s[_POINT][k] for s in window])
+                    for k in range(3)),
+                tuple(reduce([s[_ORIGIN][k] for s in window])
+                    for k in range(3)),
+                center[_TIMESTAMP], center[_LABEL])
+
+    def step(self, *sample, cleanup=True):
+        """
+        Add a gaze sample, parse for fixations and saccades and clean the
+        sample window up in one call. Detected events are written to
+        fixation_buffer and saccade_buffer (see Gazepy.step()).
+
+        Returns
+        -------
+        int
+            the detected events as bitmask of STEP_FIXATION and
+            STEP_SACCADE, 0 if no event was detected.
+        """
+        # the methods of the class are called such that instrumented methods
+        # do not count the calls of step() twice
+        if len(sample) == 11:
+            self.step_added = GazepyNumpy.updateWithScreen(self, *sample)
+        else:
+            self.step_added = GazepyNumpy.update(self, *sample)
+        status = 0
+        fixation = GazepyNumpy.fixationFilter(self)
+        if fixation is not None:
+            first = fixation.first_sample
+            self.fixation_buffer[()] = (first.timestamp, fixation.duration,
+                    fixation.screen_point, fixation.point, first.trial_id,
+                    first.label)
+            status |= STEP_FIXATION
+        saccade = GazepyNumpy.saccadeFilter(self)
+        if saccade is not None:
+            first = saccade.first_sample
+            last = saccade.last_sample
+            self.saccade_buffer[()] = (first.timestamp,
+                    last.timestamp - first.timestamp, first.screen_point,
+                    first.point, last.screen_point, last.point,
+                    first.trial_id, first.label,
+                    saccadeAmplitude(first.origin, first.point, last.origin,
+                        last.point))
+            status |= STEP_SACCADE
+        if cleanup:
+            GazepyNumpy.cleanup(self)
+        return status
+
+    def process(self, origin, point, timestamp, trial_id, label, labels=None,
+            screen_point=None):
+        """
+        Process a whole recording in one call with the vectorized filters. As
+        with Gazepy.process(), the recording is analysed independently of the
+        samples added with update() or updateWithScreen() and the sample window
+        is left unchanged.
+
+        Returns
+        -------
+        tuple of numpy.ndarray
+            the detected fixations (FIXATION_DTYPE) and the detected saccades
+            (SACCADE_DTYPE).
+        """
+        params = self.params
+        samples = vectorized.createSamples(origin, point, timestamp, trial_id,
+                label, screen_point)
+        if labels is None:
+            # as with Gazepy.process(), only negative codes are invalid
+            _checkLabelCodes(samples["label"],
+                    int(samples["label"].max(initial=-1)) + 1)
+        else:
+            _checkLabelCodes(samples["label"], len(labels))
+        if screen_point is None and self.screen_corners is not None:
+            samples["screen_point"] = vectorized.screenPoint(samples,
+                    *self.screen_corners)
+        samples = vectorized.gapFilter(samples, params.gap.max_gap_length,
+                params.gap.sample_period)
+        samples = vectorized.noiseFilter(samples, params.noise.type,
+                params.noise.mid_idx)
+        first, last = vectorized.fixationFilter(samples,
+                params.fixation.dispersion_threshold,
+                params.fixation.duration_threshold)
+        onset, offset = vectorized.saccadeFilter(samples,
+                params.saccade.velocity_threshold)
+        return (vectorized.fixationEvents(samples, first, last),
+                vectorized.saccadeEvents(samples, onset, offset))
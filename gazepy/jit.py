@@ -0,0 +1,68 @@
+"""
+Optional just-in-time compilation of the sequential filter kernels. The
+window state machines of the fixation filters do not vectorize, they are
+written as plain loops over arrays instead. If Numba is installed, the loops
+are compiled to machine code on first use, otherwise they run as Python
+code with identical results. Compilation is disabled by setting the
+environment variable GAZEPY_JIT to 0.
+"""
+
+import os
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+JIT_ENV = "GAZEPY_JIT"
+"""
+The environment variable disabling the compilation of the kernels if set to
+0.
+"""
+
+def isJitEnabled():
+    """
+    Check whether the kernels are compiled.
+
+    Returns
+    -------
+    bool
+        True if Numba is installed and compilation is not disabled through the
+        environment variable GAZEPY_JIT.
+    """
+    return numba is not None and os.environ.get(JIT_ENV, "1") != "0"
+
+def kernel(func):
+    """
+    Mark a function as kernel. The returned kernel calls the compiled
+    function if compilation is enabled (see isJitEnabled()) and the Python
+    function otherwise. The Python function is available as attribute py.
+
+    A kernel must only use the subset of Python supported by Numba in
+    nopython mode and must receive all arguments as NumPy arrays or scalars.
+    It is compiled once per argument types on first call.
+
+    Parameters
+    ----------
+    func: callable
+        the kernel function.
+
+    Returns
+    -------
+    callable
+        the kernel.
+    """
+    compiled = None
+
+    def call(*args):
+        nonlocal compiled
+        if not isJitEnabled():
+            return func(*args)
+        if compiled is None:
+            compiled = numba.njit(nogil=True, cache=True)(func)
+        return compiled(*args)
+
+    call.__name__ = func.__name__
+    call.__doc__ = func.__doc__
+    call.py = func
+    return call
@@ -0,0 +1,98 @@
+"""
+Batched quaternion averaging. All functions average many windows of
+quaternions in one call. Quaternions are given as arrays with the components
+(w, x, y, z) in the last axis.
+"""
+
+import numpy as np
+
+def quaternionMeanFromSum(accumulator):
+    """
+    Compute the mean quaternions from accumulated outer products. The mean
+    quaternion is the eigenvector of the largest eigenvalue of the sum of the
+    outer products q q' of the averaged quaternions. As the outer product is
+    invariant to the sign of a quaternion, no hemisphere alignment is
+    required.
+
+    Parameters
+    ----------
+    accumulator: numpy.ndarray
+        an array of shape (..., 4, 4) holding sums of outer products.
+
+    Returns
+    -------
+    numpy.ndarray
+        an array of shape (..., 4) holding the unit mean quaternions with a
+        non-negative w component.
+    """
+    # eigh sorts the eigenvalues of the symmetric matrices in ascending order
+    mean = np.linalg.eigh(accumulator)[1][..., -1]
+    return mean * np.where(mean[..., :1] < 0, -1, 1)
+
+def quaternionMean(qs):
+    """
+    Compute the mean quaternion of each window.
+
+    Parameters
+    ----------
+    qs: numpy.ndarray
+        an array of shape (..., M, 4) holding windows of M unit quaternions.
+
+    Returns
+    -------
+    numpy.ndarray
+        an array of shape (..., 4) holding the unit mean quaternions with a
+        non-negative w component.
+    """
+    return quaternionMeanFromSum(np.einsum("...mi,...mj->...ij", qs, qs))
+
+def quaternionMeanApprox(qs):
+    """
+    Approximate the mean quaternion of each window by the normalized sum of
+    the quaternions. Each quaternion is flipped into the hemisphere of the
+    first quaternion in its window. This is accurate for quaternions close to
+    each other.
+
+    Parameters
+    ----------
+    qs: numpy.ndarray
+        an array of shape (..., M, 4) holding windows of M unit quaternions.
+
+    Returns
+    -------
+    numpy.ndarray
+        an array of shape (..., 4) holding the unit mean quaternions.
+    """
+    qs = np.asarray(qs, dtype=np.float64)
+    sign = np.where(np.einsum("...mi,...i->...m", qs, qs[..., 0, :]) < 0,
+            -1.0, 1.0)
+    mean = np.einsum("...mi,...m->...i", qs, sign)
+    return mean / np.linalg.norm(mean, axis=-1, keepdims=True)
+
+def quaternionMeanWindows(qs, first, last):
+    """
+    Compute the mean quaternion of windows of arbitrary length. The outer
+    products are accumulated once for the whole array, hence the cost does not
+    depend on the window lengths.
+
+    Parameters
+    ----------
+    qs: numpy.ndarray
+        an array of shape (N, 4) holding unit quaternions.
+    first: numpy.ndarray
+        an array of shape (W,) holding the index of the first quaternion of
+        each window.
+    last: numpy.ndarray
+        an array of shape (W,) holding the index of the last quaternion of
+        each window.
+
+    Returns
+    -------
+    numpy.ndarray
+        an array of shape (W, 4) holding the unit mean quaternions with a
+        non-negative w component.
+    """
+    acc = np.zeros((len(qs) + 1, 4, 4))
+    np.cumsum(np.einsum("ni,nj->nij", qs, qs), axis=0, out=acc[1:])
+    return quaternionMeanFromSum(acc[np.asarray(last) + 1]
+            - acc[np.asarray(first)])
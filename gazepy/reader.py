@@ -0,0 +1,179 @@
+"""
+Chunked reading of gaze tracker CSV exports. The reader streams a file in
+chunks of a fixed number of rows and converts each chunk column by column
+into a structured array. The columns are selected and typed through a
+declarative column mapping.
+"""
+
+import csv
+import itertools
+import numpy as np
+
+from .gazepy import GazepyLabels
+
+DATETIME = "datetime"
+"""
+The column type of datetime columns. Datetime strings are converted to
+milliseconds since the epoch (float64).
+"""
+
+LABEL = "label"
+"""
+The column type of label columns. Labels are converted to integer label
+codes (int32) of the label dictionary of the reader (see GazepyLabels).
+"""
+
+COLUMNS_SAMPLE = {
+    "trial_id": ("trial_id", np.uint32),
+    "screen_point": (("sx", "sy"), np.float32),
+    "point": (("px", "py", "pz"), np.float32),
+    "origin": (("ox", "oy", "oz"), np.float32),
+    "timestamp": ("timestamp", np.float64),
+    "label": ("label", LABEL)
+}
+"""
+The column mapping of gaze sample exports (see example/sample.csv). The
+resulting chunks are of type SAMPLE_DTYPE.
+"""
+
+COLUMNS_POSE = {
+    "position": (("pos.x", "pos.y", "pos.z"), np.float64),
+    "orientation": (("ori.qw", "ori.qx", "ori.qy", "ori.qz"), np.float64),
+    "timestamp": ("streamix_timestamp", DATETIME)
+}
+"""
+The column mapping of head pose exports (see scripts/samples/sample.csv).
+"""
+
+class GazepyCsvReader():
+    """
+    A chunked CSV reader. Iterating the reader yields structured arrays of at
+    most chunk_size rows, hence the memory consumption does not depend on the
+    file size.
+    """
+
+    def __init__(self, path, columns=COLUMNS_SAMPLE, chunk_size=65536,
+            delimiter=","):
+        """
+        Parameters
+        ----------
+        path: str
+            the path to the CSV file. The first row must hold the column names.
+        columns: dict, optional
+            the column mapping. Each item maps a field name of the resulting
+            structured array to a tuple (source, type) where source is either
+            a column name or a tuple of column names and type is either a
+            numpy type, DATETIME or LABEL. Multiple column names result in a
+            subarray field. Defaults to COLUMNS_SAMPLE.
+        chunk_size: int, optional
+            the maximal number of rows per chunk. Defaults to 65536.
+        delimiter: str, optional
+            the column delimiter. Defaults to ",".
+        """
+        self.path = path
+        self.columns = columns
+        self.chunk_size = chunk_size
+        self.delimiter = delimiter
+        self.labels = GazepyLabels()
+        fields = []
+        for name, (source, kind) in columns.items():
+            if kind == DATETIME:
+                kind = np.float64
+            elif kind == LABEL:
+                kind = np.int32
+            if isinstance(source, str):
+                fields.append((name, kind))
+            else:
+                fields.append((name, kind, (len(source),)))
+        self.dtype = np.dtype(fields)
+
+    def __iter__(self):
+        with open(self.path, newline="") as csvfile:
+            rows = csv.reader(csvfile, delimiter=self.delimiter)
+            header = {name: idx for idx, name in enumerate(next(rows, []))}
+            missing = [name for source, _ in self.columns.values()
+                    for name in ((source,) if isinstance(source, str)
+                        else source)
+                    if name not in header]
+            if missing:
+                raise KeyError(f"missing columns in {self.path}: {missing}")
+            # empty rows, e.g. a trailing blank line, are skipped, the line
+            # numbers are kept for error messages
+            numbered = ((rows.line_num, row) for row in rows if row)
+            while True:
+                chunk = list(itertools.islice(numbered, self.chunk_size))
+                if not chunk:
+                    break
+                lines, chunk = zip(*chunk)
+                yield self.__convert(chunk, lines, header)
+
+    def __convert(self, chunk, lines, header):
+        width = len(header)
+        for line, row in zip(lines, chunk):
+            if len(row) < width:
+                raise ValueError(f"{self.path}:{line}: expected {width}"
+                        f" columns, got {len(row)}")
+        data = list(zip(*chunk))
+        res = np.empty(len(chunk), dtype=self.dtype)
+        for name, (source, kind) in self.columns.items():
+            if isinstance(source, str):
+                res[name] = self.__column(data[header[source]], kind, source,
+                        lines)
+            else:
+                for idx, column in enumerate(source):
+                    res[name][:, idx] = self.__column(data[header[column]],
+                            kind, column, lines)
+        return res
+
+    def __column(self, values, kind, column, lines):
+        if kind == DATETIME:
+            values = np.array(values, dtype="datetime64[us]")
+            return values.astype(np.int64) / 1000
+        if kind == LABEL:
+            return self.labels.codes(values)
+        try:
+            return np.array(values, dtype=kind)
+        except ValueError:
+            if not np.issubdtype(kind, np.floating):
+                # integers have no missing value
+                line = next((line for line, value in zip(lines, values)
+                    if not value.strip().lstrip("+-").isdigit()), "?")
+                raise ValueError(f"{self.path}:{line}: invalid value in"
+                        f" integer column {column!r}") from None
+            # empty fields are treated as missing values
+            return np.array([value or "nan" for value in values],
+                    dtype=kind)
+
+    def read(self):
+        """
+        Read the whole file at once.
+
+        Returns
+        -------
+        numpy.ndarray
+            the structured array holding all rows of the file.
+        """
+        chunks = list(self)
+        if not chunks:
+            return np.empty(0, dtype=self.dtype)
+        return np.concatenate(chunks)
+
+def readCsv(path, columns=COLUMNS_SAMPLE):
+    """
+    Read a whole CSV file into a structured array.
+
+    Parameters
+    ----------
+    path: str
+        the path to the CSV file.
+    columns: dict, optional
+        the column mapping (see GazepyCsvReader). Defaults to COLUMNS_SAMPLE.
+
+    Returns
+    -------
+    tuple
+        the structured array holding all rows of the file and the label
+        dictionary (GazepyLabels) of the label codes.
+    """
+    reader = GazepyCsvReader(path, columns)
+    return (reader.read(), reader.labels)
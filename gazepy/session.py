@@ -0,0 +1,227 @@
+"""
+Concurrent analysis of many gaze sessions, e.g. of many participants served
+by one process. Each session has its own gaze analysis handler. Sample
+batches are analysed by a thread pool while the batches of a session are
+analysed one after another in the order they were submitted.
+
+Sessions are analysed concurrently, i.e. the batches of different sessions
+overlap in time, but not in parallel. Gazepy.analyse() loops over the
+samples in Python and holds the GIL between the calls into libgac, hence
+the analysis of the sessions is interleaved on both backends. The thread
+pool keeps a long batch of one session from delaying the other sessions,
+it does not add throughput.
+"""
+
+from collections import deque
+import concurrent.futures
+import threading
+import time
+
+from .gazepy import Gazepy
+
+class _GazepySession():
+    __slots__ = ("session_id", "handler", "pending", "is_running",
+            "last_used", "successor")
+
+    def __init__(self, session_id, handler):
+        self.session_id = session_id
+        self.handler = handler
+        # the submitted batches and their futures in submission order
+        self.pending = deque()
+        self.is_running = False
+        self.last_used = time.monotonic()
+        # the session reusing the ID after this session was closed
+        self.successor = None
+
+class GazepySessionManager():
+    """
+    The session manager keeps a gaze analysis handler per session ID and
+    dispatches submitted sample batches to a thread pool. A session is
+    created on the first submission of its ID. At most one batch of a session
+    is analysed at a time, hence the handlers need no further locking.
+    """
+
+    def __init__(self, params=None, backend=None, max_workers=None):
+        """
+        Parameters
+        ----------
+        params: GazepyFilterParameter, optional
+            the filter parameters of the handlers of new sessions.
+        backend: str, optional
+            the backend of the handlers of new sessions (see Gazepy).
+        max_workers: int, optional
+            the number of worker threads. Defaults to the default of
+            concurrent.futures.ThreadPoolExecutor.
+        """
+        self.params = params
+        self.backend = backend
+        self.__executor = concurrent.futures.ThreadPoolExecutor(max_workers,
+                thread_name_prefix="gazepy")
+        self.__sessions = {}
+        # the closed sessions still analysing batches by session ID
+        self.__draining = {}
+        # guards the session tables and the state of all sessions
+        self.__lock = threading.Lock()
+        # notified when a session has no batches left
+        self.__idle = threading.Condition(self.__lock)
+        self.__is_shutdown = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__sessions)
+
+    def sessions(self):
+        """
+        Get the IDs of all open sessions.
+
+        Returns
+        -------
+        list
+            the session IDs.
+        """
+        with self.__lock:
+            return list(self.__sessions)
+
+    def submit(self, session_id, samples):
+        """
+        Submit a batch of samples for analysis.
+
+        Parameters
+        ----------
+        session_id: hashable
+            the ID of the session. A new session is created if the ID is
+            unknown.
+        samples: iterable of tuple
+            the gaze samples, each holding the arguments of Gazepy.update()
+            (9 items) or Gazepy.updateWithScreen() (11 items).
+
+        Returns
+        -------
+        concurrent.futures.Future
+            the future of the list of fixation and saccade records detected
+            in the batch.
+
+        Raises
+        ------
+        RuntimeError
+            if the session manager was shut down.
+        """
+        future = concurrent.futures.Future()
+        with self.__lock:
+            if self.__is_shutdown:
+                raise RuntimeError("the session manager was shut down")
+            session = self.__sessions.get(session_id)
+            if session is None:
+                session = _GazepySession(session_id,
+                        Gazepy(self.params, self.backend))
+                self.__sessions[session_id] = session
+                closed = self.__draining.get(session_id)
+                if closed is not None:
+                    # the batches of the closed session are analysed first,
+                    # the new session is analysed by the same thread
+                    closed.successor = session
+                    session.is_running = True
+            session.pending.append((samples, future))
+            session.last_used = time.monotonic()
+            if not session.is_running:
+                session.is_running = True
+                self.__executor.submit(self.__run, session)
+        return future
+
+    def __run(self, session):
+        # analyse the pending batches of a session until none is left
+        while True:
+            with self.__lock:
+                if not session.pending:
+                    session.is_running = False
+                    if self.__draining.get(session.session_id) is session:
+                        del self.__draining[session.session_id]
+                    self.__idle.notify_all()
+                    if session.successor is None:
+                        return
+                    session = session.successor
+                    continue
+                samples, future = session.pending.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(session.handler.analyse(samples))
+            except Exception as e:
+                future.set_exception(e)
+
+    def close(self, session_id, wait=True):
+        """
+        Close a session. Batches already submitted are still analysed, the
+        handler is released afterwards. Submitting to the session ID again
+        creates a new session whose batches are analysed after the batches
+        of the closed session.
+
+        Parameters
+        ----------
+        session_id: hashable
+            the ID of the session.
+        wait: bool, optional
+            wait until the submitted batches of the session were analysed.
+            Must not be True if called from a batch of the session manager.
+            Defaults to True.
+
+        Returns
+        -------
+        bool
+            True if the session was open, False otherwise.
+        """
+        with self.__lock:
+            session = self.__sessions.pop(session_id, None)
+            if session is None:
+                return False
+            if session.is_running:
+                self.__draining[session_id] = session
+                if wait:
+                    self.__idle.wait_for(lambda: not session.is_running)
+            return True
+
+    def reclaim(self, max_idle):
+        """
+        Close all sessions without pending batches which received no samples
+        for a while.
+
+        Parameters
+        ----------
+        max_idle: float
+            the idle time in seconds after which a session is closed.
+
+        Returns
+        -------
+        list
+            the IDs of the closed sessions.
+        """
+        deadline = time.monotonic() - max_idle
+        with self.__lock:
+            closed = [session_id for session_id, session in
+                    self.__sessions.items()
+                    if not session.is_running and session.last_used < deadline]
+            for session_id in closed:
+                del self.__sessions[session_id]
+        return closed
+
+    def shutdown(self, wait=True):
+        """
+        Close all sessions and shut the thread pool down. Batches already
+        submitted are still analysed.
+
+        Parameters
+        ----------
+        wait: bool, optional
+            wait until all batches were analysed. Defaults to True.
+        """
+        with self.__lock:
+            self.__is_shutdown = True
+            self.__sessions.clear()
+            self.__draining.clear()
+        self.__executor.shutdown(wait)
@@ -0,0 +1,269 @@
+"""
+Instrumentation of the gaze analysis handler. When enabled, the hot path
+methods of a handler are wrapped to count calls, samples and detected events
+and to record the call latencies in histograms with logarithmic buckets.
+When disabled, the methods are not wrapped and no cost is added.
+"""
+
+import time
+
+from .events import STEP_FIXATION, STEP_SACCADE
+
+STAGES = ("update", "fixationFilter", "saccadeFilter", "cleanup", "process",
+        "step")
+"""
+The instrumented stages. Calls of update() and updateWithScreen() are both
+counted as stage update. Calls of step() are counted as stage step only, the
+samples and events they add are counted as for the separate calls.
+"""
+
+class GazepyHistogram():
+    """
+    A latency histogram with power of two buckets. Bucket i counts latencies
+    in the range [2^(i-1), 2^i) nanoseconds.
+    """
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * 64
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        """
+        Add a latency.
+
+        Parameters
+        ----------
+        value: int
+            the latency in nanoseconds.
+        """
+        self.buckets[value.bit_length()] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """
+        Estimate a quantile of the latencies.
+
+        Parameters
+        ----------
+        q: float
+            the quantile in [0, 1].
+
+        Returns
+        -------
+        int
+            the upper bound in nanoseconds of the bucket holding the quantile
+            or 0 if the histogram is empty.
+        """
+        rank = q * self.count
+        seen = 0
+        for idx, count in enumerate(self.buckets):
+            seen += count
+            if count > 0 and seen >= rank:
+                return min(1 << idx, self.max)
+        return 0
+
+    def snapshot(self):
+        """
+        Get the state of the histogram.
+
+        Returns
+        -------
+        dict
+            the number of calls, the total, mean, median, 99th percentile and
+            maximal latency in nanoseconds and the non-empty buckets mapping
+            the upper bucket bound to the count.
+        """
+        return {
+            "count": self.count,
+            "total_ns": self.total,
+            "mean_ns": self.total / self.count if self.count else 0,
+            "p50_ns": self.quantile(0.5),
+            "p99_ns": self.quantile(0.99),
+            "max_ns": self.max,
+            "buckets": {1 << idx: count for idx, count in
+                enumerate(self.buckets) if count > 0}
+        }
+
+class GazepyStats():
+    """
+    The statistics of an instrumented gaze analysis handler (see
+    Gazepy.enableStats()).
+    """
+
+    def __init__(self):
+        self.latency = {stage: GazepyHistogram() for stage in STAGES}
+        self.fixations = 0
+        self.saccades = 0
+        # samples passed to update() and samples added to the sample window
+        self.samples = 0
+        self.samples_added = 0
+        self.samples_filled = 0
+        self.window_length = None
+        self.window_peak = None
+        self.window_memory = None
+        self.window_memory_peak = None
+
+    def snapshot(self):
+        """
+        Get the current statistics.
+
+        Returns
+        -------
+        dict
+            the statistics with the items calls (calls per stage), events
+            (detected fixations and saccades), samples (received samples,
+            samples added to the sample window and samples filled in by the
+            gap filter), window (current and peak sample window length and
+            estimated memory in bytes, see Gazepy.windowLength() and
+            Gazepy.windowMemory()) and latency (the histogram snapshot per
+            stage). The window items are None if the backend does not report
+            its sample window, i.e. for the libgac backend. libgac does not
+            report the samples filled in by its gap filter either, they are
+            estimated from the samples added per update. The estimate misses
+            gaps filled while the noise filter window fills up.
+        """
+        return {
+            "calls": {stage: histogram.count for stage, histogram in
+                self.latency.items()},
+            "events": {
+                "fixations": self.fixations,
+                "saccades": self.saccades
+            },
+            "samples": {
+                "received": self.samples,
+                "added": self.samples_added,
+                "filled": self.samples_filled
+            },
+            "window": {
+                "length": self.window_length,
+                "peak": self.window_peak,
+                "memory": self.window_memory,
+                "memory_peak": self.window_memory_peak
+            },
+            "latency": {stage: histogram.snapshot() for stage, histogram in
+                self.latency.items()}
+        }
+
+    def _window(self, handler):
+        length = handler.windowLength()
+        if length is None:
+            return
+        memory = handler.windowMemory()
+        self.window_length = length
+        self.window_memory = memory
+        if self.window_peak is None or length > self.window_peak:
+            self.window_peak = length
+        if self.window_memory_peak is None or memory > self.window_memory_peak:
+            self.window_memory_peak = memory
+
+    def _filled(self, handler, count):
+        filled = handler.gap_filled
+        if filled is None:
+            # all but the new sample were filled in by the gap filter, the
+            # noise filter adds as many samples as it receives once full
+            filled = max(count - 1, 0)
+        self.samples_filled += filled
+
+    def _wrapUpdate(self, method, handler):
+        histogram = self.latency["update"]
+        clock = time.perf_counter_ns
+
+        def update(*args):
+            start = clock()
+            count = method(*args)
+            histogram.add(clock() - start)
+            self.samples += 1
+            self.samples_added += count
+            self._filled(handler, count)
+            self._window(handler)
+            return count
+        return update
+
+    def _wrapFilter(self, stage, method):
+        histogram = self.latency[stage]
+        clock = time.perf_counter_ns
+        is_fixation = stage == "fixationFilter"
+
+        def filter():
+            start = clock()
+            event = method()
+            histogram.add(clock() - start)
+            if event is not None:
+                if is_fixation:
+                    self.fixations += 1
+                else:
+                    self.saccades += 1
+            return event
+        return filter
+
+    def _wrapCleanup(self, method, handler):
+        histogram = self.latency["cleanup"]
+        clock = time.perf_counter_ns
+
+        def cleanup():
+            start = clock()
+            method()
+            histogram.add(clock() - start)
+            self._window(handler)
+        return cleanup
+
+    def _wrapProcess(self, method):
+        histogram = self.latency["process"]
+        clock = time.perf_counter_ns
+
+        def process(*args, **kwargs):
+            start = clock()
+            fixations, saccades = method(*args, **kwargs)
+            histogram.add(clock() - start)
+            self.fixations += len(fixations)
+            self.saccades += len(saccades)
+            return (fixations, saccades)
+        return process
+
+    def _wrapStep(self, method, handler):
+        histogram = self.latency["step"]
+        clock = time.perf_counter_ns
+
+        def step(*args, **kwargs):
+            start = clock()
+            status = method(*args, **kwargs)
+            histogram.add(clock() - start)
+            self.samples += 1
+            count = handler.step_added
+            self.samples_added += count
+            self._filled(handler, count)
+            if status & STEP_FIXATION:
+                self.fixations += 1
+            if status & STEP_SACCADE:
+                self.saccades += 1
+            self._window(handler)
+            return status
+        return step
+
+    def _instrument(self, handler):
+        # the wrappers shadow the methods of the class on the instance
+        methods = {
+            "update": self._wrapUpdate(handler.update, handler),
+            "updateWithScreen": self._wrapUpdate(handler.updateWithScreen,
+                handler),
+            "fixationFilter": self._wrapFilter("fixationFilter",
+                handler.fixationFilter),
+            "saccadeFilter": self._wrapFilter("saccadeFilter",
+                handler.saccadeFilter),
+            "cleanup": self._wrapCleanup(handler.cleanup, handler),
+            "process": self._wrapProcess(handler.process),
+            "step": self._wrapStep(handler.step, handler)
+        }
+        for name, method in methods.items():
+            setattr(handler, name, method)
+
+    def _uninstrument(self, handler):
+        for name in ("update", "updateWithScreen", "fixationFilter",
+                "saccadeFilter", "cleanup", "process", "step"):
+            vars(handler).pop(name, None)
@@ -0,0 +1,188 @@
+"""
+Parameter sweeps over the filter parameters of the vectorized pipeline.
+Configurations sharing the same gap and noise filter parameters share the
+preprocessed recording: gap filling, noise filtering and the gaze angles and
+velocities are computed once per group. The detectors of the group are then
+run for each distinct velocity threshold and each distinct pair of
+dispersion and duration thresholds, the fixation detectors in parallel
+worker processes.
+"""
+
+import concurrent.futures
+import itertools
+import os
+import numpy as np
+
+from . import vectorized
+from .gazepy import GazepyFilterParameter, getFilterParameterDefault
+from .jit import isJitEnabled
+
+SWEEP_DTYPE = np.dtype([
+    ("config", np.uint32),
+    ("max_gap_length", np.float64),
+    ("sample_period", np.float64),
+    ("noise_type", np.uint32),
+    ("noise_mid_idx", np.uint32),
+    ("velocity_threshold", np.float32),
+    ("duration_threshold", np.float64),
+    ("dispersion_threshold", np.float32),
+    ("sample_count", np.uint32),
+    ("fixation_count", np.uint32),
+    ("fixation_duration", np.float64),
+    ("saccade_count", np.uint32),
+    ("saccade_duration", np.float64)
+])
+"""
+The data type of the sweep result table. Each row holds the parameters of a
+configuration, the number of preprocessed samples, the number of detected
+fixations and saccades and their mean durations in milliseconds (nan if none
+was detected).
+"""
+
+def gridParameters(grid, params=None):
+    """
+    Expand a parameter grid into filter parameter configurations.
+
+    Parameters
+    ----------
+    grid: dict
+        maps parameter names of the form "<group>.<name>", e.g.
+        "saccade.velocity_threshold", to the sequence of values to sweep.
+    params: GazepyFilterParameter, optional
+        the parameters of all parameters not in the grid. Defaults to
+        the defaults of the NumPy backend.
+
+    Returns
+    -------
+    list of GazepyFilterParameter
+        the cartesian product of the grid values. The last grid item varies
+        fastest.
+    """
+    if params is None:
+        params = getFilterParameterDefault("numpy")
+    names = [name.split(".") for name in grid]
+    configs = []
+    for values in itertools.product(*grid.values()):
+        config = GazepyFilterParameter.from_buffer_copy(params)
+        for (group, name), value in zip(names, values):
+            setattr(getattr(config, group), name, value)
+        configs.append(config)
+    return configs
+
+def _fixationTask(timestamp, extrema, thresholds):
+    if not isJitEnabled():
+        # convert once for all thresholds instead of once per threshold
+        timestamp = timestamp.tolist()
+        extrema = extrema.tolist()
+    return [vectorized._fixationIndices(timestamp, extrema, dispersion,
+        duration) for dispersion, duration in thresholds]
+
+def _meanDuration(events):
+    if len(events) == 0:
+        return np.nan
+    return events["duration"].mean()
+
+def sweep(samples, grid, params=None, max_workers=None):
+    """
+    Run the vectorized pipeline for many filter parameter configurations.
+
+    Parameters
+    ----------
+    samples: numpy.ndarray
+        the sample array of type SAMPLE_DTYPE.
+    grid: dict, list of GazepyFilterParameter
+        either a parameter grid (see gridParameters()) or a list of filter
+        parameter configurations.
+    params: GazepyFilterParameter, optional
+        the parameters of all parameters not in the grid (see
+        gridParameters()).
+    max_workers: int, optional
+        the number of worker processes running the fixation detectors.
+        Defaults to the number of CPUs. If 1, all detectors run in the
+        calling process.
+
+    Returns
+    -------
+    tuple
+        the result table of type SWEEP_DTYPE with one row per configuration
+        and the list of detections per configuration, each a tuple of the
+        fixations (FIXATION_DTYPE) and the saccades (SACCADE_DTYPE).
+    """
+    if isinstance(grid, dict):
+        configs = gridParameters(grid, params)
+    else:
+        configs = list(grid)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    # group the configurations by their preprocessing parameters
+    groups = {}
+    for idx, config in enumerate(configs):
+        key = (config.gap.max_gap_length, config.gap.sample_period,
+                config.noise.type, config.noise.mid_idx)
+        groups.setdefault(key, []).append(idx)
+
+    table = np.zeros(len(configs), dtype=SWEEP_DTYPE)
+    events = [None] * len(configs)
+    executor = None
+    if max_workers > 1:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers)
+    try:
+        pending = []
+        for (max_gap_length, sample_period, noise_type, mid_idx), members \
+                in groups.items():
+            group = vectorized.gapFilter(samples, max_gap_length,
+                    sample_period)
+            group = vectorized.noiseFilter(group, noise_type, mid_idx)
+
+            thresholds = list(dict.fromkeys(
+                (configs[idx].fixation.dispersion_threshold,
+                    configs[idx].fixation.duration_threshold)
+                for idx in members))
+            timestamp = group["timestamp"]
+            extrema = vectorized._fixationExtrema(group)
+            if executor is None:
+                chunks = [thresholds]
+                fixations = [_fixationTask(timestamp, extrema, thresholds)]
+            else:
+                size = -(-len(thresholds) // max_workers)
+                chunks = [thresholds[idx:idx + size]
+                        for idx in range(0, len(thresholds), size)]
+                fixations = [executor.submit(_fixationTask, timestamp,
+                    extrema, chunk) for chunk in chunks]
+
+            velocity = vectorized.gazeVelocity(group)
+            saccades = {}
+            for idx in members:
+                threshold = configs[idx].saccade.velocity_threshold
+                if threshold not in saccades:
+                    saccades[threshold] = vectorized.saccadeEvents(group,
+                            *vectorized._saccadeIndices(velocity, threshold))
+            pending.append((group, members, chunks, fixations, saccades))
+
+        for group, members, chunks, fixations, saccades in pending:
+            detected = {}
+            for chunk, result in zip(chunks, fixations):
+                if executor is not None:
+                    result = result.result()
+                for thresholds, indices in zip(chunk, result):
+                    detected[thresholds] = vectorized.fixationEvents(group,
+                            *indices)
+            for idx in members:
+                config = configs[idx]
+                fixation = detected[(config.fixation.dispersion_threshold,
+                    config.fixation.duration_threshold)]
+                saccade = saccades[config.saccade.velocity_threshold]
+                events[idx] = (fixation, saccade)
+                table[idx] = (idx, config.gap.max_gap_length,
+                        config.gap.sample_period, config.noise.type,
+                        config.noise.mid_idx,
+                        config.saccade.velocity_threshold,
+                        config.fixation.duration_threshold,
+                        config.fixation.dispersion_threshold, len(group),
+                        len(fixation), _meanDuration(fixation), len(saccade),
+                        _meanDuration(saccade))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return (table, events)
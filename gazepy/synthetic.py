@@ -0,0 +1,250 @@
+"""
+Synthetic gaze recordings of arbitrary length, e.g. for benchmarks. Gaze
+samples are shaped like example/sample.csv and head poses like
+scripts/samples/sample.csv. Recordings alternate between fixations and
+saccades with random targets, durations and measurement noise. The
+recordings are reproducible through the seed of the random generator.
+"""
+
+import csv
+import numpy as np
+
+from .gazepy import GazepyLabels
+from .vectorized import SAMPLE_DTYPE
+
+POSE_DTYPE = np.dtype([
+    ("position", np.float64, (3,)),
+    ("orientation", np.float64, (4,)),
+    ("timestamp", np.float64)
+])
+"""
+The data type of head poses. The orientation is a unit quaternion
+(w, x, y, z). The timestamp is given in milliseconds. This corresponds to the
+result of reading a pose export with reader.COLUMNS_POSE.
+"""
+
+LABEL_FIXATION = "fixation"
+"""
+The label of samples belonging to a synthetic fixation.
+"""
+
+LABEL_SACCADE = "saccade"
+"""
+The label of samples belonging to a synthetic saccade.
+"""
+
+def _segments(rng, count, sample_period, fixation_duration,
+        saccade_duration):
+    # the target index and the saccade flag of each sample
+    target = np.empty(count, dtype=np.int64)
+    is_saccade = np.zeros(count, dtype=bool)
+    # the progress of each sample within its saccade in [0, 1)
+    progress = np.zeros(count)
+    idx = 0
+    segment = 0
+    while idx < count:
+        length = max(1, round(rng.uniform(*fixation_duration) / sample_period))
+        target[idx:idx + length] = segment
+        idx += length
+        length = max(1, round(rng.uniform(*saccade_duration) / sample_period))
+        stop = min(idx + length, count)
+        target[idx:stop] = segment
+        is_saccade[idx:stop] = True
+        progress[idx:stop] = np.arange(1, stop - idx + 1) / (length + 1)
+        idx = stop
+        segment += 1
+    return (target, is_saccade, progress, segment + 1)
+
+def createSamples(count, sample_period=1000/60, fixation_duration=(150, 600),
+        saccade_duration=(20, 60), noise=0.5, dropout=0, trial_duration=10000,
+        seed=None):
+    """
+    Create a synthetic gaze recording. The gaze origin is placed in front of
+    a screen in the plane z = 500 spanning 1000 x 1000 units. Fixation
+    targets are uniformly distributed on the screen and saccades move the
+    gaze point along a smooth path between consecutive targets. The screen
+    points are the gaze points normalized to the screen size.
+
+    Parameters
+    ----------
+    count: int
+        the number of samples before dropout.
+    sample_period: float, optional
+        the sample period in milliseconds. Defaults to 1000/60.
+    fixation_duration: tuple of float, optional
+        the range of the fixation durations in milliseconds. Defaults to
+        (150, 600).
+    saccade_duration: tuple of float, optional
+        the range of the saccade durations in milliseconds. Defaults to
+        (20, 60).
+    noise: float, optional
+        the standard deviation of the gaze point noise. Defaults to 0.5.
+    dropout: float, optional
+        the probability of a sample to be dropped, producing gaps. Defaults
+        to 0.
+    trial_duration: float, optional
+        the duration of a trial in milliseconds. Defaults to 10000.
+    seed: int, optional
+        the seed of the random generator.
+
+    Returns
+    -------
+    tuple
+        the sample array of type SAMPLE_DTYPE and the label dictionary
+        (GazepyLabels) of the label codes.
+    """
+    rng = np.random.default_rng(seed)
+    target, is_saccade, progress, targets = _segments(rng, count,
+            sample_period, fixation_duration, saccade_duration)
+    targets = rng.uniform(0, 1000, (targets, 2))
+    # smooth step between the current and the next target
+    step = (progress * progress * (3 - 2 * progress))[:, None]
+    xy = targets[target] + step * (targets[target + 1] - targets[target])
+    xy += rng.normal(0, noise, xy.shape)
+
+    samples = np.zeros(count, dtype=SAMPLE_DTYPE)
+    samples["point"][:, :2] = xy
+    samples["point"][:, 2] = 500
+    samples["origin"] = (495, 505, 10)
+    samples["screen_point"] = xy / 1000
+    samples["timestamp"] = 1000 + np.arange(count) * sample_period
+    samples["trial_id"] = (np.arange(count) * sample_period
+            // trial_duration)
+    labels = GazepyLabels([LABEL_FIXATION, LABEL_SACCADE])
+    samples["label"] = is_saccade
+    if dropout > 0:
+        keep = rng.random(count) >= dropout
+        keep[0] = True
+        samples = samples[keep]
+    return (samples, labels)
+
+def _rotation(direction):
+    # the shortest rotation of the x axis onto the unit direction
+    q = np.stack([1 + direction[:, 0], np.zeros(len(direction)),
+        -direction[:, 2], direction[:, 1]], axis=1)
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+def createPoses(count, sample_period=1000/120, fixation_duration=(200, 800),
+        saccade_duration=(30, 80), noise=0.1, speed=0.3, dropout=0,
+        start=1671038772449.0, seed=None):
+    """
+    Create a synthetic head pose recording. The head walks slowly through the
+    room while the gaze direction (the x axis of the head orientation) keeps
+    pointing at a fixation target. Between fixations the gaze direction
+    rotates towards the next target.
+
+    Parameters
+    ----------
+    count: int
+        the number of poses before dropout.
+    sample_period: float, optional
+        the sample period in milliseconds. Defaults to 1000/120.
+    fixation_duration: tuple of float, optional
+        the range of the fixation durations in milliseconds. Defaults to
+        (200, 800).
+    saccade_duration: tuple of float, optional
+        the range of the saccade durations in milliseconds. Defaults to
+        (30, 80).
+    noise: float, optional
+        the standard deviation of the gaze direction noise in degrees.
+        Defaults to 0.1.
+    speed: float, optional
+        the walking speed in units per second. Defaults to 0.3.
+    dropout: float, optional
+        the probability of a pose to be dropped, producing gaps. Defaults to
+        0.
+    start: float, optional
+        the timestamp of the first pose in milliseconds since the epoch.
+        Defaults to the start of scripts/samples/sample.csv.
+    seed: int, optional
+        the seed of the random generator.
+
+    Returns
+    -------
+    numpy.ndarray
+        the poses of type POSE_DTYPE.
+    """
+    rng = np.random.default_rng(seed)
+    target, is_saccade, progress, targets = _segments(rng, count,
+            sample_period, fixation_duration, saccade_duration)
+
+    # a random walk with a slowly changing heading
+    heading = np.cumsum(rng.normal(0, 0.05, count))
+    step = speed * sample_period / 1000
+    position = np.zeros((count, 3))
+    position[:, 0] = -9.1 + np.cumsum(step * np.cos(heading))
+    position[:, 1] = -2.0 + np.cumsum(step * np.sin(heading))
+    position[:, 2] = 1.76 + rng.normal(0, 0.002, count)
+
+    # fixation targets around the walking path
+    targets = rng.normal(0, 2, (targets, 3))
+    targets[:, 2] = rng.uniform(0, 2.5, len(targets))
+    anchor = position[np.minimum(np.searchsorted(target, np.arange(
+        len(targets))), count - 1)]
+    targets[:, :2] += anchor[:, :2]
+    current = targets[target] - position
+    current /= np.linalg.norm(current, axis=1, keepdims=True)
+    following = targets[target + 1] - position
+    following /= np.linalg.norm(following, axis=1, keepdims=True)
+    step = (progress * progress * (3 - 2 * progress))[:, None]
+    direction = current + step * (following - current)
+    direction += rng.normal(0, np.radians(noise), direction.shape)
+    direction /= np.linalg.norm(direction, axis=1, keepdims=True)
+
+    poses = np.empty(count, dtype=POSE_DTYPE)
+    poses["position"] = position
+    poses["orientation"] = _rotation(direction)
+    poses["timestamp"] = start + np.arange(count) * sample_period
+    if dropout > 0:
+        keep = rng.random(count) >= dropout
+        keep[0] = True
+        poses = poses[keep]
+    return poses
+
+def writeSamples(path, samples, labels):
+    """
+    Write gaze samples to a CSV file in the format of example/sample.csv.
+
+    Parameters
+    ----------
+    path: str
+        the path to the CSV file.
+    samples: numpy.ndarray
+        the samples of type SAMPLE_DTYPE.
+    labels: GazepyLabels, list of str
+        the labels indexed by the label codes of the samples.
+    """
+    labels = list(labels)
+    with open(path, "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["sx", "sy", "px", "py", "pz", "ox", "oy", "oz",
+            "timestamp", "trial_id", "label"])
+        writer.writerows(zip(*samples["screen_point"].T.tolist(),
+            *samples["point"].T.tolist(), *samples["origin"].T.tolist(),
+            samples["timestamp"].tolist(), samples["trial_id"].tolist(),
+            [labels[code] for code in samples["label"].tolist()]))
+
+def writePoses(path, poses):
+    """
+    Write head poses to a CSV file in the format of
+    scripts/samples/sample.csv.
+
+    Parameters
+    ----------
+    path: str
+        the path to the CSV file.
+    poses: numpy.ndarray
+        the poses of type POSE_DTYPE.
+    """
+    count = len(poses)
+    timestamp = (poses["timestamp"] * 1000).astype("datetime64[us]")
+    timestamp = np.datetime_as_string(timestamp)
+    with open(path, "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["", "pos.x", "pos.y", "pos.z", "ori.qx", "ori.qy",
+            "ori.qz", "ori.qw", "is_calibrated", "calibration_rms", "space",
+            "streamix_timestamp"])
+        w, x, y, z = poses["orientation"].T.tolist()
+        writer.writerows(zip(range(count), *poses["position"].T.tolist(),
+            x, y, z, w, ["True"] * count, [0.05] * count, ["lab"] * count,
+            [item.replace("T", " ") for item in timestamp]))
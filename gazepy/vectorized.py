@@ -0,0 +1,600 @@
+"""
+Vectorized NumPy implementations of the libgac filters. The functions in this
+module operate on whole recordings at once and do not require libgac.
+"""
+
+import numpy as np
+
+from .jit import isJitEnabled, kernel
+
+SAMPLE_DTYPE = np.dtype([
+        ("trial_id", np.uint32),
+        ("screen_point", np.float32, (2,)),
+        ("point", np.float32, (3,)),
+        ("origin", np.float32, (3,)),
+        ("timestamp", np.float64),
+        ("label", np.int32)
+])
+"""
+The structured array type of a recording. The fields correspond to the fields
+of GazepySample with the label stored as integer label code.
+"""
+
+FIXATION_DTYPE = np.dtype([
+        ("timestamp", np.float64),
+        ("duration", np.float64),
+        ("screen_point", np.float32, (2,)),
+        ("point", np.float32, (3,)),
+        ("trial_id", np.uint32),
+        ("label", np.int32)
+])
+"""
+The structured array type of the fixations returned by Gazepy.process().
+"""
+
+SACCADE_DTYPE = np.dtype([
+        ("timestamp", np.float64),
+        ("duration", np.float64),
+        ("first_screen_point", np.float32, (2,)),
+        ("first_point", np.float32, (3,)),
+        ("last_screen_point", np.float32, (2,)),
+        ("last_point", np.float32, (3,)),
+        ("trial_id", np.uint32),
+        ("label", np.int32),
+        ("amplitude", np.float32)
+])
+"""
+The structured array type of the saccades returned by Gazepy.process(). The
+amplitude is the angle in degrees between the gaze directions of the first
+and the last sample.
+"""
+
+NOISE_TYPE_AVERAGE = 0
+"""
+The noise filter type computing the moving average (see
+GazepyFilterParameterNoise).
+"""
+
+NOISE_TYPE_MEDIAN = 1
+"""
+The noise filter type computing the moving median (see
+GazepyFilterParameterNoise).
+"""
+
+COORDINATE_FIELDS = ("screen_point", "point", "origin")
+"""
+The fields of SAMPLE_DTYPE holding coordinates.
+"""
+
+def createSamples(origin, point, timestamp, trial_id=None, label=None,
+        screen_point=None):
+    """
+    Create a structured sample array from individual data columns.
+
+    Parameters
+    ----------
+    origin: numpy.ndarray
+        an array of shape (N, 3) holding the gaze origins.
+    point: numpy.ndarray
+        an array of shape (N, 3) holding the gaze points.
+    timestamp: numpy.ndarray
+        an array of shape (N,) holding the timestamps in milliseconds.
+    trial_id: numpy.ndarray, optional
+        an array of shape (N,) holding the trial IDs. Defaults to 0.
+    label: numpy.ndarray, optional
+        an array of shape (N,) holding integer label codes. Defaults to 0.
+    screen_point: numpy.ndarray, optional
+        an array of shape (N, 2) holding the 2d screen gaze points. Defaults
+        to 0.
+
+    Returns
+    -------
+    numpy.ndarray
+        the sample array of type SAMPLE_DTYPE.
+    """
+    samples = np.zeros(len(timestamp), dtype=SAMPLE_DTYPE)
+    samples["origin"] = origin
+    samples["point"] = point
+    samples["timestamp"] = timestamp
+    if trial_id is not None:
+        samples["trial_id"] = trial_id
+    if label is not None:
+        samples["label"] = label
+    if screen_point is not None:
+        samples["screen_point"] = screen_point
+    return samples
+
+def gazeDirection(samples):
+    """
+    Compute the normalized gaze direction of each sample.
+
+    Parameters
+    ----------
+    samples: numpy.ndarray
+        the sample array of type SAMPLE_DTYPE.
+
+    Returns
+    -------
+    numpy.ndarray
+        an array of shape (N, 3) holding the unit gaze vectors.
+    """
+    direction = samples["point"].astype(np.float64) - samples["origin"]
+    norm = np.linalg.norm(direction, axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return direction / norm
+
+def gazeVelocity(samples):
+    """
+    Compute the angular velocity between consecutive samples.
+
+    Parameters
+    ----------
+    samples: numpy.ndarray
+        the sample array of type SAMPLE_DTYPE.
+
+    Returns
+    -------
+    numpy.ndarray
+        an array of shape (N,) holding the angular velocity in degrees per
+        second. The velocity at index i is computed between the samples i - 1
+        and i. The velocity of the first sample is 0.
+    """
+    direction = gazeDirection(samples)
+    velocity = np.zeros(len(samples))
+    if len(samples) < 2:
+        return velocity
+    angle = _angle(direction[:-1], direction[1:])
+    dt = np.diff(samples["timestamp"])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        velocity[1:] = angle / dt * 1000
+    return velocity
+
+def _angle(d1, d2):
+    # the angle in degrees between pairs of unit vectors, arctan2 is
+    # numerically stable for small angles, unlike arccos
+    return np.degrees(np.arctan2(np.linalg.norm(np.cross(d1, d2), axis=1),
+        np.einsum("ij,ij->i", d1, d2)))
+
+def saccadeFilter(samples, velocity_threshold):
+    """
+    Parse a recording for saccades with a velocity threshold (I-VT). A
+    saccade starts with the last sample before the angular velocity exceeds
+    the threshold and ends with the last sample where the velocity is above
+    the threshold. As with GazepyFilterSaccade, a saccade which is still
+    ongoing at the end of the recording is not reported and a trial change
+    does not end a saccade, i.e. the saccade is reported with the trial ID of
+    its first sample.
+
+    Parameters
+    ----------
+    samples: numpy.ndarray
+        the sample array of type SAMPLE_DTYPE.
+    velocity_threshold: float
+        the velocity threshold in degrees per second (see
+        GazepyFilterParameterSaccade).
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        the sample indices of the saccade onsets and the sample indices of the
+        saccade offsets.
+    """
+    return _saccadeIndices(gazeVelocity(samples), velocity_threshold)
+
+def _saccadeIndices(velocity, velocity_threshold):
+    with np.errstate(invalid="ignore"):
+        is_moving = velocity > velocity_threshold
+    edges = np.diff(is_moving.astype(np.int8))
+    onset = np.flatnonzero(edges == 1)
+    offset = np.flatnonzero(edges == -1)
+    # a run starting at index 0 is impossible as the first velocity is 0,
+    # hence only a trailing unfinished run needs to be dropped
+    onset = onset[:len(offset)]
+    return (onset, offset)
+
+def gazeAngle(samples):
+    """
+    Compute the horizontal and vertical gaze angle of each sample. The
+    horizontal angle is measured around the y axis and the vertical angle
+    against the x-z plane, both relative to the z axis.
+
+    Parameters
+    ----------
+    samples: numpy.ndarray
+        the sample array of type SAMPLE_DTYPE.
+
+    Returns
+    -------
+    numpy.ndarray
+        an array of shape (N, 2) holding the horizontal and the vertical gaze
+        angles in degrees.
+    """
+    direction = gazeDirection(samples)
+    x = direction[:, 0]
+    y = direction[:, 1]
+    z = direction[:, 2]
+    return np.degrees(np.stack(
+        (np.arctan2(x, z), np.arctan2(y, np.hypot(x, z))), axis=1))
+
+@kernel
+def _fixationKernel(timestamp, extrema, dispersion_threshold,
+        duration_threshold, index, head, tail, onset, offset):
+    # The sequential window state machine of the fixation filter. The window
+    # spans the samples start..i and grows until the duration threshold is
+    # reached. While the dispersion is below the threshold the window keeps
+    # growing, otherwise it is either reported as fixation or shifted by one
+    # sample.
+    #
+    # The running maxima of the four rows of extrema (angle_x, -angle_x,
+    # angle_y, -angle_y) are kept in monotonic deques such that each sample
+    # costs amortized O(1). The deque k is stored in index[k][head[k]:tail[k]].
+    # Each sample index is pushed at most once, hence the deques never wrap
+    # around. All buffers are passed in by the caller such that the same code
+    # runs on python lists and, compiled, on numpy arrays.
+    count = 0
+    start = 0
+    is_collecting = False
+    for i in range(len(timestamp)):
+        for k in range(4):
+            values = extrema[k]
+            queue = index[k]
+            value = values[i]
+            while tail[k] > head[k] and values[queue[tail[k] - 1]] <= value:
+                tail[k] -= 1
+            queue[tail[k]] = i
+            tail[k] += 1
+
+        if timestamp[i] - timestamp[start] < duration_threshold:
+            continue
+
+        dispersion = 0.0
+        for k in range(4):
+            queue = index[k]
+            while queue[head[k]] < start:
+                head[k] += 1
+            dispersion += extrema[k][queue[head[k]]]
+
+        if dispersion <= dispersion_threshold:
+            is_collecting = True
+        elif is_collecting:
+            onset[count] = start
+            offset[count] = i - 1
+            count += 1
+            is_collecting = False
+            # the sample breaking the fixation is dropped
+            start = i + 1
+            for k in range(4):
+                head[k] = tail[k]
+        else:
+            start += 1
+
+    return count
+
+def fixationFilter(samples, dispersion_threshold, duration_threshold):
+    """
+    Parse a recording for fixations with a dispersion threshold (I-DT). The
+    samples are collected in a window until the duration threshold is
+    reached. The window grows as long as the dispersion of the gaze angles in
+    the window stays below the dispersion threshold. If the dispersion is
+    exceeded the window is reported as fixation or, if the dispersion was
+    never below the threshold, the oldest sample is dropped. As with
+    GazepyFilterFixation, a fixation which is still ongoing at the end of the
+    recording is not reported and a trial change does not end a fixation.
+
+    The dispersion is the sum of the horizontal and the vertical gaze angle
+    ranges in the window. The ranges are maintained incrementally such that
+    long fixations do not cause the window to be rescanned.
+
+    Parameters
+    ----------
+    samples: numpy.ndarray
+        the sample array of type SAMPLE_DTYPE.
+    dispersion_threshold: float
+        the dispersion threshold in degrees (see
+        GazepyFilterParameterFixation).
+    duration_threshold: float
+        the duration threshold in milliseconds (see
+        GazepyFilterParameterFixation).
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        the sample indices of the first samples and the sample indices of the
+        last samples of the fixations.
+    """
+    return _fixationIndices(samples["timestamp"], _fixationExtrema(samples),
+            dispersion_threshold, duration_threshold)
+
+def _fixationExtrema(samples):
+    angle = gazeAngle(samples)
+    return np.stack((angle[:, 0], -angle[:, 0], angle[:, 1], -angle[:, 1]))
+
+def _fixationIndices(timestamp, extrema, dispersion_threshold,
+        duration_threshold):
+    count = len(timestamp)
+    if isJitEnabled():
+        timestamp = np.ascontiguousarray(timestamp, dtype=np.float64)
+        extrema = np.ascontiguousarray(extrema, dtype=np.float64)
+        index = np.zeros((4, count), dtype=np.intp)
+        head = np.zeros(4, dtype=np.intp)
+        tail = np.zeros(4, dtype=np.intp)
+        onset = np.zeros(count // 2 + 1, dtype=np.intp)
+        offset = np.zeros(count // 2 + 1, dtype=np.intp)
+    else:
+        # python scalars are considerably faster to iterate than numpy scalars
+        if isinstance(timestamp, np.ndarray):
+            timestamp = timestamp.tolist()
+        if isinstance(extrema, np.ndarray):
+            extrema = extrema.tolist()
+        index = [[0] * count for _ in range(4)]
+        head = [0] * 4
+        tail = [0] * 4
+        onset = [0] * (count // 2 + 1)
+        offset = [0] * (count // 2 + 1)
+    found = _fixationKernel(timestamp, extrema, float(dispersion_threshold),
+            float(duration_threshold), index, head, tail, onset, offset)
+    return (np.array(onset[:found], dtype=np.intp),
+            np.array(offset[:found], dtype=np.intp))
+
+def noiseFilter(samples, noise_type, mid_idx):
+    """
+    Filter the coordinates of a recording with a moving average or a moving
+    median. As with GazepyFilterNoise, the window length is mid_idx * 2 + 1
+    and a filtered sample is only produced for a full window. The filtered
+    sample keeps the timestamp, trial ID and label of the middle sample of the
+    window. Hence, the first and the last mid_idx samples are dropped. As with
+    GazepyFilterNoise, the window is not reset at trial changes.
+
+    Parameters
+    ----------
+    samples: numpy.ndarray
+        the sample array of type SAMPLE_DTYPE.
+    noise_type: int
+        the filter type, either NOISE_TYPE_AVERAGE or NOISE_TYPE_MEDIAN (see
+        GazepyFilterParameterNoise).
+    mid_idx: int
+        the middle index of the window. If set to 0 the filter is disabled and
+        the samples are returned as is.
+
+    Returns
+    -------
+    numpy.ndarray
+        the filtered sample array of type SAMPLE_DTYPE.
+    """
+    if mid_idx == 0:
+        return samples
+    length = mid_idx * 2 + 1
+    if len(samples) < length:
+        return samples[:0].copy()
+
+    # filter all coordinate columns in one pass
+    coords = np.concatenate([samples[name].reshape(len(samples), -1)
+        for name in COORDINATE_FIELDS], axis=1, dtype=np.float64)
+    if noise_type == NOISE_TYPE_AVERAGE:
+        acc = np.zeros((len(coords) + 1, coords.shape[1]))
+        np.cumsum(coords, axis=0, out=acc[1:])
+        filtered = (acc[length:] - acc[:-length]) / length
+    elif noise_type == NOISE_TYPE_MEDIAN:
+        window = np.lib.stride_tricks.sliding_window_view(coords, length,
+                axis=0)
+        filtered = np.median(window, axis=-1)
+    else:
+        raise ValueError(f"unknown noise filter type {noise_type}")
+
+    res = samples[mid_idx:len(samples) - mid_idx].copy()
+    col = 0
+    for name in COORDINATE_FIELDS:
+        width = res[name].shape[1]
+        res[name] = filtered[:, col:col + width]
+        col += width
+    return res
+
+def _checkGapFilter(max_gap_length, sample_period):
+    # an enabled gap filter divides the gaps by the sample period
+    if max_gap_length != 0 and not sample_period > 0:
+        raise ValueError(f"invalid sample period {sample_period} of the gap"
+                " filter, the sample period must be positive")
+
+def gapFilter(samples, max_gap_length, sample_period):
+    """
+    Fill in gaps in a recording through linear interpolation. As with
+    GazepyFilterGap, the samples are filled in at the sample period after the
+    sample preceding the gap and gaps longer than the maximal gap length are
+    ignored. A gap only counts if it is long enough to hold at least one
+    sample when rounding to the sample period, such that timestamp jitter does
+    not produce spurious samples. Filled in samples keep the trial ID and the
+    label of the sample preceding the gap.
+
+    Parameters
+    ----------
+    samples: numpy.ndarray
+        the sample array of type SAMPLE_DTYPE.
+    max_gap_length: float
+        the maximal gap length in milliseconds to fill in samples. If set to 0
+        the filter is disabled and the samples are returned as is.
+    sample_period: float
+        the sample period in milliseconds.
+
+    Returns
+    -------
+    numpy.ndarray
+        the sample array of type SAMPLE_DTYPE with the gaps filled in.
+
+    Raises
+    ------
+    ValueError
+        if the filter is enabled and the sample period is not positive.
+    """
+    _checkGapFilter(max_gap_length, sample_period)
+    if max_gap_length == 0 or len(samples) < 2:
+        return samples
+
+    timestamp = samples["timestamp"]
+    dt = np.diff(timestamp)
+    is_gap = (dt > sample_period) & (dt <= max_gap_length)
+    count = np.zeros(len(dt), dtype=np.intp)
+    count[is_gap] = np.rint(dt[is_gap] / sample_period).astype(np.intp) - 1
+    total = count.sum()
+    if total == 0:
+        return samples
+
+    # the position of the original samples in the output
+    idx = np.arange(len(samples))
+    idx[1:] += np.cumsum(count)
+    res = np.empty(len(samples) + total, dtype=samples.dtype)
+    res[idx] = samples
+
+    # the gap and the position within the gap of each filled in sample
+    gap = np.repeat(np.arange(len(dt)), count)
+    step = np.arange(1, total + 1) - np.repeat(np.cumsum(count) - count, count)
+    insert = idx[gap] + step
+    res[insert] = samples[gap]
+    res["timestamp"][insert] = timestamp[gap] + step * sample_period
+    frac = (step * sample_period / dt[gap])[:, np.newaxis]
+    for name in COORDINATE_FIELDS:
+        first = samples[name][gap]
+        last = samples[name][gap + 1]
+        res[name][insert] = first + frac * (last - first)
+    return res
+
+def screenAxes(top_left, top_right, bottom_left, bottom_right):
+    """
+    Compute the axes of a screen defined by its four corners in 3d space. The
+    screen axes are the averages of the opposing screen edges.
+
+    Parameters
+    ----------
+    top_left: array_like
+        The x, y, and z coordinates of the top left screen corner.
+    top_right: array_like
+        The x, y, and z coordinates of the top right screen corner.
+    bottom_left: array_like
+        The x, y, and z coordinates of the bottom left screen corner.
+    bottom_right: array_like
+        The x, y, and z coordinates of the bottom right screen corner.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        the top left corner, the horizontal axis, the vertical axis, and the
+        normal of the screen.
+    """
+    top_left, top_right, bottom_left, bottom_right = (
+            np.asarray(corner, dtype=np.float64) for corner in
+            (top_left, top_right, bottom_left, bottom_right))
+    axis_x = ((top_right - top_left) + (bottom_right - bottom_left)) / 2
+    axis_y = ((bottom_left - top_left) + (bottom_right - top_right)) / 2
+    return (top_left, axis_x, axis_y, np.cross(axis_x, axis_y))
+
+def screenPoint(samples, is_normalized, top_left, top_right, bottom_left,
+        bottom_right):
+    """
+    Compute the 2d screen gaze points of a recording by intersecting the gaze
+    rays with the screen plane. The screen is defined by its four corners in
+    3d space, the same way as with Gazepy.setScreen() (see screenAxes()).
+
+    Parameters
+    ----------
+    samples: numpy.ndarray
+        the sample array of type SAMPLE_DTYPE.
+    is_normalized: bool
+        If set to true the screen points are normalized where (0, 0)
+        corresponds to the top left corner and (1, 1) to the bottom right
+        corner of the screen. Otherwise, the screen points are given in the
+        units of the 3d space relative to the top left corner.
+    top_left: array_like
+        The x, y, and z coordinates of the top left screen corner.
+    top_right: array_like
+        The x, y, and z coordinates of the top right screen corner.
+    bottom_left: array_like
+        The x, y, and z coordinates of the bottom left screen corner.
+    bottom_right: array_like
+        The x, y, and z coordinates of the bottom right screen corner.
+
+    Returns
+    -------
+    numpy.ndarray
+        an array of shape (N, 2) holding the screen gaze points. Gaze rays
+        parallel to the screen result in NaN.
+    """
+    top_left, axis_x, axis_y, normal = screenAxes(top_left, top_right,
+            bottom_left, bottom_right)
+
+    origin = samples["origin"].astype(np.float64)
+    direction = samples["point"] - origin
+    den = direction @ normal
+    # rays parallel to the screen never hit it
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scale = np.where(den != 0, (top_left - origin) @ normal / den, np.nan)
+    hit = origin + scale[:, np.newaxis] * direction - top_left
+
+    # project onto the screen axes, normalized to the screen size
+    res = np.stack((hit @ axis_x / (axis_x @ axis_x),
+        hit @ axis_y / (axis_y @ axis_y)), axis=1)
+    if not is_normalized:
+        res *= (np.linalg.norm(axis_x), np.linalg.norm(axis_y))
+    return res.astype(np.float32)
+
+def fixationEvents(samples, first, last):
+    """
+    Collect the fixations found by fixationFilter() into a structured array.
+
+    Parameters
+    ----------
+    samples: numpy.ndarray
+        the sample array of type SAMPLE_DTYPE.
+    first: numpy.ndarray
+        the sample indices of the first samples of the fixations.
+    last: numpy.ndarray
+        the sample indices of the last samples of the fixations.
+
+    Returns
+    -------
+    numpy.ndarray
+        the fixations of type FIXATION_DTYPE. The screen point and the point
+        are the means over the samples of a fixation.
+    """
+    res = np.zeros(len(first), dtype=FIXATION_DTYPE)
+    timestamp = samples["timestamp"]
+    res["timestamp"] = timestamp[first]
+    res["duration"] = timestamp[last] - timestamp[first]
+    res["trial_id"] = samples["trial_id"][first]
+    res["label"] = samples["label"][first]
+    count = (last - first + 1)[:, np.newaxis]
+    for name in ("screen_point", "point"):
+        acc = np.zeros((len(samples) + 1, samples[name].shape[1]))
+        np.cumsum(samples[name], axis=0, out=acc[1:])
+        res[name] = (acc[last + 1] - acc[first]) / count
+    return res
+
+def saccadeEvents(samples, onset, offset):
+    """
+    Collect the saccades found by saccadeFilter() into a structured array.
+
+    Parameters
+    ----------
+    samples: numpy.ndarray
+        the sample array of type SAMPLE_DTYPE.
+    onset: numpy.ndarray
+        the sample indices of the saccade onsets.
+    offset: numpy.ndarray
+        the sample indices of the saccade offsets.
+
+    Returns
+    -------
+    numpy.ndarray
+        the saccades of type SACCADE_DTYPE.
+    """
+    res = np.zeros(len(onset), dtype=SACCADE_DTYPE)
+    timestamp = samples["timestamp"]
+    res["timestamp"] = timestamp[onset]
+    res["duration"] = timestamp[offset] - timestamp[onset]
+    res["first_screen_point"] = samples["screen_point"][onset]
+    res["first_point"] = samples["point"][onset]
+    res["last_screen_point"] = samples["screen_point"][offset]
+    res["last_point"] = samples["point"][offset]
+    res["amplitude"] = _angle(gazeDirection(samples[onset]),
+            gazeDirection(samples[offset]))
+    res["trial_id"] = samples["trial_id"][onset]
+    res["label"] = samples["label"][onset]
+    return res
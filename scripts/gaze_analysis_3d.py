@@ -5,38 +5,19 @@ import numpy as np
 import quaternionic
 import csv
 
-def q_dot(a, b):
-    return a.x * b.x + a.y * b.y + a.z * b.z + a.w * b.w
-
 def quaternion_mean(qs):
-    # Number of quaternions to average
-    M = qs.shape[0]
-    A = np.zeros(shape=(4,4))
-
-    for i in range(0,M):
-        q = qs[i,:]
-        # multiply q with its transposed version q' and add A
-        A = np.outer(q,q) + A
-
-    # scale
-    A = (1.0/M)*A
-    # compute eigenvalues and -vectors
-    eigenValues, eigenVectors = np.linalg.eig(A)
-    # Sort by largest eigenvalue
-    eigenVectors = eigenVectors[:,eigenValues.argsort()[::-1]]
-    # return the real part of the largest eigenvector (has only real part)
-    return quaternionic.array(eigenVectors[:,0]).normalized
+    q = np.asarray(qs)
+    # sum of the outer products q q' of all quaternions
+    A = np.einsum('mi,mj->ij', q, q) / q.shape[0]
+    # A is symmetric, eigh returns the eigenvalues in ascending order
+    eigenValues, eigenVectors = np.linalg.eigh(A)
+    return quaternionic.array(eigenVectors[:,-1]).normalized
 
 def quaternion_mean_approx(qs):
-    avg = quaternionic.array([0, 0, 0, 0])
-    is_first = True
-    for q in qs:
-        if is_first == False and q_dot(q, qs[0]) < 0:
-            q = -q
-        avg += q
-        is_first = False
-
-    return avg.normalized
+    q = np.asarray(qs)
+    # flip all quaternions into the hemisphere of the first quaternion
+    sign = np.where(q @ q[0] < 0, -1, 1)
+    return quaternionic.array(sign @ q).normalized
 
 def dispersion_static(qs):
     q_mean = quaternion_mean_approx(qs)
@@ -0,0 +1,115 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import gazepy
+from gazepy import synthetic
+from gazepy.aio import GazepyMemorySource, GazepyStream
+from gazepy.events import GazepyEventCollector
+
+def rows(count):
+    samples, labels = synthetic.createSamples(count, dropout=0.02, seed=9)
+    return [(*s["origin"], *s["point"], *s["screen_point"], s["timestamp"],
+        s["trial_id"], labels[s["label"]]) for s in samples]
+
+def handler():
+    return gazepy.Gazepy(backend="numpy")
+
+def expected(samples):
+    return handler().analyse(samples, GazepyEventCollector())
+
+def assertCollected(expected, collector):
+    assert len(expected.fixations()) > 0 and len(expected.saccades()) > 0
+    np.testing.assert_array_equal(collector.fixations(), expected.fixations())
+    np.testing.assert_array_equal(collector.saccades(), expected.saccades())
+
+class Batches():
+    # a handler recording the size of each analysed batch
+    def __init__(self):
+        self.handler = handler()
+        self.sizes = []
+
+    def analyse(self, samples):
+        self.sizes.append(len(samples))
+        return self.handler.analyse(samples)
+
+async def collect(stream, source):
+    collector = GazepyEventCollector()
+    async for event in stream.events(source):
+        collector.add(event)
+    return collector
+
+async def push(source, samples):
+    for sample in samples:
+        await source.push(sample)
+        # yield to the stream such that samples arrive in small bursts
+        await asyncio.sleep(0)
+    await source.close()
+
+@pytest.mark.parametrize("max_batch, max_latency", [(1, 0), (16, 0),
+    (64, 0.005), (5000, 0.001)])
+def test_events(max_batch, max_latency):
+    samples = rows(3000)
+
+    async def main():
+        batches = Batches()
+        stream = GazepyStream(batches, max_batch, max_latency, queue_size=32)
+        source = GazepyMemorySource()
+        pushing = asyncio.ensure_future(push(source, samples))
+        collector = await collect(stream, source)
+        await pushing
+        return collector, batches.sizes
+
+    collector, sizes = asyncio.run(main())
+    assertCollected(expected(samples), collector)
+    assert sum(sizes) == len(samples)
+    assert max(sizes) <= max_batch
+
+def test_max_latency():
+    # a partial batch is analysed after max_latency although the source is
+    # still open
+    samples = rows(3000)
+    events = expected(samples)
+    first = events.fixations()["timestamp"][0]
+    count = next(idx for idx, s in enumerate(samples) if s[8] > first) + 200
+
+    async def main():
+        batches = Batches()
+        stream = GazepyStream(batches, max_batch=5000, max_latency=0.01)
+        source = GazepyMemorySource()
+        for sample in samples[:count]:
+            await source.push(sample)
+        events = stream.events(source)
+        try:
+            event = await asyncio.wait_for(events.__anext__(), 5)
+            return event, batches.sizes
+        finally:
+            await source.close()
+            await events.aclose()
+
+    event, sizes = asyncio.run(main())
+    assert sizes == [count]
+    assert event.first_sample.timestamp <= first
+
+async def failing(samples):
+    for sample in samples:
+        yield sample
+        await asyncio.sleep(0)
+    raise ConnectionError("source failed")
+
+@pytest.mark.parametrize("max_batch", [1, 64])
+def test_source_error(max_batch):
+    # the events of the samples read before the error are yielded before the
+    # error is raised
+    samples = rows(2000)
+    collector = GazepyEventCollector()
+
+    async def main():
+        stream = GazepyStream(handler(), max_batch, max_latency=0.001)
+        async for event in stream.events(failing(samples)):
+            collector.add(event)
+
+    with pytest.raises(ConnectionError, match="source failed"):
+        asyncio.run(main())
+    assertCollected(expected(samples), collector)
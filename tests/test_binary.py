@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from gazepy import synthetic
+from gazepy.binary import GazepyBinary, convertCsv, readBinary, writeBinary
+from gazepy.reader import readCsv
+
+@pytest.fixture
+def recording(tmp_path):
+    samples, labels = synthetic.createSamples(3000, dropout=0.01, seed=6)
+    path = str(tmp_path / "recording.csv")
+    # a quoted label spanning two lines and a trailing blank line
+    synthetic.writeSamples(path, samples, [*labels[:-1], "two\nlines"])
+    with open(path, "a") as f:
+        f.write("\n")
+    return path
+
+def assertRecording(expected, labels, data):
+    samples, data_labels = data
+    assert samples.dtype == expected.dtype
+    np.testing.assert_array_equal(samples, expected)
+    assert list(data_labels) == list(labels)
+
+@pytest.mark.parametrize("chunk_size", [100, 65536])
+def test_convert(tmp_path, recording, chunk_size):
+    path = str(tmp_path / "recording.gzb")
+    convertCsv(recording, path, chunk_size=chunk_size)
+    samples, labels = readCsv(recording)
+    assertRecording(samples, labels, readBinary(path))
+    data = GazepyBinary(path)
+    assert data.sample_period == pytest.approx(
+            np.median(np.diff(samples["timestamp"])))
+    assert isinstance(data["timestamp"].base, np.memmap)
+
+def test_write(tmp_path, recording):
+    path = str(tmp_path / "recording.gzb")
+    samples, labels = readCsv(recording)
+    writeBinary(path, samples, labels)
+    assertRecording(samples, labels, readBinary(path))
+
+def test_empty(tmp_path):
+    csv_path = tmp_path / "empty.csv"
+    csv_path.write_text("sx,sy,px,py,pz,ox,oy,oz,timestamp,trial_id,label\n")
+    path = str(tmp_path / "empty.gzb")
+    convertCsv(str(csv_path), path)
+    samples, labels = readBinary(path)
+    assert len(samples) == 0 and list(labels) == []
@@ -0,0 +1,70 @@
+import concurrent.futures
+import json
+import os
+import time
+
+import pytest
+
+from gazepy import cli, synthetic
+from gazepy.cache import GazepyCache, _paramsKey
+from gazepy.gazepy import getFilterParameterDefault
+from gazepy.reader import COLUMNS_SAMPLE
+
+@pytest.fixture
+def recordings(tmp_path):
+    paths = []
+    for seed in range(4):
+        samples, labels = synthetic.createSamples(500, dropout=0.01,
+                seed=seed)
+        path = str(tmp_path / f"{seed}.csv")
+        synthetic.writeSamples(path, samples, labels)
+        paths.append(path)
+    return paths
+
+def test_disabled_filter_key():
+    params = getFilterParameterDefault("numpy")
+    params.gap.max_gap_length = 0
+    params.noise.mid_idx = 0
+    key = _paramsKey(params, COLUMNS_SAMPLE)
+    params.gap.sample_period = 1
+    params.noise.type = 1
+    assert _paramsKey(params, COLUMNS_SAMPLE) == key
+    params.noise.mid_idx = 1
+    assert _paramsKey(params, COLUMNS_SAMPLE) != key
+
+def _hash(directory, path):
+    return GazepyCache(directory).contentHash(path)
+
+def test_concurrent_index(tmp_path, recordings):
+    directory = str(tmp_path / "cache")
+    with concurrent.futures.ProcessPoolExecutor(4) as executor:
+        hashes = list(executor.map(_hash, [directory] * len(recordings),
+            recordings))
+    # no update of the index was lost
+    with open(os.path.join(directory, "index.json")) as f:
+        index = json.load(f)
+    assert {path: index[path]["hash"] for path in recordings} == dict(
+            zip(recordings, hashes))
+
+def test_stale_tmp(tmp_path, recordings):
+    cache = GazepyCache(str(tmp_path / "cache"))
+    stale = tmp_path / "cache" / "stale.tmp"
+    fresh = tmp_path / "cache" / "fresh.tmp"
+    stale.write_bytes(b"x")
+    fresh.write_bytes(b"x")
+    past = time.time() - 2 * 3600
+    os.utime(stale, (past, past))
+    samples, _ = cache.load(recordings[0])
+    assert len(samples) > 0
+    assert not stale.exists() and fresh.exists()
+
+def test_cli_cache(tmp_path, recordings):
+    directory = str(tmp_path / "cache")
+    args = ["-j", "1", "-q", "-b", "numpy", recordings[0]]
+    assert cli.main(args) == 0
+    with open(recordings[0][:-4] + "_fixations.csv") as f:
+        expected = f.read()
+    assert cli.main(["--cache-dir", directory, *args]) == 0
+    assert any(name.endswith(".npy") for name in os.listdir(directory))
+    with open(recordings[0][:-4] + "_fixations.csv") as f:
+        assert f.read() == expected
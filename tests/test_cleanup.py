@@ -0,0 +1,34 @@
+import pytest
+
+import gazepy
+from gazepy import synthetic
+from gazepy.handler import GazepyNumpy
+
+def samples(count):
+    samples, labels = synthetic.createSamples(count, seed=4)
+    for s in samples:
+        yield (*s["origin"], *s["point"], s["timestamp"], s["trial_id"],
+                labels[s["label"]])
+
+def test_high_water_mark():
+    h = gazepy.Gazepy(backend="numpy")
+    h.setAutoCleanup(high_water_mark=64)
+    peak = 0
+    for sample in samples(3000):
+        h.update(*sample)
+        h.fixationFilter()
+        h.saccadeFilter()
+        peak = max(peak, h.windowLength())
+    assert 0 < peak < 3000
+
+class GazepyUnknownWindow(GazepyNumpy):
+    # a handler which does not report its sample window like libgac
+    def windowLength(self):
+        return None
+
+def test_high_water_mark_unknown_window():
+    h = GazepyUnknownWindow()
+    with pytest.raises(ValueError, match="high_water_mark"):
+        h.setAutoCleanup(high_water_mark=64)
+    h.setAutoCleanup(interval=64)
+    assert h.auto_cleanup is not None
@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+from gazepy import cli, synthetic
+
+@pytest.fixture
+def recordings(tmp_path):
+    samples, labels = synthetic.createSamples(1000, seed=4)
+    paths = []
+    for name in ("a", "b"):
+        path = str(tmp_path / f"{name}.csv")
+        synthetic.writeSamples(path, samples, labels)
+        paths.append(path)
+    return paths
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_failing_file(tmp_path, recordings, capsys, jobs):
+    missing = str(tmp_path / "missing.csv")
+    status = cli.main(["-j", jobs, "-b", "numpy", recordings[0], missing,
+        recordings[1]])
+    assert status == 1
+    err = capsys.readouterr().err
+    assert f"{missing}: error:" in err
+    assert "1 of 3 files failed" in err
+    for path in recordings:
+        assert os.path.exists(path[:-4] + "_fixations.csv")
+        assert os.path.exists(path[:-4] + "_saccades.csv")
+
+def test_success(recordings):
+    assert cli.main(["-j", "1", "-q", "-b", "numpy", *recordings]) == 0
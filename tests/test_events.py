@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+import gazepy
+from gazepy import synthetic
+from gazepy.events import GazepyEventCollector
+
+@pytest.fixture
+def recording():
+    samples, labels = synthetic.createSamples(2000, seed=7)
+    rows = [(*s["origin"], *s["point"], *s["screen_point"], s["timestamp"],
+        s["trial_id"], labels[s["label"]]) for s in samples]
+    return (samples, labels, rows)
+
+def assertEvents(expected, events):
+    assert events.dtype == expected.dtype and len(events) == len(expected)
+    for name in expected.dtype.names:
+        np.testing.assert_allclose(events[name], expected[name], rtol=1e-5)
+
+def test_collector(recording):
+    samples, labels, rows = recording
+    h = gazepy.Gazepy(backend="numpy")
+    collector = h.analyse(rows, GazepyEventCollector())
+    fixations, saccades = gazepy.Gazepy(backend="numpy").process(
+            samples["origin"], samples["point"], samples["timestamp"],
+            samples["trial_id"], samples["label"], labels,
+            samples["screen_point"])
+    assert gazepy.SACCADE_DTYPE.names[-1] == "amplitude"
+    assertEvents(fixations, collector.fixations())
+    assertEvents(saccades, collector.saccades())
+    assert len(saccades) > 0 and (saccades["amplitude"] > 0).all()
+
+def test_frame(recording):
+    pytest.importorskip("pandas")
+    _, labels, rows = recording
+    h = gazepy.Gazepy(backend="numpy")
+    collector = h.analyse(rows, GazepyEventCollector())
+    frame = collector.saccadeFrame(h.labels)
+    assert len(frame) == len(collector.saccade_columns)
+    assert list(frame.columns[-3:]) == ["trial_id", "label", "amplitude"]
+    np.testing.assert_array_equal(frame["offset"] - frame["onset"],
+            collector.saccades()["duration"])
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from gazepy import fixation3d, jit, synthetic
+
+SAMPLE_PERIOD = 1000 / 120
+
+@pytest.fixture(scope="module")
+def poses():
+    return synthetic.createPoses(3000, sample_period=SAMPLE_PERIOD,
+            noise=0.02, seed=3)
+
+@pytest.fixture(params=["0", "1"], ids=["python", "jit"])
+def kernels(request, monkeypatch):
+    # the batch filters with and without compiled kernels
+    monkeypatch.setenv(jit.JIT_ENV, request.param)
+
+def stream(cls, poses, dispersion_threshold, duration_threshold):
+    f = cls(dispersion_threshold, duration_threshold)
+    fixations = (f.filter(*sample) for sample in zip(
+        poses["position"].tolist(), poses["orientation"].tolist(),
+        poses["timestamp"].tolist()))
+    return [fixation for fixation in fixations if fixation is not None]
+
+def assertFixations(expected, fixations):
+    assert len(fixations) == len(expected)
+    for fixation, row in zip(expected, fixations):
+        assert row["timestamp"] == pytest.approx(fixation.timestamp)
+        assert row["duration"] == pytest.approx(fixation.duration)
+        assert row["sample_count"] == fixation.sample_count
+        np.testing.assert_allclose(row["position"], fixation.position)
+        np.testing.assert_allclose(np.abs(row["orientation"]),
+                np.abs(fixation.orientation), atol=1e-9)
+        if fixation.point is None:
+            assert np.isnan(row["point"]).all()
+        else:
+            np.testing.assert_allclose(row["point"], fixation.point)
+
+@pytest.mark.parametrize("thresholds", [(0.5, 50), (2, 100), (5, 30)])
+def test_static(poses, kernels, thresholds):
+    expected = stream(fixation3d.GazepyFilterFixationStatic, poses,
+            *thresholds)
+    assert expected
+    fixations = fixation3d.fixationStaticFilter(poses["position"],
+            poses["orientation"], poses["timestamp"], *thresholds)
+    assertFixations(expected, fixations)
+
+@pytest.mark.parametrize("thresholds", [(5, 30), (10, 50)])
+def test_dynamic(poses, kernels, thresholds):
+    expected = stream(fixation3d.GazepyFilterFixationDynamic, poses,
+            *thresholds)
+    assert expected
+    fixations = fixation3d.fixationDynamicFilter(poses["position"],
+            poses["orientation"], poses["timestamp"], *thresholds)
+    assertFixations(expected, fixations)
+
+@pytest.mark.parametrize("thresholds", [(5, 30), (10, 50)])
+def test_dynamic_sample_period(poses, kernels, thresholds):
+    expected = stream(fixation3d.GazepyFilterFixationDynamic, poses,
+            *thresholds)
+    assert expected
+    fixations = fixation3d.fixationDynamicFilter(poses["position"],
+            poses["orientation"], poses["timestamp"], *thresholds,
+            SAMPLE_PERIOD)
+    assertFixations(expected, fixations)
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+import gazepy
+from gazepy import synthetic
+from gazepy.events import GazepyEventCollector
+from gazepy.gazepy import GazepyLabels
+
+from test_process import backends
+
+def test_round_trip():
+    labels = GazepyLabels(["static", "moving"])
+    assert labels.intern("static") == 0
+    assert labels.intern("blink") == 2
+    np.testing.assert_array_equal(labels.codes(["moving", "saccade", "blink",
+        "saccade"]), [1, 3, 2, 3])
+    assert list(labels) == ["static", "moving", "blink", "saccade"]
+    assert len(labels) == 4 and "blink" in labels and "other" not in labels
+    for code, label in enumerate(labels):
+        assert labels[code] == labels.decode(code) == label
+        assert labels.encode(code) == label.encode()
+        assert labels.lookup(label.encode()) == code
+    assert labels[1:3] == ["moving", "blink"]
+
+def test_lookup():
+    labels = GazepyLabels()
+    assert labels.lookup(None) == -1 and labels.decode(-1) == ""
+    assert labels.lookup("blink".encode()) == 0
+    assert list(labels) == ["blink"]
+
+@pytest.mark.parametrize("code", [2, 100, -1, -2])
+def test_unknown_code(code):
+    labels = GazepyLabels(["static", "moving"])
+    with pytest.raises(ValueError, match="unknown label code"):
+        labels.encode(code)
+    with pytest.raises(ValueError, match="unknown label code"):
+        labels[code]
+    if code >= 0:
+        with pytest.raises(ValueError, match="unknown label code"):
+            labels.decode(code)
+
+@pytest.mark.parametrize("backend", backends())
+@pytest.mark.parametrize("code", [2, -1])
+def test_update_unknown_code(backend, code):
+    h = gazepy.Gazepy(gazepy.getFilterParameterDefault(backend), backend)
+    h.labels.codes(["static", "moving"])
+    with pytest.raises(ValueError, match="unknown label code"):
+        h.update(0, 0, 0, 0, 0, 500, 0, 0, code)
+
+@pytest.mark.parametrize("backend", backends())
+def test_shared_labels(backend):
+    # handlers sharing one label dictionary report the same label codes
+    samples, labels = synthetic.createSamples(1000, dropout=0.01, seed=5)
+    shared = GazepyLabels(["other", *labels])
+    names = [labels[code] for code in samples["label"].tolist()]
+    collectors = []
+    for by_code in (False, True):
+        h = gazepy.Gazepy(gazepy.getFilterParameterDefault(backend), backend)
+        h.labels = shared
+        rows = [(*s["origin"], *s["point"], s["timestamp"], s["trial_id"],
+            shared.intern(name) if by_code else name)
+            for s, name in zip(samples, names)]
+        collectors.append(h.analyse(rows, GazepyEventCollector()))
+    assert list(shared) == ["other", *labels]
+    first, second = (c.fixations() for c in collectors)
+    assert len(first) > 0
+    np.testing.assert_array_equal(first, second)
+    assert set(first["label"].tolist()) <= {1, 2}
+    # process() takes the shared dictionary for the sample label codes
+    fixations, _ = h.process(samples["origin"], samples["point"],
+            samples["timestamp"], samples["trial_id"], samples["label"] + 1,
+            shared)
+    np.testing.assert_array_equal(fixations["label"],
+            first["label"][:len(fixations)])
+    assert [shared.decode(code) for code in fixations["label"].tolist()] \
+            == [labels[code - 1] for code in fixations["label"].tolist()]
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+import gazepy
+from gazepy import synthetic
+from gazepy.backend import getBackend, listBackends
+
+def backends():
+    # the backends available in this environment
+    available = []
+    for name in listBackends():
+        try:
+            getBackend(name)
+        except (ImportError, OSError):
+            continue
+        available.append(name)
+    return available
+
+@pytest.fixture
+def recording():
+    return synthetic.createSamples(2000, dropout=0.01, seed=2)
+
+def process(samples, labels, backend="numpy", h=None):
+    if h is None:
+        h = gazepy.Gazepy(gazepy.getFilterParameterDefault(backend), backend)
+    return h.process(samples["origin"], samples["point"],
+            samples["timestamp"], samples["trial_id"], samples["label"],
+            labels, samples["screen_point"])
+
+def test_process(recording):
+    samples, labels = recording
+    fixations, saccades = process(samples, labels)
+    assert fixations.dtype == gazepy.FIXATION_DTYPE
+    assert saccades.dtype == gazepy.SACCADE_DTYPE
+    assert len(fixations) > 0 and len(saccades) > 0
+
+@pytest.mark.parametrize("code", [-1, 2])
+def test_unknown_label(recording, code):
+    samples, labels = recording
+    samples["label"][10] = code
+    with pytest.raises(ValueError, match="label code"):
+        process(samples, labels)
+
+@pytest.mark.parametrize("backend", backends())
+@pytest.mark.parametrize("labels", [None, ["static", "moving"]])
+def test_negative_label(recording, backend, labels):
+    samples, _ = recording
+    samples["label"][10] = -1
+    with pytest.raises(ValueError, match="label code -1"):
+        process(samples, labels, backend)
+
+@pytest.mark.parametrize("backend", backends())
+def test_streaming_state(recording, backend):
+    samples, labels = recording
+    expected = process(samples, labels, backend)
+    h = gazepy.Gazepy(gazepy.getFilterParameterDefault(backend), backend)
+    # samples of an unfinished recording in the sample window
+    for s in samples[:500]:
+        h.update(*s["origin"], *s["point"], s["timestamp"] + 1e6,
+                s["trial_id"], labels[s["label"]])
+    length = h.windowLength()
+    fixations, saccades = process(samples, labels, h=h)
+    assert h.windowLength() == length
+    np.testing.assert_array_equal(fixations, expected[0])
+    np.testing.assert_array_equal(saccades, expected[1])
@@ -0,0 +1,96 @@
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from gazepy import quaternion
+
+SCRIPT = Path(__file__).parent.parent / "scripts" / "gaze_analysis_3d.py"
+
+def loopMean(qs):
+    # the per-quaternion loop of the original implementation
+    M = qs.shape[0]
+    A = np.zeros(shape=(4,4))
+    for i in range(0,M):
+        q = qs[i,:]
+        A = np.outer(q,q) + A
+    A = (1.0/M)*A
+    eigenValues, eigenVectors = np.linalg.eig(A)
+    eigenVectors = eigenVectors[:,eigenValues.argsort()[::-1]]
+    mean = np.real(eigenVectors[:,0])
+    return mean / np.linalg.norm(mean)
+
+def loopMeanApprox(qs):
+    avg = np.zeros(4)
+    is_first = True
+    for q in qs:
+        if is_first == False and np.dot(q, qs[0]) < 0:
+            q = -q
+        avg += q
+        is_first = False
+    return avg / np.linalg.norm(avg)
+
+def windows(count, length, spread, seed):
+    # windows of unit quaternions scattered around a random mean with random
+    # signs, as q and -q are the same rotation
+    rng = np.random.default_rng(seed)
+    mean = rng.normal(size=(count, 1, 4))
+    qs = mean / np.linalg.norm(mean, axis=-1, keepdims=True) \
+            + rng.normal(scale=spread, size=(count, length, 4))
+    qs /= np.linalg.norm(qs, axis=-1, keepdims=True)
+    return qs * rng.choice([-1, 1], size=(count, length, 1))
+
+def assertSameRotation(expected, res):
+    # the sign of a mean quaternion is arbitrary
+    np.testing.assert_allclose(np.linalg.norm(res, axis=-1), 1, rtol=1e-12)
+    np.testing.assert_allclose(np.abs(np.sum(expected * res, axis=-1)), 1,
+            rtol=1e-9)
+
+@pytest.mark.parametrize("length", [1, 2, 7, 60])
+@pytest.mark.parametrize("spread", [0.01, 0.3])
+def test_quaternion_mean(length, spread):
+    qs = windows(50, length, spread, seed=length)
+    expected = np.array([loopMean(q) for q in qs])
+    res = quaternion.quaternionMean(qs)
+    assertSameRotation(expected, res)
+    assert np.all(res[:, 0] >= 0)
+    # the mean of each window equals the mean of the window alone
+    assertSameRotation(expected, [quaternion.quaternionMean(q) for q in qs])
+
+@pytest.mark.parametrize("length", [1, 2, 7, 60])
+@pytest.mark.parametrize("spread", [0.01, 0.3])
+def test_quaternion_mean_approx(length, spread):
+    qs = windows(50, length, spread, seed=length)
+    expected = np.array([loopMeanApprox(q) for q in qs])
+    res = quaternion.quaternionMeanApprox(qs)
+    np.testing.assert_allclose(res, expected, rtol=1e-9, atol=1e-12)
+
+def test_quaternion_mean_windows():
+    qs = windows(1, 500, 0.2, seed=3)[0]
+    rng = np.random.default_rng(4)
+    first = rng.integers(0, 500, 100)
+    last = np.minimum(first + rng.integers(0, 80, 100), 499)
+    expected = np.array([loopMean(qs[f:l + 1]) for f, l in zip(first, last)])
+    res = quaternion.quaternionMeanWindows(qs, first, last)
+    assertSameRotation(expected, res)
+    assert np.all(res[:, 0] >= 0)
+
+@pytest.fixture(scope="module")
+def script():
+    pytest.importorskip("pandas")
+    quaternionic = pytest.importorskip("quaternionic")
+    spec = importlib.util.spec_from_file_location("gaze_analysis_3d", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module, quaternionic
+
+@pytest.mark.parametrize("length", [1, 2, 7, 60])
+def test_script_mean(script, length):
+    module, quaternionic = script
+    for q in windows(20, length, 0.3, seed=length):
+        qs = quaternionic.array(q)
+        assertSameRotation(loopMean(q), np.asarray(module.quaternion_mean(qs)))
+        np.testing.assert_allclose(
+                np.asarray(module.quaternion_mean_approx(qs)),
+                loopMeanApprox(q), rtol=1e-9, atol=1e-12)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from gazepy import reader, synthetic
+from gazepy.vectorized import SAMPLE_DTYPE
+
+@pytest.fixture
+def recording(tmp_path):
+    samples, labels = synthetic.createSamples(500, dropout=0.05, seed=1)
+    path = str(tmp_path / "samples.csv")
+    synthetic.writeSamples(path, samples, labels)
+    return (path, samples, labels)
+
+def test_read(recording):
+    path, samples, labels = recording
+    data, read_labels = reader.readCsv(path)
+    assert data.dtype == SAMPLE_DTYPE
+    assert list(read_labels) == list(labels)
+    for name in SAMPLE_DTYPE.names:
+        np.testing.assert_array_equal(data[name], samples[name])
+
+def test_chunks(recording):
+    path, samples, _ = recording
+    chunks = list(reader.GazepyCsvReader(path, chunk_size=64))
+    assert [len(chunk) for chunk in chunks[:-1]] == [64] * (len(chunks) - 1)
+    np.testing.assert_array_equal(np.concatenate(chunks), reader.readCsv(
+        path)[0])
+
+def test_blank_lines(recording):
+    path, samples, _ = recording
+    with open(path) as f:
+        lines = f.read().splitlines()
+    with open(path, "w") as f:
+        f.write("\n".join(lines[:100] + [""] + lines[100:]) + "\n\n")
+    data, _ = reader.readCsv(path)
+    np.testing.assert_array_equal(data["timestamp"], samples["timestamp"])
+
+def test_empty_float(recording):
+    path, _, _ = recording
+    with open(path) as f:
+        lines = f.read().splitlines()
+    header = lines[0].split(",")
+    row = lines[1].split(",")
+    row[header.index("px")] = ""
+    lines[1] = ",".join(row)
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    data, _ = reader.readCsv(path)
+    assert np.isnan(data["point"][0, 0])
+
+def test_empty_integer(recording):
+    path, _, _ = recording
+    with open(path) as f:
+        lines = f.read().splitlines()
+    header = lines[0].split(",")
+    row = lines[3].split(",")
+    row[header.index("trial_id")] = ""
+    lines[3] = ",".join(row)
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    with pytest.raises(ValueError, match=r":4: .*'trial_id'"):
+        reader.readCsv(path)
+
+def test_short_row(recording):
+    path, _, _ = recording
+    with open(path, "a") as f:
+        f.write("1,2,3\n")
+    with pytest.raises(ValueError, match="columns"):
+        reader.readCsv(path)
@@ -0,0 +1,82 @@
+import threading
+
+import numpy as np
+import pytest
+
+import gazepy
+from gazepy import synthetic
+from gazepy.events import GazepyEventCollector
+from gazepy.session import GazepySessionManager
+
+def batch(release, order, name):
+    # an empty batch which blocks the analysis until released
+    release.wait(5)
+    order.append(name)
+    return iter(())
+
+class Blocking():
+    def __init__(self, release, order, name):
+        self.release = release
+        self.order = order
+        self.name = name
+
+    def __iter__(self):
+        return batch(self.release, self.order, self.name)
+
+@pytest.fixture
+def manager():
+    with GazepySessionManager(backend="numpy", max_workers=4) as m:
+        yield m
+
+def test_close_waits(manager):
+    release = threading.Event()
+    order = []
+    future = manager.submit(1, Blocking(release, order, "old"))
+    threading.Timer(0.05, release.set).start()
+    assert manager.close(1)
+    assert future.done() and order == ["old"]
+    assert not manager.close(1)
+
+def test_reuse_after_close(manager):
+    release = threading.Event()
+    order = []
+    old = manager.submit(1, Blocking(release, order, "old"))
+    assert manager.close(1, wait=False)
+    ready = threading.Event()
+    ready.set()
+    new = manager.submit(1, Blocking(ready, order, "new"))
+    assert manager.sessions() == [1]
+    assert not new.done()
+    release.set()
+    assert new.result(5) == [] and old.result(5) == []
+    assert order == ["old", "new"]
+
+def rows(count, seed):
+    samples, labels = synthetic.createSamples(count, dropout=0.02, seed=seed)
+    return [(*s["origin"], *s["point"], *s["screen_point"], s["timestamp"],
+        s["trial_id"], labels[s["label"]]) for s in samples]
+
+def test_sessions(manager):
+    # the batches of each session are analysed in submission order, hence
+    # the events of the batches equal a serial analysis of the session
+    recordings = {seed: rows(3000, seed) for seed in range(6)}
+    futures = {seed: [] for seed in recordings}
+    for start in range(0, 3000, 250):
+        for seed, samples in recordings.items():
+            futures[seed].append(manager.submit(seed,
+                samples[start:start + 250]))
+    for seed, samples in recordings.items():
+        collector = GazepyEventCollector()
+        for future in futures[seed]:
+            for event in future.result(10):
+                collector.add(event)
+        expected = gazepy.Gazepy(backend="numpy").analyse(samples,
+                GazepyEventCollector())
+        assert len(expected.fixations()) > 0
+        np.testing.assert_array_equal(collector.fixations(),
+                expected.fixations())
+        np.testing.assert_array_equal(collector.saccades(),
+                expected.saccades())
+        assert np.all(np.diff(collector.fixations()["timestamp"]) > 0)
+        assert manager.close(seed)
+    assert manager.sessions() == []
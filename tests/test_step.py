@@ -0,0 +1,64 @@
+import numpy as np
+
+import gazepy
+from gazepy import synthetic, vectorized
+from gazepy.events import GazepyEventCollector
+
+def rows(count):
+    samples, labels = synthetic.createSamples(count, dropout=0.02, seed=8)
+    return [(*s["origin"], *s["point"], *s["screen_point"], s["timestamp"],
+        s["trial_id"], labels[s["label"]]) for s in samples]
+
+def test_step():
+    samples = rows(3000)
+    h = gazepy.Gazepy(backend="numpy")
+    analysed = h.enableStats()
+    expected = h.analyse(samples, GazepyEventCollector())
+
+    h = gazepy.Gazepy(backend="numpy")
+    stepped = h.enableStats()
+    collector = GazepyEventCollector()
+    for sample in samples:
+        status = h.step(*sample)
+        if status & gazepy.STEP_FIXATION:
+            collector.fixation_columns.append(*h.fixation_buffer.item())
+        if status & gazepy.STEP_SACCADE:
+            collector.saccade_columns.append(*h.saccade_buffer.item())
+    assert len(collector.saccades()) > 0
+    np.testing.assert_array_equal(collector.fixations(),
+            expected.fixations())
+    np.testing.assert_array_equal(collector.saccades(), expected.saccades())
+
+    snapshot = stepped.snapshot()
+    assert snapshot["events"] == analysed.snapshot()["events"]
+    assert snapshot["samples"] == analysed.snapshot()["samples"]
+    assert snapshot["samples"]["filled"] > 0
+    assert snapshot["calls"]["step"] == len(samples)
+
+def test_stats_filled():
+    # samples filled in by the gap filter are counted before the noise filter
+    # delays them, also while the noise filter window fills up
+    samples, labels = synthetic.createSamples(2000, dropout=0.05, seed=8)
+    samples = np.concatenate((samples[:1], samples[3:]))
+    params = gazepy.getFilterParameterDefault("numpy")
+    params.noise.mid_idx = 2
+    params.gap.max_gap_length = 100
+    params.gap.sample_period = 1000 / 60
+    filled = len(vectorized.gapFilter(samples, params.gap.max_gap_length,
+        params.gap.sample_period)) - len(samples)
+    assert filled > 0
+    rows = [(*s["origin"], *s["point"], *s["screen_point"], s["timestamp"],
+        s["trial_id"], labels[s["label"]]) for s in samples]
+
+    h = gazepy.Gazepy(params, "numpy")
+    analysed = h.enableStats()
+    h.analyse(rows)
+    h = gazepy.Gazepy(params, "numpy")
+    stepped = h.enableStats()
+    for row in rows:
+        h.step(*row)
+    for stats in (analysed, stepped):
+        snapshot = stats.snapshot()["samples"]
+        assert snapshot["filled"] == filled
+        # the noise filter holds back the last samples
+        assert snapshot["added"] == len(samples) + filled - 4
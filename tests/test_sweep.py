@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from gazepy import jit, synthetic, vectorized
+from gazepy.sweep import gridParameters, sweep
+
+GRID = {
+    "gap.max_gap_length": [0, 50],
+    "noise.mid_idx": [0, 2],
+    "saccade.velocity_threshold": [20, 40],
+    "fixation.dispersion_threshold": [0.5, 1.5],
+    "fixation.duration_threshold": [100, 200]
+}
+
+@pytest.fixture
+def samples():
+    samples, _ = synthetic.createSamples(3000, dropout=0.01, seed=5)
+    return samples
+
+def naive(samples, config):
+    group = vectorized.gapFilter(samples, config.gap.max_gap_length,
+            config.gap.sample_period)
+    group = vectorized.noiseFilter(group, config.noise.type,
+            config.noise.mid_idx)
+    fixations = vectorized.fixationEvents(group,
+            *vectorized.fixationFilter(group,
+                config.fixation.dispersion_threshold,
+                config.fixation.duration_threshold))
+    saccades = vectorized.saccadeEvents(group,
+            *vectorized.saccadeFilter(group,
+                config.saccade.velocity_threshold))
+    return (len(group), fixations, saccades)
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+@pytest.mark.parametrize("jit_enabled", ["0", "1"])
+def test_sweep(samples, monkeypatch, max_workers, jit_enabled):
+    monkeypatch.setenv(jit.JIT_ENV, jit_enabled)
+    table, events = sweep(samples, GRID, max_workers=max_workers)
+    configs = gridParameters(GRID)
+    assert len(table) == len(configs) == len(events)
+    for row, (fixations, saccades), config in zip(table, events, configs):
+        count, expected_fixations, expected_saccades = naive(samples, config)
+        assert row["sample_count"] == count
+        assert row["velocity_threshold"] == config.saccade.velocity_threshold
+        assert row["fixation_count"] == len(fixations)
+        assert row["saccade_count"] == len(saccades)
+        np.testing.assert_array_equal(fixations, expected_fixations)
+        np.testing.assert_array_equal(saccades, expected_saccades)
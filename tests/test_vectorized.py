@@ -0,0 +1,388 @@
+import warnings
+
+import numpy as np
+import pytest
+
+import gazepy
+from gazepy import jit, synthetic, vectorized
+from gazepy.backend import getBackend
+from gazepy.events import GazepyEventCollector
+
+SAMPLE_PERIOD = 10
+
+def fromAngles(angle_x, angle_y, trial_id=None):
+    # samples looking in the given horizontal and vertical gaze angles (see
+    # vectorized.gazeAngle()) from the origin
+    angle_x = np.radians(angle_x)
+    angle_y = np.radians(angle_y)
+    point = 500 * np.stack((np.sin(angle_x) * np.cos(angle_y),
+        np.sin(angle_y), np.cos(angle_x) * np.cos(angle_y)), axis=1)
+    count = len(point)
+    return vectorized.createSamples(np.zeros((count, 3)), point,
+            np.arange(count) * SAMPLE_PERIOD, trial_id,
+            screen_point=point[:, :2] / 500)
+
+def stream(samples, params):
+    # the events of the streaming filters of the NumPy backend
+    h = gazepy.Gazepy(params, "numpy")
+    h.labels = gazepy.GazepyLabels(["a", "b"])
+    collector = GazepyEventCollector()
+    for s in samples:
+        h.updateWithScreen(*s["origin"], *s["point"], *s["screen_point"],
+                s["timestamp"], s["trial_id"], int(s["label"]))
+        collector.add(h.fixationFilter())
+        collector.add(h.saccadeFilter())
+        h.cleanup()
+    return (collector.fixations(), collector.saccades())
+
+def parameters(**values):
+    # the filter parameters without gap and noise filter
+    params = gazepy.getFilterParameterDefault("numpy")
+    params.gap.max_gap_length = 0
+    params.noise.mid_idx = 0
+    for name, value in values.items():
+        group, name = name.split("_", 1)
+        setattr(getattr(params, group), name, value)
+    return params
+
+def assertEvents(expected, events):
+    assert len(events) == len(expected)
+    for name in expected.dtype.names:
+        np.testing.assert_allclose(events[name], expected[name], rtol=1e-5,
+                atol=1e-6)
+
+@pytest.mark.parametrize("velocity, onset, offset", [
+    # a saccade starting with the second sample starts with the first
+    ([0, 50, 50, 5, 5], [0], [2]),
+    # an ongoing saccade at the end is not reported
+    ([0, 5, 50, 5, 5, 60, 70], [1], [2]),
+    # a saccade ending with the second last sample is reported
+    ([0, 5, 50, 50, 5], [1], [3]),
+    ([0, 5, 5, 5], [], []),
+    # velocities equal to the threshold are not above it
+    ([0, 20, 50, 20, 50, 5], [1, 3], [2, 4]),
+    ([0, np.nan, 50, 5], [1], [2])
+])
+def test_saccade_indices(velocity, onset, offset):
+    res = vectorized._saccadeIndices(np.array(velocity, dtype=float), 20)
+    np.testing.assert_array_equal(res[0], onset)
+    np.testing.assert_array_equal(res[1], offset)
+
+def test_saccade_filter():
+    # 1 degree per sample is 100 degrees per second
+    angle_x = np.array([0, 0, 0, 1, 2, 3, 3, 3, 3, 8, 8], dtype=float)
+    samples = fromAngles(angle_x, np.zeros(len(angle_x)))
+    velocity = vectorized.gazeVelocity(samples)
+    np.testing.assert_allclose(velocity[3], 100, rtol=1e-4)
+    onset, offset = vectorized.saccadeFilter(samples, 50)
+    np.testing.assert_array_equal(onset, [2, 8])
+    np.testing.assert_array_equal(offset, [5, 9])
+
+    saccades = vectorized.saccadeEvents(samples, onset, offset)
+    np.testing.assert_allclose(saccades["amplitude"], [3, 5], rtol=1e-4)
+    np.testing.assert_allclose(saccades["duration"], [30, 10])
+    np.testing.assert_allclose(saccades["timestamp"], [20, 80])
+    assertEvents(stream(samples, parameters(saccade_velocity_threshold=50))[1],
+            saccades)
+
+def test_saccade_amplitude():
+    samples = fromAngles([0, 3, 6], [0, 4, 8])
+    saccades = vectorized.saccadeEvents(samples, np.array([0]),
+            np.array([2]))
+    direction = vectorized.gazeDirection(samples)
+    expected = np.degrees(np.arccos(direction[0] @ direction[2]))
+    np.testing.assert_allclose(saccades["amplitude"], [expected], rtol=1e-5)
+
+def test_saccade_trial_change():
+    # the filters do not reset at trial changes, a saccade spanning two trials
+    # is reported once with the trial of its first sample
+    angle_x = np.array([0, 0, 1, 2, 3, 3, 3], dtype=float)
+    samples = fromAngles(angle_x, np.zeros(len(angle_x)),
+            [0, 0, 0, 1, 1, 1, 1])
+    onset, offset = vectorized.saccadeFilter(samples, 50)
+    saccades = vectorized.saccadeEvents(samples, onset, offset)
+    np.testing.assert_array_equal(saccades["trial_id"], [0])
+    np.testing.assert_allclose(saccades["amplitude"], [3], rtol=1e-4)
+    assertEvents(stream(samples, parameters(saccade_velocity_threshold=50))[1],
+            saccades)
+
+def naiveFixations(timestamp, angle, dispersion_threshold,
+        duration_threshold):
+    # the I-DT window state machine rescanning the whole window per sample
+    events = []
+    start = 0
+    is_collecting = False
+    for i in range(len(timestamp)):
+        if timestamp[i] - timestamp[start] < duration_threshold:
+            continue
+        window = angle[start:i + 1]
+        dispersion = np.ptp(window[:, 0]) + np.ptp(window[:, 1])
+        if dispersion <= dispersion_threshold:
+            is_collecting = True
+        elif is_collecting:
+            events.append((start, i - 1))
+            is_collecting = False
+            start = i + 1
+        else:
+            start += 1
+    return events
+
+def fixationIndices(angle_x, angle_y, dispersion_threshold,
+        duration_threshold):
+    angle_x = np.asarray(angle_x, dtype=float)
+    angle_y = np.asarray(angle_y, dtype=float)
+    first, last = vectorized._fixationIndices(
+            np.arange(len(angle_x)) * SAMPLE_PERIOD,
+            np.stack((angle_x, -angle_x, angle_y, -angle_y)),
+            dispersion_threshold, duration_threshold)
+    return list(zip(first.tolist(), last.tolist()))
+
+@pytest.fixture(params=["0", "1"], ids=["python", "jit"])
+def kernels(request, monkeypatch):
+    monkeypatch.setenv(jit.JIT_ENV, request.param)
+
+@pytest.mark.parametrize("angle_x, expected", [
+    # the window grows beyond the duration threshold until the dispersion is
+    # exceeded, the breaking sample is dropped
+    ([0, 0.1, 0, 0.1, 0, 0.1, 0.2, 5, 5, 5], [(0, 6)]),
+    # the window restarts after the breaking sample
+    ([0, 0, 0, 0, 5, 9, 9, 9, 9, 2, 2], [(0, 3), (5, 8)]),
+    # the oldest sample is dropped while the dispersion is exceeded
+    ([4, 8, 0, 0, 0, 0, 3], [(2, 5)]),
+    # a fixation broken by the last sample is reported
+    ([3, 3, 3, 3, 9], [(0, 3)]),
+    # a fixation ongoing at the last sample is not reported
+    ([3, 3, 3, 3, 3], []),
+    # too short
+    ([0, 0, 9, 0, 0, 9], [])
+])
+def test_fixation_kernel(kernels, angle_x, expected):
+    angle_y = np.zeros(len(angle_x))
+    assert fixationIndices(angle_x, angle_y, 1, 30) == expected
+    # the horizontal and the vertical range add up
+    assert fixationIndices(angle_x, angle_x, 2, 30) == expected
+
+def test_fixation_dispersion(kernels):
+    # each range is below the threshold but not their sum
+    angle_x = [0, 0.6, 0, 0.6, 0, 0, 9]
+    angle_y = [0, 0, 0.6, 0.6, 0, 0, 9]
+    assert fixationIndices(angle_x, np.zeros(7), 1, 30) == [(0, 5)]
+    assert fixationIndices(angle_x, angle_y, 1, 30) == []
+
+@pytest.mark.parametrize("seed", range(4))
+def test_fixation_kernel_naive(kernels, seed):
+    rng = np.random.default_rng(seed)
+    # fixations with noise and jumps between them
+    angle = np.cumsum(rng.normal(0, 0.2, (2000, 2))
+            + (rng.random((2000, 1)) < 0.05) * rng.normal(0, 5, (2000, 2)),
+            axis=0)
+    expected = naiveFixations(np.arange(2000) * SAMPLE_PERIOD, angle, 1.5, 50)
+    assert len(expected) > 10
+    assert fixationIndices(angle[:, 0], angle[:, 1], 1.5, 50) == expected
+
+def test_fixation_trial_change(kernels):
+    # the window does not reset at trial changes, a fixation spanning two
+    # trials is reported once with the trial of its first sample
+    angle_x = np.array([0, 0, 0, 0, 0, 0, 9], dtype=float)
+    samples = fromAngles(angle_x, np.zeros(7), [0, 0, 0, 1, 1, 1, 1])
+    first, last = vectorized.fixationFilter(samples, 1, 30)
+    np.testing.assert_array_equal(first, [0])
+    np.testing.assert_array_equal(last, [5])
+    fixations = vectorized.fixationEvents(samples, first, last)
+    np.testing.assert_array_equal(fixations["trial_id"], [0])
+    np.testing.assert_allclose(fixations["duration"], [50])
+    assertEvents(stream(samples, parameters(fixation_dispersion_threshold=1,
+        fixation_duration_threshold=30))[0], fixations)
+
+def test_fixation_filter(kernels):
+    samples, _ = synthetic.createSamples(3000, seed=9)
+    params = parameters()
+    first, last = vectorized.fixationFilter(samples,
+            params.fixation.dispersion_threshold,
+            params.fixation.duration_threshold)
+    fixations = vectorized.fixationEvents(samples, first, last)
+    assert len(fixations) > 10
+    assertEvents(stream(samples, params)[0], fixations)
+
+def test_backend_parity():
+    try:
+        getBackend("c")
+    except OSError:
+        pytest.skip("libgac is not available")
+    samples, labels = synthetic.createSamples(5000, dropout=0.01, seed=10)
+    results = []
+    for backend in ("c", "numpy"):
+        h = gazepy.Gazepy(parameters(), backend)
+        results.append(h.process(samples["origin"], samples["point"],
+            samples["timestamp"], samples["trial_id"], samples["label"],
+            labels, samples["screen_point"]))
+    (c_fixations, c_saccades), (fixations, saccades) = results
+    assert len(c_fixations) > 10
+    assertEvents(c_fixations, fixations)
+    assertEvents(c_saccades, saccades)
+
+def naiveNoise(samples, noise_type, mid_idx):
+    # filter each full window separately
+    length = mid_idx * 2 + 1
+    res = []
+    for i in range(len(samples) - length + 1):
+        window = samples[i:i + length]
+        sample = window[mid_idx].copy()
+        for name in vectorized.COORDINATE_FIELDS:
+            values = window[name].astype(np.float64)
+            if noise_type == vectorized.NOISE_TYPE_AVERAGE:
+                sample[name] = values.mean(axis=0)
+            else:
+                sample[name] = np.median(values, axis=0)
+        res.append(sample)
+    return np.array(res, dtype=vectorized.SAMPLE_DTYPE)
+
+@pytest.mark.parametrize("noise_type", [vectorized.NOISE_TYPE_AVERAGE,
+    vectorized.NOISE_TYPE_MEDIAN])
+@pytest.mark.parametrize("mid_idx", [0, 1, 2])
+@pytest.mark.parametrize("count", [0, 1, 3, 5, 200])
+def test_noise_filter(noise_type, mid_idx, count):
+    samples, _ = synthetic.createSamples(count, noise=5, seed=11)
+    # a trial change in the middle of the recording
+    samples["trial_id"] = np.arange(count) >= count // 2
+    res = vectorized.noiseFilter(samples, noise_type, mid_idx)
+    if mid_idx == 0:
+        assert res is samples
+        return
+    expected = naiveNoise(samples, noise_type, mid_idx)
+    assert len(res) == max(count - 2 * mid_idx, 0)
+    # the window spans trial changes and keeps the middle sample's fields
+    for name in ("timestamp", "trial_id", "label"):
+        np.testing.assert_array_equal(res[name], expected[name])
+    for name in vectorized.COORDINATE_FIELDS:
+        np.testing.assert_allclose(res[name], expected[name], rtol=1e-5,
+                atol=1e-3)
+
+def test_noise_filter_type():
+    samples, _ = synthetic.createSamples(10, seed=11)
+    with pytest.raises(ValueError, match="noise filter type"):
+        vectorized.noiseFilter(samples, 7, 1)
+
+def streamGap(samples, max_gap_length, sample_period):
+    # the samples of the streaming gap filter of the NumPy backend
+    params = parameters(gap_max_gap_length=max_gap_length,
+            gap_sample_period=sample_period)
+    h = gazepy.Gazepy(params, "numpy")
+    h.labels.codes(str(code) for code in range(samples["label"].max() + 1))
+    for s in samples:
+        h.updateWithScreen(*s["origin"], *s["point"], *s["screen_point"],
+                s["timestamp"], s["trial_id"], int(s["label"]))
+    return h.window
+
+@pytest.mark.parametrize("timestamp, expected", [
+    # no gap, jitter below half a sample period is no gap
+    ([0, 10, 20, 34, 40], [0, 10, 20, 34, 40]),
+    # gaps below the limit are filled at the sample period
+    ([0, 10, 40, 50, 71], [0, 10, 20, 30, 40, 50, 60, 71]),
+    # gaps above the limit are left
+    ([0, 10, 70, 80], [0, 10, 70, 80]),
+    # a gap at the limit is filled
+    ([0, 50], [0, 10, 20, 30, 40, 50])
+])
+def test_gap_filter(timestamp, expected):
+    count = len(timestamp)
+    samples = vectorized.createSamples(np.zeros((count, 3)),
+            np.stack((np.arange(count) * 10.0, np.zeros(count),
+                np.full(count, 500.0)), axis=1), timestamp)
+    res = vectorized.gapFilter(samples, 50, 10)
+    np.testing.assert_allclose(res["timestamp"], expected)
+    # the gaze points are interpolated linearly
+    np.testing.assert_allclose(res["point"][:, 0], np.interp(expected,
+        timestamp, samples["point"][:, 0]), rtol=1e-6)
+    window = streamGap(samples, 50, 10)
+    np.testing.assert_allclose([s[4] for s in window], expected)
+
+def test_gap_filter_trial_change():
+    # samples filled into a gap keep the trial and the label of the sample
+    # preceding the gap
+    samples = vectorized.createSamples(np.zeros((3, 3)),
+            [(0, 0, 500), (10, 0, 500), (40, 0, 500)], [0, 10, 40],
+            [0, 0, 1], [0, 0, 1])
+    res = vectorized.gapFilter(samples, 50, 10)
+    np.testing.assert_array_equal(res["trial_id"], [0, 0, 0, 0, 1])
+    np.testing.assert_array_equal(res["label"], [0, 0, 0, 0, 1])
+    window = streamGap(samples, 50, 10)
+    assert [s[0] for s in window] == [0, 0, 0, 0, 1]
+
+def test_gap_filter_disabled():
+    samples, _ = synthetic.createSamples(100, dropout=0.2, seed=12)
+    assert vectorized.gapFilter(samples, 0, 0) is samples
+
+@pytest.mark.parametrize("sample_period", [0, -10, np.nan])
+def test_gap_filter_sample_period(sample_period):
+    samples, _ = synthetic.createSamples(100, dropout=0.2, seed=12)
+    with pytest.raises(ValueError, match="sample period"):
+        vectorized.gapFilter(samples, 50, sample_period)
+    with pytest.raises(ValueError, match="sample period"):
+        streamGap(samples, 50, sample_period)
+
+SCREEN = np.array([(-200, 150, 500), (200, 150, 500), (-200, -150, 500),
+    (200, -150, 500)], dtype=np.float64)
+"""The corners of a screen of 400 x 300 at a distance of 500."""
+
+def rotation(angle):
+    # a rotation about the y and then the x axis
+    c, s = np.cos(angle), np.sin(angle)
+    return np.array([(1, 0, 0), (0, c, -s), (0, s, c)]) @ \
+            np.array([(c, 0, s), (0, 1, 0), (-s, 0, c)])
+
+def screenSamples(origin, point):
+    count = len(point)
+    return vectorized.createSamples(np.broadcast_to(origin, (count, 3)),
+            point, np.arange(count) * 10.0)
+
+def streamScreen(samples, is_normalized, corners):
+    h = gazepy.Gazepy(parameters(), "numpy")
+    h.setScreen(is_normalized, *np.ravel(corners))
+    label = h.labels.intern("")
+    for s in samples:
+        h.update(*s["origin"], *s["point"], s["timestamp"], s["trial_id"],
+                label)
+    return np.array([s[1] for s in h.window])
+
+def test_screen_axes():
+    top_left, axis_x, axis_y, normal = vectorized.screenAxes(*SCREEN)
+    np.testing.assert_array_equal(top_left, SCREEN[0])
+    np.testing.assert_array_equal(axis_x, (400, 0, 0))
+    np.testing.assert_array_equal(axis_y, (0, -300, 0))
+    np.testing.assert_array_equal(normal, (0, 0, -120000))
+
+@pytest.mark.parametrize("angle", [0, 0.4])
+@pytest.mark.parametrize("is_normalized", [True, False])
+def test_screen_point(angle, is_normalized):
+    # gaze rays through the corners and the center of a screen moved by a
+    # rotation and a translation, the gaze points lie between the origin and
+    # the screen or beyond the screen
+    move = rotation(angle)
+    offset = np.array([30, -20, 10])
+    corners = SCREEN @ move.T + offset
+    origin = np.array([5, 10, -20]) @ move.T + offset
+    target = np.concatenate((corners, corners.mean(axis=0, keepdims=True)))
+    samples = screenSamples(origin, np.concatenate((
+        origin + (target - origin) * 0.5, origin + (target - origin) * 2)))
+    expected = np.array([(0, 0), (1, 0), (0, 1), (1, 1), (0.5, 0.5)] * 2)
+    if not is_normalized:
+        expected *= (400, 300)
+    res = vectorized.screenPoint(samples, is_normalized, *corners)
+    assert res.dtype == np.float32
+    np.testing.assert_allclose(res, expected, atol=1e-3)
+    np.testing.assert_allclose(streamScreen(samples, is_normalized, corners),
+            expected, atol=1e-3)
+
+def test_screen_point_parallel():
+    # gaze rays parallel to the screen give NaN without warnings
+    samples = screenSamples((0, 0, 0), [(100, 0, 0), (0, 50, 0),
+        (0, 0, 100), (0, 0, 0)])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        res = vectorized.screenPoint(samples, True, *SCREEN)
+        streamed = streamScreen(samples, True, SCREEN)
+    np.testing.assert_array_equal(np.isnan(res), [(True, True),
+        (True, True), (False, False), (True, True)])
+    np.testing.assert_allclose(res[2], (0.5, 0.5))
+    np.testing.assert_array_equal(streamed, res)